@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import auth, receipts, users, organizations, forms, payments, feedback
+from app.api.v1.endpoints import auth, receipts, users, organizations, forms, payments, feedback, extraction_metrics
 
 api_router = APIRouter()
 
@@ -10,4 +10,5 @@ api_router.include_router(organizations.router, prefix="/organizations", tags=["
 api_router.include_router(receipts.router, prefix="/receipts", tags=["receipts"])
 api_router.include_router(forms.router, prefix="/forms", tags=["forms"])
 api_router.include_router(payments.router, prefix="/payments", tags=["payments"])
-api_router.include_router(feedback.router, prefix="/feedback", tags=["feedback"]) 
\ No newline at end of file
+api_router.include_router(feedback.router, prefix="/feedback", tags=["feedback"])
+api_router.include_router(extraction_metrics.router, prefix="/extraction-metrics", tags=["extraction metrics"]) 
\ No newline at end of file
@@ -0,0 +1,28 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.auth import require_treasurer_role
+from app.core.db import get_session
+from app.models.models import User
+from app.schemas.extraction_metrics import ExtractionDailyStats
+from app.services.extraction_metrics_service import daily_extraction_stats
+
+router = APIRouter()
+
+@router.get("/daily", response_model=List[ExtractionDailyStats])
+async def get_daily_extraction_stats(
+    days: int = Query(30, ge=1, le=365, description="Number of days to include, ending today"),
+    client_name: Optional[str] = Query(None, description="Only include calls answered by this BAML client"),
+    current_user: User = Depends(require_treasurer_role),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Latency percentiles and token usage of receipt extraction calls per day and model (Treasurer only).
+    
+    Covers the model calls made for the organization's receipts, including
+    failed calls and calls that were escalated to a larger model.
+    """
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    return await daily_extraction_stats(session, current_user.organization_id, since, client_name)
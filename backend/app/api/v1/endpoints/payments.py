@@ -1,140 +1,177 @@
 import csv
+import hashlib
 import io
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlmodel import Session, select
+import uuid
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from datetime import date
 
 from app.core.auth import require_treasurer_role
 from app.core.db import get_session
 from app.models.models import User, PaymentTransaction, Receipt, ReceiptStatus
+from app.services.idempotency_service import (
+    IdempotencyKeyInProgress,
+    IdempotencyKeyReused,
+    IdempotencyStore,
+    idempotency_key_header,
+    idempotent_response,
+    request_fingerprint,
+)
 
 router = APIRouter()
 
 @router.post("/upload-csv")
 async def upload_payment_csv(
+    response: Response,
     csv_file: UploadFile = File(...),
+    idempotency_key: Optional[str] = Depends(idempotency_key_header),
     current_user: User = Depends(require_treasurer_role),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
     """
     Upload CSV of payment transactions for reconciliation (Treasurer only).
+    
+    Retries that send the same Idempotency-Key replay the original response
+    instead of importing the transactions again.
     """
     if not csv_file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="File must be a CSV")
     
     # Read CSV content
     content = await csv_file.read()
-    csv_text = content.decode('utf-8')
-    
-    # Parse CSV
-    csv_reader = csv.DictReader(io.StringIO(csv_text))
-    
-    processed_records = 0
-    matched_receipts = 0
-    unmatched_records = 0
     
-    for row in csv_reader:
-        processed_records += 1
+    async def import_transactions():
+        csv_text = content.decode('utf-8')
         
-        # Extract payment data from CSV
-        # Expected columns: transaction_date, amount, reference_id
-        try:
-            transaction_date = date.fromisoformat(row['transaction_date'])
-            amount = float(row['amount'])
-            reference_id = row.get('reference_id', '')
-        except (KeyError, ValueError) as e:
-            unmatched_records += 1
-            continue
+        # Parse CSV
+        csv_reader = csv.DictReader(io.StringIO(csv_text))
         
-        # Try to match with existing receipts
-        receipt = session.exec(
-            select(Receipt).where(
-                Receipt.organization_id == str(current_user.organization_id),
-                Receipt.status == ReceiptStatus.approved,
-                Receipt.payment_reference == reference_id
-            )
-        ).first()
+        processed_records = 0
+        matched_receipts = 0
+        unmatched_records = 0
         
-        if receipt:
-            # Create payment transaction and link to receipt
-            payment_transaction = PaymentTransaction(
-                organization_id=str(current_user.organization_id),
-                transaction_date=transaction_date,
-                amount=amount,
-                reference_id=reference_id,
-                receipt_id=str(receipt.id)
-            )
-            session.add(payment_transaction)
+        for row in csv_reader:
+            processed_records += 1
             
-            # Update receipt status to paid
-            receipt.status = ReceiptStatus.paid
-            session.add(receipt)
+            # Extract payment data from CSV
+            # Expected columns: transaction_date, amount, reference_id
+            try:
+                transaction_date = date.fromisoformat(row['transaction_date'])
+                amount = float(row['amount'])
+                reference_id = row.get('reference_id', '')
+            except (KeyError, ValueError) as e:
+                unmatched_records += 1
+                continue
             
-            matched_receipts += 1
-        else:
-            # Create unmatched payment transaction
-            payment_transaction = PaymentTransaction(
-                organization_id=str(current_user.organization_id),
-                transaction_date=transaction_date,
-                amount=amount,
-                reference_id=reference_id
+            # Try to match with existing receipts
+            result = await session.exec(
+                select(Receipt).where(
+                    Receipt.organization_id == current_user.organization_id,
+                    Receipt.status == ReceiptStatus.approved,
+                    Receipt.payment_reference == reference_id
+                )
             )
-            session.add(payment_transaction)
-            unmatched_records += 1
+            receipt = result.first()
+            
+            if receipt:
+                # Create payment transaction and link to receipt
+                payment_transaction = PaymentTransaction(
+                    organization_id=current_user.organization_id,
+                    transaction_date=transaction_date,
+                    amount=amount,
+                    reference_id=reference_id,
+                    receipt_id=receipt.id
+                )
+                session.add(payment_transaction)
+                
+                # Update receipt status to paid
+                receipt.status = ReceiptStatus.paid
+                session.add(receipt)
+                
+                matched_receipts += 1
+            else:
+                # Create unmatched payment transaction
+                payment_transaction = PaymentTransaction(
+                    organization_id=current_user.organization_id,
+                    transaction_date=transaction_date,
+                    amount=amount,
+                    reference_id=reference_id
+                )
+                session.add(payment_transaction)
+                unmatched_records += 1
+        
+        await session.commit()
+        
+        return 200, {
+            "message": "CSV uploaded and processing",
+            "processed_records": processed_records,
+            "matched_receipts": matched_receipts,
+            "unmatched_records": unmatched_records
+        }
     
-    session.commit()
+    try:
+        result = await IdempotencyStore.run(
+            session,
+            idempotency_key,
+            user_id=uuid.UUID(str(current_user.id)),
+            endpoint="POST /payments/upload-csv",
+            request_hash=request_fingerprint(hashlib.sha256(content).hexdigest()),
+            func=import_transactions
+        )
+    except IdempotencyKeyInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Retry-After": "1"})
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
     
-    return {
-        "message": "CSV uploaded and processing",
-        "processed_records": processed_records,
-        "matched_receipts": matched_receipts,
-        "unmatched_records": unmatched_records
-    }
+    return idempotent_response(response, result)
 
 @router.post("/match-manual")
 async def match_payment_manual(
     transaction_id: str,
     receipt_id: str,
     current_user: User = Depends(require_treasurer_role),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
     """
     Manually match an unmatched payment transaction to a receipt (Treasurer only).
     """
     # Find the payment transaction
-    transaction = session.exec(
+    result = await session.exec(
         select(PaymentTransaction).where(
             PaymentTransaction.id == transaction_id,
-            PaymentTransaction.organization_id == str(current_user.organization_id),
+            PaymentTransaction.organization_id == current_user.organization_id,
             PaymentTransaction.receipt_id.is_(None)  # Unmatched
         )
-    ).first()
+    )
+    transaction = result.first()
     
     if not transaction:
         raise HTTPException(status_code=404, detail="Unmatched payment transaction not found")
     
     # Find the receipt
-    receipt = session.exec(
+    result = await session.exec(
         select(Receipt).where(
             Receipt.id == receipt_id,
-            Receipt.organization_id == str(current_user.organization_id),
+            Receipt.organization_id == current_user.organization_id,
             Receipt.status == ReceiptStatus.approved
         )
-    ).first()
+    )
+    receipt = result.first()
     
     if not receipt:
         raise HTTPException(status_code=404, detail="Receipt not found")
     
     # Link transaction to receipt
-    transaction.receipt_id = receipt_id
+    transaction.receipt_id = receipt.id
     session.add(transaction)
     
     # Update receipt status to paid
     receipt.status = ReceiptStatus.paid
     session.add(receipt)
     
-    session.commit()
+    await session.commit()
     
     return {
         "message": "Payment matched successfully",
@@ -145,17 +182,18 @@ async def match_payment_manual(
 @router.get("/unmatched")
 async def get_unmatched_payments(
     current_user: User = Depends(require_treasurer_role),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
     """
     Get unmatched payment transactions (Treasurer only).
     """
-    transactions = session.exec(
+    result = await session.exec(
         select(PaymentTransaction).where(
-            PaymentTransaction.organization_id == str(current_user.organization_id),
+            PaymentTransaction.organization_id == current_user.organization_id,
             PaymentTransaction.receipt_id.is_(None)
         )
-    ).all()
+    )
+    transactions = result.all()
     
     return [
         {
@@ -170,17 +208,18 @@ async def get_unmatched_payments(
 @router.get("/unpaid-receipts")
 async def get_unpaid_receipts(
     current_user: User = Depends(require_treasurer_role),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
     """
     Get approved receipts that haven't been paid (Treasurer only).
     """
-    receipts = session.exec(
+    result = await session.exec(
         select(Receipt).where(
-            Receipt.organization_id == str(current_user.organization_id),
+            Receipt.organization_id == current_user.organization_id,
             Receipt.status == ReceiptStatus.approved
         )
-    ).all()
+    )
+    receipts = result.all()
     
     return [
         {
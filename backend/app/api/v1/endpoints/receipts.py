@@ -1,119 +1,573 @@
+import asyncio
+import base64
+import binascii
 import json
+import logging
+import shutil
+import tempfile
 import uuid
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
+from typing import AsyncIterator, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from datetime import date, datetime
 
 from app.core.auth import get_current_active_user, require_treasurer_role
-from app.core.db import get_session
-from app.models.models import User, Receipt, ReceiptStatus, ReceiptTaxBreakdown, TaxType, PaymentMethod
-from app.services.baml_service import BAMLService
-from app.services.storage_service import R2StorageService
+from app.core.config import settings
+from app.core.db import async_session_factory, get_session
+from app.models.models import User, Receipt, ReceiptStatus, ExtractionJobStatus, ReceiptTaxBreakdown, PaymentMethod, ResumableUpload, ResumableUploadStatus
+from app.schemas.receipt import FinalizeUploadRequest, PresignedUploadRequest, PresignedUploadResponse, ReceiptCorrection
+from app.services.admission import upload_admission
+from app.services.batch_upload_service import BatchItem, is_zip_upload, iter_archive_items, run_bounded
+from app.services.extraction_progress import get_extraction_progress
+from app.services.job_queue import ExtractionJobQueue
+from app.services.idempotency_service import (
+    IdempotencyKeyInProgress,
+    IdempotencyKeyReused,
+    IdempotencyStore,
+    idempotency_key_header,
+    idempotent_response,
+    request_fingerprint,
+)
+from app.services.pdf_service import PDF_CONTENT_TYPE
+from app.services.resumable_upload_service import (
+    UploadGone,
+    UploadLengthExceeded,
+    UploadLocked,
+    UploadOffsetMismatch,
+    append_chunk,
+    complete_upload,
+    create_upload,
+    current_offset,
+    delete_upload,
+    get_upload,
+    open_staged_upload,
+)
+from app.services.storage_service import R2StorageService, sha256_checksum
+from app.services.upload_service import (
+    DuplicateOfOtherUser,
+    UploadError,
+    UploadTooLarge,
+    create_receipt_from_stored_object,
+    create_receipt_from_upload,
+    direct_upload_key,
+    ingest_upload,
+    is_direct_upload_key,
+)
+from app.services.vendor_profile_service import record_vendor_correction
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Load non-refundable categories
-def load_nonrefundable_categories():
-    try:
-        with open("config/nonrefundable_categories.json", "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
+# Seconds between comment lines on an otherwise idle event stream
+SSE_KEEPALIVE_SECONDS = 15
+
+def _validate_receipt_content_type(content_type: Optional[str]) -> None:
+    """Reject uploads that are neither images nor PDFs."""
+    if not content_type:
+        raise HTTPException(status_code=400, detail="File must have a content type")
+    if not content_type.startswith("image/") and content_type != PDF_CONTENT_TYPE:
+        raise HTTPException(status_code=400, detail="File must be an image or a PDF")
 
-@router.post("/upload")
+async def _resolve_receipt_user_id(
+    session: AsyncSession,
+    current_user: User,
+    member_id: Optional[str]
+) -> uuid.UUID:
+    """Determine who a receipt belongs to; treasurers may upload on behalf of members."""
+    if not member_id or current_user.role != "treasurer":
+        return uuid.UUID(str(current_user.id))
+    
+    # Check if user exists and belongs to same organization
+    statement = select(User).where(
+        User.id == member_id,
+        User.organization_id == current_user.organization_id
+    )
+    result = await session.exec(statement)
+    member = result.first()
+    if not member:
+        raise HTTPException(status_code=404, detail="Member not found")
+    return member.id
+
+@router.post("/upload", status_code=202)
 async def upload_receipt(
+    response: Response,
     image: UploadFile = File(...),
     is_donation: bool = Form(False),
     member_id: Optional[str] = Form(None),
+    idempotency_key: Optional[str] = Depends(idempotency_key_header),
     current_user: User = Depends(get_current_active_user),
     session: AsyncSession = Depends(get_session)
 ):
     """
-    Upload a receipt image for AI-powered data extraction.
+    Upload a receipt image or PDF and queue it for AI-powered data extraction.
+    
+    The receipt is stored with status "processing" and the extraction worker
+    moves it to "pending" or "rejected" once the data has been extracted, or
+    to "extraction_failed" if extraction keeps failing.
+    PDFs with a text layer are parsed without an LLM call. Re-uploading an
+    image returns the existing receipt with status code 200, or 409 without
+    its details if another member of the organization submitted it.
+    
+    Retries that send the same Idempotency-Key replay the original response.
+    Returns 429 with Retry-After when too many uploads are in progress.
     """
-    # Validate file type
-    if not image.content_type:
-        raise HTTPException(status_code=400, detail="File must have a content type")
-    content_type = image.content_type
-    if not content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="File must be an image")
+    _validate_receipt_content_type(image.content_type)
+    receipt_user_id = await _resolve_receipt_user_id(session, current_user, member_id)
+    
+    # Spool and hash image data
+    try:
+        upload = await ingest_upload(image)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    async def store_receipt():
+        # Store the image and queue extraction unless this image was already submitted
+        try:
+            receipt, duplicate = await create_receipt_from_upload(
+                session,
+                upload,
+                user_id=receipt_user_id,
+                organization_id=uuid.UUID(str(current_user.organization_id)),
+                is_donation=is_donation
+            )
+        except DuplicateOfOtherUser as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except UploadError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        
+        if duplicate:
+            return 200, {
+                "id": str(receipt.id),
+                "status": receipt.status,
+                "image_url": receipt.image_url,
+                "duplicate": True,
+                "message": "Receipt was already uploaded"
+            }
+        
+        return 202, {
+            "id": str(receipt.id),
+            "status": receipt.status,
+            "image_url": receipt.image_url,
+            "duplicate": False,
+            "message": "Receipt uploaded successfully and queued for processing"
+        }
+    
+    try:
+        result = await IdempotencyStore.run(
+            session,
+            idempotency_key,
+            user_id=uuid.UUID(str(current_user.id)),
+            endpoint="POST /receipts/upload",
+            request_hash=request_fingerprint(upload.content_hash, is_donation, member_id),
+            func=store_receipt
+        )
+    except IdempotencyKeyInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Retry-After": "1"})
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    finally:
+        upload.close()
+    
+    return idempotent_response(response, result)
+
+@router.post("/upload-batch")
+async def upload_receipt_batch(
+    files: List[UploadFile] = File(...),
+    is_donation: bool = Form(False),
+    member_id: Optional[str] = Form(None),
+    current_user: User = Depends(get_current_active_user),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Upload many receipt images, or ZIP archives of them, in one request.
+    
+    Receipts are stored and queued for extraction with at most
+    BATCH_UPLOAD_CONCURRENCY in flight. The response is NDJSON: one line per
+    receipt as soon as it has been handled, followed by a summary line.
+    The whole batch counts as one in-flight upload for admission control.
+    """
+    if len(files) > settings.BATCH_UPLOAD_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch may contain at most {settings.BATCH_UPLOAD_MAX_FILES} files"
+        )
+    
+    receipt_user_id = await _resolve_receipt_user_id(session, current_user, member_id)
+    organization_id = uuid.UUID(str(current_user.organization_id))
     
-    # Read image data
-    image_data = await image.read()
+    # Uploaded files are closed when this handler returns, so stage them before streaming
+    images: List[BatchItem] = []
+    archives = []
+    for file in files:
+        if is_zip_upload(file.content_type, file.filename):
+            archive = tempfile.TemporaryFile()
+            await asyncio.to_thread(shutil.copyfileobj, file.file, archive)
+            archives.append(archive)
+            continue
+        
+        item = BatchItem(index=len(images), filename=file.filename)
+        try:
+            _validate_receipt_content_type(file.content_type)
+            item.upload = await ingest_upload(file)
+        except HTTPException as e:
+            item.error = e.detail
+        except UploadTooLarge as e:
+            item.error = str(e)
+        images.append(item)
+    
+    async def iter_items() -> AsyncIterator[BatchItem]:
+        for item in images:
+            yield item
+        next_index = len(images)
+        for archive in archives:
+            async for item in iter_archive_items(archive, next_index):
+                if item.index >= settings.BATCH_UPLOAD_MAX_FILES:
+                    yield BatchItem(
+                        index=item.index,
+                        filename=item.filename,
+                        error=f"A batch may contain at most {settings.BATCH_UPLOAD_MAX_FILES} files"
+                    )
+                    return
+                yield item
+                next_index = item.index + 1
+    
+    async def process_item(item: BatchItem) -> dict:
+        line = {"type": "result", "index": item.index, "filename": item.filename}
+        if item.error:
+            return {**line, "status": "error", "detail": item.error}
+        
+        try:
+            _validate_receipt_content_type(item.upload.content_type)
+            # Each receipt gets its own session so items can be stored concurrently
+            async with async_session_factory() as item_session:
+                receipt, duplicate = await create_receipt_from_upload(
+                    item_session,
+                    item.upload,
+                    user_id=receipt_user_id,
+                    organization_id=organization_id,
+                    is_donation=is_donation
+                )
+        except HTTPException as e:
+            return {**line, "status": "error", "detail": e.detail}
+        except DuplicateOfOtherUser as e:
+            return {**line, "status": "duplicate", "detail": str(e)}
+        except UploadError as e:
+            return {**line, "status": "error", "detail": str(e)}
+        except Exception as e:
+            logger.error(f"Batch upload item {item.index} failed: {e}", exc_info=True)
+            return {**line, "status": "error", "detail": "Failed to process receipt"}
+        finally:
+            item.upload.close()
+        
+        return {
+            **line,
+            "status": "duplicate" if duplicate else "queued",
+            "receipt_id": str(receipt.id),
+            "receipt_status": receipt.status
+        }
+    
+    async def stream_results() -> AsyncIterator[str]:
+        counts = {"queued": 0, "duplicate": 0, "error": 0}
+        try:
+            async for line in run_bounded(iter_items(), process_item, settings.BATCH_UPLOAD_CONCURRENCY):
+                counts[line["status"]] += 1
+                yield json.dumps(line) + "\n"
+            yield json.dumps({"type": "summary", "total": sum(counts.values()), **counts}) + "\n"
+        finally:
+            for item in images:
+                if item.upload:
+                    item.upload.close()
+            for archive in archives:
+                archive.close()
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@router.post("/upload-url", response_model=PresignedUploadResponse)
+async def create_upload_url(
+    upload_request: PresignedUploadRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Issue a presigned URL so the client can PUT a receipt image straight to storage.
+    
+    The image bytes never pass through the API. The PUT must send the returned
+    headers, which include the SHA-256 given here; storage rejects an upload
+    that does not match it. Call /receipts/finalize with the returned object
+    key once the upload has completed.
+    """
+    _validate_receipt_content_type(upload_request.content_type)
+    
+    organization_id = uuid.UUID(str(current_user.organization_id))
+    object_key = direct_upload_key(organization_id, upload_request.content_type)
     
-    # Upload to R2 storage
     storage_service = R2StorageService()
-    image_url = await storage_service.upload_image(image_data, image.content_type)
+    upload_url = await storage_service.generate_presigned_upload_url(
+        object_key,
+        upload_request.content_type,
+        upload_request.sha256,
+        expires_in=settings.PRESIGNED_UPLOAD_EXPIRES_SECONDS
+    )
+    if not upload_url:
+        raise HTTPException(status_code=500, detail="Failed to create upload URL")
     
-    if not image_url:
-        raise HTTPException(status_code=500, detail="Failed to upload image")
+    return PresignedUploadResponse(
+        upload_url=upload_url,
+        object_key=object_key,
+        expires_in=settings.PRESIGNED_UPLOAD_EXPIRES_SECONDS,
+        headers={
+            "Content-Type": upload_request.content_type,
+            "x-amz-checksum-sha256": sha256_checksum(upload_request.sha256)
+        }
+    )
+
+@router.post("/finalize", status_code=202)
+async def finalize_upload(
+    finalize_request: FinalizeUploadRequest,
+    response: Response,
+    current_user: User = Depends(get_current_active_user),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Create a receipt for an image uploaded with a presigned URL and queue its extraction.
     
-    # Extract data using BAML
-    baml_service = BAMLService()
-    extracted_data = await baml_service.extract_receipt_data(image_data, image.content_type)
+    Finalizing the same upload again, or an image the organization already
+    has, returns the existing receipt with status code 200, or 409 without its
+    details if another member of the organization submitted it.
+    Returns 429 with Retry-After when too many uploads are in progress.
+    """
+    organization_id = uuid.UUID(str(current_user.organization_id))
+    object_key = finalize_request.object_key
+    if not is_direct_upload_key(organization_id, object_key):
+        raise HTTPException(status_code=400, detail="Unknown upload key")
     
-    # Determine user for the receipt
-    receipt_user_id = member_id if member_id and current_user.role == "treasurer" else str(current_user.id)
+    receipt_user_id = await _resolve_receipt_user_id(session, current_user, finalize_request.member_id)
     
-    # Check if user exists and belongs to same organization
-    if member_id and current_user.role == "treasurer":
-        statement = select(User).where(
-            User.id == member_id,
-            User.organization_id == current_user.organization_id
+    storage_service = R2StorageService()
+    metadata = await storage_service.get_object_metadata(object_key)
+    if not metadata:
+        raise HTTPException(status_code=404, detail="Uploaded image not found")
+    
+    # The presigned URL cannot limit what the client sends, so check it now
+    if metadata["content_length"] > settings.MAX_UPLOAD_BYTES:
+        await storage_service.delete_image(object_key)
+        raise HTTPException(
+            status_code=413,
+            detail=f"File exceeds the maximum size of {settings.MAX_UPLOAD_BYTES} bytes"
         )
-        result = await session.exec(statement)
-        member = result.first()
-        if not member:
-            raise HTTPException(status_code=404, detail="Member not found")
-    
-    # Create receipt record
-    receipt = Receipt(
-        image_url=image_url,
-        user_id=uuid.UUID(receipt_user_id),
-        organization_id=uuid.UUID(str(current_user.organization_id)),
-        is_donation=is_donation,
-        status=ReceiptStatus.processing
-    )
+    try:
+        _validate_receipt_content_type(metadata["content_type"])
+    except HTTPException:
+        await storage_service.delete_image(object_key)
+        raise
     
-    # If AI extraction was successful, populate fields
-    if extracted_data and baml_service.validate_extracted_data(extracted_data):
-        # Check if category is refundable
-        nonrefundable_categories = load_nonrefundable_categories()
-        if extracted_data.expense_category in nonrefundable_categories:
-            receipt.status = ReceiptStatus.rejected
-        else:
-            receipt.status = ReceiptStatus.pending
-            receipt.vendor_name = extracted_data.vendor_name
-            receipt.purchase_date = datetime.strptime(extracted_data.purchase_date, "%Y-%m-%d").date() if extracted_data.purchase_date else None
-            receipt.county = extracted_data.county
-            receipt.subtotal_amount = extracted_data.subtotal_amount
-            receipt.tax_amount = extracted_data.tax_amount
-            receipt.total_amount = extracted_data.total_amount
-            receipt.expense_category = extracted_data.expense_category
-            
-            # Add tax breakdowns
-            if extracted_data.tax_breakdowns:
-                for breakdown in extracted_data.tax_breakdowns:
-                    tax_breakdown = ReceiptTaxBreakdown(
-                        tax_type=TaxType(breakdown.tax_type.value.lower()),
-                        amount=breakdown.amount,
-                        receipt_id=receipt.id
-                    )
-                    session.add(tax_breakdown)
+    try:
+        receipt, existing = await create_receipt_from_stored_object(
+            session,
+            object_key,
+            metadata["sha256"],
+            user_id=receipt_user_id,
+            organization_id=organization_id,
+            is_donation=finalize_request.is_donation
+        )
+    except DuplicateOfOtherUser as e:
+        raise HTTPException(status_code=409, detail=str(e))
     
-    session.add(receipt)
-    session.commit()
-    session.refresh(receipt)
+    if existing:
+        response.status_code = 200
     
     return {
         "id": str(receipt.id),
         "status": receipt.status,
         "image_url": receipt.image_url,
-        "message": "Receipt uploaded successfully"
+        "duplicate": existing,
+        "message": "Receipt was already finalized" if existing else "Receipt finalized and queued for processing"
     }
 
+@router.get("/upload-admission")
+async def get_upload_admission(
+    current_user: User = Depends(require_treasurer_role)
+):
+    """
+    Uploads of the organization in progress on the API process serving this request (Treasurer only).
+    
+    Limits apply per API process, so with several replicas each reports its own share.
+    """
+    organization_id = uuid.UUID(str(current_user.organization_id))
+    return {
+        "inflight_uploads": upload_admission.inflight_for(organization_id),
+        "max_inflight_uploads": upload_admission.max_inflight_per_organization
+    }
+
+# Resumable uploads follow the core tus 1.0.0 protocol: POST creates an upload,
+# HEAD reports how many bytes arrived and PATCH appends from that offset
+TUS_VERSION = "1.0.0"
+
+def _tus_headers(upload: ResumableUpload, **extra: str) -> dict:
+    """Headers describing the state of a resumable upload."""
+    headers = {
+        "Tus-Resumable": TUS_VERSION,
+        "Upload-Offset": str(current_offset(upload)),
+        "Upload-Length": str(upload.upload_length),
+        "Upload-Expires": upload.expires_at.strftime("%a, %d %b %Y %H:%M:%S GMT"),
+        "Cache-Control": "no-store",
+        **extra
+    }
+    if upload.receipt_id:
+        headers["Receipt-Id"] = str(upload.receipt_id)
+    return headers
+
+def _parse_upload_metadata(header: Optional[str]) -> dict:
+    """Decode a tus Upload-Metadata header ("key base64value,key2 base64value")."""
+    metadata = {}
+    if not header:
+        return metadata
+    for pair in header.split(","):
+        key, _, value = pair.strip().partition(" ")
+        if not key:
+            continue
+        try:
+            metadata[key] = base64.b64decode(value).decode("utf-8") if value else ""
+        except (binascii.Error, UnicodeDecodeError):
+            raise HTTPException(status_code=400, detail=f"Invalid Upload-Metadata value for {key}")
+    return metadata
+
+async def _get_resumable_upload(session: AsyncSession, upload_id: str, current_user: User) -> ResumableUpload:
+    """Load a resumable upload of the user's organization or raise 404."""
+    try:
+        parsed_id = uuid.UUID(upload_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    upload = await get_upload(session, parsed_id, uuid.UUID(str(current_user.organization_id)))
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found", headers={"Tus-Resumable": TUS_VERSION})
+    return upload
+
+@router.post("/uploads", status_code=201)
+async def create_resumable_upload(
+    response: Response,
+    upload_length: int = Header(..., alias="Upload-Length"),
+    upload_metadata: Optional[str] = Header(None, alias="Upload-Metadata"),
+    current_user: User = Depends(get_current_active_user),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Start a resumable upload of a receipt image or PDF.
+    
+    Send the size in Upload-Length and, in Upload-Metadata, the base64-encoded
+    filetype (MIME type) and optionally filename, is_donation and member_id.
+    Then PATCH the bytes to the returned Location, resuming from the offset
+    reported by HEAD after a dropped connection.
+    """
+    if upload_length <= 0:
+        raise HTTPException(status_code=400, detail="Upload-Length must be positive")
+    if upload_length > settings.MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File exceeds the maximum size of {settings.MAX_UPLOAD_BYTES} bytes"
+        )
+    
+    metadata = _parse_upload_metadata(upload_metadata)
+    content_type = metadata.get("filetype") or metadata.get("content_type")
+    _validate_receipt_content_type(content_type)
+    receipt_user_id = await _resolve_receipt_user_id(session, current_user, metadata.get("member_id"))
+    
+    upload = await create_upload(
+        session,
+        upload_length=upload_length,
+        content_type=content_type,
+        filename=metadata.get("filename"),
+        is_donation=metadata.get("is_donation", "").lower() in ("true", "1"),
+        user_id=uuid.UUID(str(current_user.id)),
+        receipt_user_id=receipt_user_id,
+        organization_id=uuid.UUID(str(current_user.organization_id))
+    )
+    
+    response.headers.update(_tus_headers(upload, Location=f"{settings.API_V1_STR}/receipts/uploads/{upload.id}"))
+    return {"id": str(upload.id), "upload_length": upload.upload_length, "offset": 0}
+
+@router.head("/uploads/{upload_id}")
+async def get_resumable_upload_offset(
+    upload_id: str,
+    current_user: User = Depends(get_current_active_user),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Report how many bytes of a resumable upload have been received.
+    """
+    upload = await _get_resumable_upload(session, upload_id, current_user)
+    return Response(status_code=200, headers=_tus_headers(upload))
+
+@router.patch("/uploads/{upload_id}", status_code=204)
+async def append_resumable_upload(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    content_type: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_active_user),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Append bytes to a resumable upload starting at Upload-Offset.
+    
+    When the last byte arrives the receipt is created and queued for
+    extraction as with /receipts/upload; its ID is returned in the
+    Receipt-Id header. Re-sending an empty PATCH at the final offset retries
+    a hand-off that failed. Returns 429 with Retry-After when too many uploads
+    are in progress; the client resumes from HEAD's offset as usual.
+    """
+    if content_type != "application/offset+octet-stream":
+        raise HTTPException(status_code=415, detail="Content-Type must be application/offset+octet-stream")
+    
+    upload = await _get_resumable_upload(session, upload_id, current_user)
+    if upload.status == ResumableUploadStatus.completed:
+        return Response(status_code=204, headers=_tus_headers(upload))
+    parsed_upload_id, organization_id = upload.id, upload.organization_id
+    
+    try:
+        with open_staged_upload(upload) as staged:
+            offset = await append_chunk(staged, upload, upload_offset, request.stream())
+            if offset == upload.upload_length:
+                await complete_upload(session, upload)
+    except UploadGone:
+        # Another request completed or deleted the upload while this one waited
+        session.expire(upload)
+        upload = await get_upload(session, parsed_upload_id, organization_id)
+        if upload is None or upload.status != ResumableUploadStatus.completed:
+            raise HTTPException(status_code=404, detail="Upload not found")
+    except UploadLocked as e:
+        raise HTTPException(status_code=423, detail=str(e), headers={"Retry-After": "1"})
+    except UploadOffsetMismatch as e:
+        raise HTTPException(status_code=409, detail=str(e), headers=_tus_headers(upload))
+    except UploadLengthExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e), headers=_tus_headers(upload))
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except DuplicateOfOtherUser as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Tus-Resumable": TUS_VERSION})
+    except UploadError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return Response(status_code=204, headers=_tus_headers(upload))
+
+@router.delete("/uploads/{upload_id}", status_code=204)
+async def delete_resumable_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_active_user),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Abandon a resumable upload and discard the bytes received so far.
+    """
+    upload = await _get_resumable_upload(session, upload_id, current_user)
+    try:
+        await delete_upload(session, upload)
+    except UploadLocked as e:
+        raise HTTPException(status_code=423, detail=str(e), headers={"Retry-After": "1"})
+    return Response(status_code=204, headers={"Tus-Resumable": TUS_VERSION})
+
 @router.get("/")
 async def get_receipts(
     status: Optional[str] = Query(None),
@@ -167,15 +621,8 @@ async def get_receipts(
         for receipt in receipts
     ]
 
-@router.get("/{receipt_id}")
-async def get_receipt(
-    receipt_id: str,
-    current_user: User = Depends(get_current_active_user),
-    session: AsyncSession = Depends(get_session)
-):
-    """
-    Get detailed receipt information.
-    """
+async def _get_accessible_receipt(session: AsyncSession, receipt_id: str, current_user: User) -> Receipt:
+    """Load a receipt of the user's organization; members only see their own receipts."""
     # Build query with access control
     query = select(Receipt).where(
         Receipt.id == receipt_id,
@@ -186,15 +633,20 @@ async def get_receipt(
     if current_user.role == "member":
         query = query.where(Receipt.user_id == str(current_user.id))
     
-    receipt = session.exec(query).first()
+    result = await session.exec(query)
+    receipt = result.first()
     
     if not receipt:
         raise HTTPException(status_code=404, detail="Receipt not found")
-    
+    return receipt
+
+async def _receipt_detail(session: AsyncSession, receipt: Receipt) -> dict:
+    """Serialize a receipt with its tax breakdowns."""
     # Get tax breakdowns
-    tax_breakdowns = session.exec(
-        select(ReceiptTaxBreakdown).where(ReceiptTaxBreakdown.receipt_id == receipt_id)
-    ).all()
+    result = await session.exec(
+        select(ReceiptTaxBreakdown).where(ReceiptTaxBreakdown.receipt_id == receipt.id)
+    )
+    tax_breakdowns = result.all()
     
     return {
         "id": str(receipt.id),
@@ -202,6 +654,7 @@ async def get_receipt(
         "organization_id": str(receipt.organization_id),
         "image_url": receipt.image_url,
         "vendor_name": receipt.vendor_name,
+        "vendor_address": receipt.vendor_address,
         "purchase_date": receipt.purchase_date.isoformat() if receipt.purchase_date else None,
         "county": receipt.county,
         "subtotal_amount": receipt.subtotal_amount,
@@ -209,6 +662,7 @@ async def get_receipt(
         "total_amount": receipt.total_amount,
         "expense_category": receipt.expense_category,
         "status": receipt.status,
+        "extraction_error": receipt.extraction_error,
         "is_donation": receipt.is_donation,
         "payment_method": receipt.payment_method,
         "payment_reference": receipt.payment_reference,
@@ -218,12 +672,140 @@ async def get_receipt(
         "tax_breakdowns": [
             {
                 "tax_type": breakdown.tax_type,
-                "amount": breakdown.amount
+                "amount": breakdown.amount,
+                "tax_rate": breakdown.tax_rate
             }
             for breakdown in tax_breakdowns
         ]
     }
 
+@router.get("/{receipt_id}")
+async def get_receipt(
+    receipt_id: str,
+    current_user: User = Depends(get_current_active_user),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Get detailed receipt information.
+    """
+    receipt = await _get_accessible_receipt(session, receipt_id, current_user)
+    return await _receipt_detail(session, receipt)
+
+@router.patch("/{receipt_id}")
+async def correct_receipt(
+    receipt_id: str,
+    correction: ReceiptCorrection,
+    current_user: User = Depends(require_treasurer_role),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Correct a receipt's extracted fields (Treasurer only).
+    
+    The corrected county, category and tax rates become the vendor's
+    confirmed profile, which later extractions are filled in and checked against.
+    """
+    receipt = await _get_accessible_receipt(session, receipt_id, current_user)
+    if receipt.status == ReceiptStatus.processing:
+        raise HTTPException(status_code=409, detail="Receipt is still being extracted")
+    
+    for field, value in correction.model_dump(exclude_unset=True, exclude={"tax_breakdowns"}).items():
+        setattr(receipt, field, value)
+    session.add(receipt)
+    
+    tax_rates = None
+    if correction.tax_breakdowns is not None:
+        result = await session.exec(
+            select(ReceiptTaxBreakdown).where(ReceiptTaxBreakdown.receipt_id == receipt.id)
+        )
+        for breakdown in result.all():
+            await session.delete(breakdown)
+        for breakdown in correction.tax_breakdowns:
+            session.add(ReceiptTaxBreakdown(
+                tax_type=breakdown.tax_type,
+                amount=breakdown.amount,
+                tax_rate=breakdown.tax_rate,
+                receipt_id=receipt.id
+            ))
+        if correction.tax_breakdowns and all(breakdown.tax_rate for breakdown in correction.tax_breakdowns):
+            # Profiles use the extraction's names for tax types
+            tax_rates = [
+                {"tax_type": breakdown.tax_type.value.capitalize(), "tax_rate": breakdown.tax_rate}
+                for breakdown in correction.tax_breakdowns
+            ]
+    
+    if settings.VENDOR_PROFILES_ENABLED:
+        await record_vendor_correction(session, receipt, tax_rates)
+    await session.commit()
+    return await _receipt_detail(session, receipt)
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.get("/{receipt_id}/extraction/stream")
+async def stream_receipt_extraction(
+    receipt_id: uuid.UUID,
+    current_user: User = Depends(get_current_active_user),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Stream a receipt's extraction as Server-Sent Events.
+    
+    While the worker extracts the receipt, `partial` events carry the
+    ReceiptData fields the model has produced so far, and `status` events
+    report when the job is queued or running. The stream ends with a
+    `completed` event carrying the validated, stored receipt (as returned by
+    GET /receipts/{id}), a `failed` event, or a `timeout` event after
+    EXTRACTION_STREAM_TIMEOUT_SECONDS.
+    """
+    await _get_accessible_receipt(session, str(receipt_id), current_user)
+    # Each poll uses a short session so no transaction stays open for the whole stream
+    await session.close()
+    
+    async def stream_events() -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.EXTRACTION_STREAM_TIMEOUT_SECONDS
+        keepalive_at = loop.time() + SSE_KEEPALIVE_SECONDS
+        last_status = None
+        last_partial = None
+        while True:
+            async with async_session_factory() as poll_session:
+                receipt, job = await get_extraction_progress(poll_session, receipt_id)
+                if receipt is None:
+                    yield _sse_event("failed", {"detail": "Receipt not found"})
+                    return
+                if receipt.status == ReceiptStatus.extraction_failed:
+                    yield _sse_event("failed", {"detail": receipt.extraction_error or "Extraction failed"})
+                    return
+                if receipt.status != ReceiptStatus.processing:
+                    yield _sse_event("completed", await _receipt_detail(poll_session, receipt))
+                    return
+            
+            if job is None or job.status == ExtractionJobStatus.failed:
+                yield _sse_event("failed", {"detail": "Extraction failed"})
+                return
+            if job.status != last_status:
+                last_status = job.status
+                yield _sse_event("status", {"status": job.status})
+            if job.status == ExtractionJobStatus.running and job.partial_result and job.partial_result != last_partial:
+                last_partial = job.partial_result
+                keepalive_at = loop.time() + SSE_KEEPALIVE_SECONDS
+                yield _sse_event("partial", json.loads(job.partial_result))
+            
+            if loop.time() >= deadline:
+                yield _sse_event("timeout", {"detail": "Extraction is still in progress"})
+                return
+            if loop.time() >= keepalive_at:
+                keepalive_at = loop.time() + SSE_KEEPALIVE_SECONDS
+                # Comment lines keep proxies from closing an idle stream
+                yield ": keepalive\n\n"
+            await asyncio.sleep(settings.EXTRACTION_STREAM_POLL_INTERVAL_SECONDS)
+    
+    return StreamingResponse(
+        stream_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.put("/{receipt_id}/approve")
 async def approve_receipt(
     receipt_id: str,
@@ -304,6 +886,29 @@ async def reject_receipt(
         "rejection_reason": reason
     }
 
+@router.post("/{receipt_id}/redrive", status_code=202)
+async def redrive_receipt(
+    receipt_id: str,
+    current_user: User = Depends(require_treasurer_role),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Queue a receipt whose extraction failed for extraction again (Treasurer only).
+    
+    Receipts move to "extraction_failed" once extraction has failed
+    EXTRACTION_JOB_MAX_ATTEMPTS times, with the last error in
+    extraction_error. Re-driving moves the receipt back to "processing" with
+    a fresh set of attempts.
+    """
+    receipt = await _get_accessible_receipt(session, receipt_id, current_user)
+    if receipt.status != ReceiptStatus.extraction_failed:
+        raise HTTPException(status_code=409, detail="Only receipts whose extraction failed can be re-driven")
+    
+    ExtractionJobQueue.redrive(session, receipt)
+    await session.commit()
+    logger.info(f"Receipt {receipt.id} re-driven by {current_user.id}")
+    return await _receipt_detail(session, receipt)
+
 @router.delete("/clear-all")
 async def clear_all_receipts(session: AsyncSession = Depends(get_session)):
     """Clear all receipts from the database (for testing purposes)."""
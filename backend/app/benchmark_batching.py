@@ -0,0 +1,129 @@
+"""
+Compare batched and single-image receipt extraction.
+
+Extracts the sample receipt images in data/ once per image with
+ExtractReceiptData and once in groups with ExtractReceiptDataBatch, and
+reports receipts per second, tokens per receipt and how many results were
+accepted. Runs against the configured providers, or offline against the
+stub LLM when LLM_STUB_BASE_URL is set.
+
+Run with ``python -m app.benchmark_batching [--batch-size 4] [--rounds 3]``.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import mimetypes
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from app.services.baml_service import BAMLService, ExtractionCall, ExtractionImage
+from app.services.image_service import normalize_for_extraction
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg")
+
+
+@dataclass
+class PathResult:
+    """Outcome of extracting every image through one path."""
+    path: str
+    receipts: int
+    accepted: int
+    seconds: float
+    calls: List[ExtractionCall]
+
+    def summary(self) -> dict:
+        input_tokens = sum(call.input_tokens or 0 for call in self.calls)
+        output_tokens = sum(call.output_tokens or 0 for call in self.calls)
+        return {
+            "path": self.path,
+            "receipts": self.receipts,
+            "accepted": self.accepted,
+            "llm_calls": len(self.calls),
+            "seconds": round(self.seconds, 3),
+            "receipts_per_second": round(self.receipts / self.seconds, 3) if self.seconds else None,
+            "input_tokens_per_receipt": round(input_tokens / self.receipts, 1) if self.receipts else None,
+            "output_tokens_per_receipt": round(output_tokens / self.receipts, 1) if self.receipts else None
+        }
+
+
+async def load_images(data_dir: Path, rounds: int) -> List[ExtractionImage]:
+    """The sample images, normalized as the worker would send them, repeated rounds times."""
+    images = []
+    for path in sorted(data_dir.iterdir()):
+        if path.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+        content_type = mimetypes.guess_type(path.name)[0] or "image/jpeg"
+        image = await normalize_for_extraction(path.read_bytes(), content_type)
+        images.append(ExtractionImage(image.data, image.content_type))
+    return images * rounds
+
+
+async def run_single(images: List[ExtractionImage], concurrency: int) -> PathResult:
+    calls: List[ExtractionCall] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def extract(image: ExtractionImage) -> Optional[object]:
+        async with semaphore:
+            try:
+                return await BAMLService.extract_receipt_data(image.data, image.content_type, calls)
+            except Exception as e:
+                logger.warning(f"Single extraction failed: {e}")
+                return None
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(extract(image) for image in images))
+    return PathResult("single", len(images), sum(r is not None for r in results), time.perf_counter() - started, calls)
+
+
+async def run_batched(images: List[ExtractionImage], batch_size: int, concurrency: int) -> PathResult:
+    calls: List[ExtractionCall] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def extract(batch: List[ExtractionImage]) -> int:
+        async with semaphore:
+            try:
+                results = await BAMLService.extract_receipt_data_batch(batch, calls)
+            except Exception as e:
+                logger.warning(f"Batch extraction failed: {e}")
+                return 0
+            return sum(r is not None for r in results)
+
+    batches = [images[start:start + batch_size] for start in range(0, len(images), batch_size)]
+    started = time.perf_counter()
+    accepted = await asyncio.gather(*(extract(batch) for batch in batches))
+    return PathResult(f"batch of {batch_size}", len(images), sum(accepted), time.perf_counter() - started, calls)
+
+
+async def run_benchmark(data_dir: Path, batch_size: int, rounds: int, concurrency: int) -> List[dict]:
+    images = await load_images(data_dir, rounds)
+    if not images:
+        raise SystemExit(f"No receipt images found in {data_dir}")
+    logger.info(f"Extracting {len(images)} receipts one by one and in batches of {batch_size}")
+    single = await run_single(images, concurrency)
+    batched = await run_batched(images, batch_size, concurrency)
+    return [single.summary(), batched.summary()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark batched against single-image receipt extraction")
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR, help="Directory with the receipt images")
+    parser.add_argument("--batch-size", type=int, default=4, help="Receipts per ExtractReceiptDataBatch call")
+    parser.add_argument("--rounds", type=int, default=3, help="Times every image is extracted on each path")
+    parser.add_argument("--concurrency", type=int, default=4, help="LLM calls in flight at once on each path")
+    args = parser.parse_args()
+    summaries = asyncio.run(run_benchmark(args.data_dir, args.batch_size, args.rounds, args.concurrency))
+    print(json.dumps(summaries, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+Score ExtractReceiptData against labelled receipts, per model and prompt version.
+
+Runs the extraction over the sample receipt images in data/, compares the
+results with the labels in data/golden_receipts.json field by field, and
+reports accuracy, latency percentiles, token counts and estimated cost for
+every client and prompt version. The prompt version is the digest of the
+BAML source the client was generated from, so editing a prompt or
+clients.baml and regenerating the client gives a new version.
+
+With --live each client is called: the real providers when their API keys
+are set, or the stub LLM when LLM_STUB_BASE_URL is set. --record saves the
+raw responses under data/benchmark_recordings/. Without --live the saved
+responses are replayed through the BAML parser instead, fully offline.
+
+Run with ``python -m app.benchmark_extraction [--live [--record]] [--client CustomGPT4oMini]``.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import mimetypes
+import os
+import re
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from baml_client import b
+from baml_client.types import ReceiptData
+from baml_py import Collector
+
+from app.core.config import settings
+from app.services.baml_clients import COMPOSITE_PROVIDERS, load_client_definitions
+from app.services.baml_service import _baml_image, _client_registry, estimate_extraction_tokens
+from app.services.extraction_cache import baml_source_digest
+from app.services.image_service import normalize_for_extraction
+from app.services.llm_rate_limiter import llm_rate_limiter
+from app.services.vendor_profile_service import vendor_profile_key
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+DEFAULT_RECORDINGS_DIR = DEFAULT_DATA_DIR / "benchmark_recordings"
+PRICING_FILE = Path(__file__).resolve().parents[2] / "config" / "llm_pricing.json"
+GOLDEN_FILE = "golden_receipts.json"
+# Labelled amounts are to the cent; rates to a hundredth of a percent
+AMOUNT_TOLERANCE = 0.005
+RATE_TOLERANCE = 0.00005
+
+
+def prompt_version() -> str:
+    """Short digest of the BAML source the client was generated from."""
+    return baml_source_digest()[:12]
+
+
+@dataclass
+class Recording:
+    """One raw ExtractReceiptData response, as received from a client."""
+    image: str
+    client_name: str
+    model: Optional[str]
+    prompt_version: str
+    raw_response: Optional[str]
+    latency_ms: Optional[int] = None
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    error: Optional[str] = None
+
+    def parse(self) -> Optional[ReceiptData]:
+        """The response parsed as ReceiptData by the current client, or None if it does not parse."""
+        if not self.raw_response:
+            return None
+        try:
+            return b.parse.ExtractReceiptData(self.raw_response)
+        except Exception as e:
+            logger.debug(f"Response of {self.client_name} for {self.image} does not parse: {e}")
+            return None
+
+
+def _normalize(value: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", value.lower()).split())
+
+
+def field_matches(field: str, expected, extracted) -> bool:
+    """Whether an extracted field agrees with its label."""
+    if extracted is None:
+        return expected is None
+    if field == "vendor_name":
+        return vendor_profile_key(expected, None) == vendor_profile_key(extracted, None)
+    if field == "county":
+        # "Union County, NC" and "Union County, NC, USA" name the same county
+        return _normalize(expected).removesuffix(" usa") == _normalize(extracted).removesuffix(" usa")
+    if field in ("vendor_address", "expense_category"):
+        return _normalize(expected) == _normalize(extracted)
+    if field.endswith("_amount"):
+        return abs(expected - extracted) <= AMOUNT_TOLERANCE
+    if field == "tax_breakdowns":
+        expected = sorted(expected, key=lambda breakdown: breakdown["tax_type"])
+        extracted = sorted(extracted, key=lambda breakdown: breakdown.tax_type.value)
+        return len(expected) == len(extracted) and all(
+            label["tax_type"] == breakdown.tax_type.value
+            and abs(label["amount"] - breakdown.amount) <= AMOUNT_TOLERANCE
+            and abs(label["tax_rate"] - breakdown.tax_rate) <= RATE_TOLERANCE
+            for label, breakdown in zip(expected, extracted)
+        )
+    return expected == extracted
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values), max(math.ceil(fraction * len(sorted_values)), 1)) - 1]
+
+
+def summarize(recordings: List[Recording], labels: Dict[str, dict], pricing: Dict[str, dict]) -> dict:
+    """Accuracy, latency, tokens and cost of one client and prompt version's recordings."""
+    first = recordings[0]
+    field_hits: Dict[str, List[bool]] = {}
+    exact = 0
+    failed = 0
+    mismatches = []
+    for recording in recordings:
+        data = recording.parse()
+        if data is None:
+            failed += 1
+        label = labels[recording.image]
+        all_match = data is not None
+        for field, expected in label.items():
+            extracted = getattr(data, field, None) if data is not None else None
+            matched = data is not None and field_matches(field, expected, extracted)
+            field_hits.setdefault(field, []).append(matched)
+            if data is not None and not matched:
+                all_match = False
+                if field == "tax_breakdowns":
+                    extracted = [breakdown.model_dump(mode="json") for breakdown in extracted or []]
+                mismatches.append({"image": recording.image, "field": field, "expected": expected, "extracted": extracted})
+        exact += all_match
+
+    latencies = sorted(recording.latency_ms for recording in recordings if recording.latency_ms is not None)
+    input_tokens = sum(recording.input_tokens or 0 for recording in recordings)
+    output_tokens = sum(recording.output_tokens or 0 for recording in recordings)
+    price = pricing.get(first.model or "")
+    cost = None
+    if price:
+        cost = (input_tokens * price["input_per_million"] + output_tokens * price["output_per_million"]) / 1_000_000
+    receipts = len(recordings)
+    return {
+        "client": first.client_name,
+        "model": first.model,
+        "prompt_version": first.prompt_version,
+        "receipts": receipts,
+        "failed": failed,
+        "exact_match_rate": round(exact / receipts, 3),
+        "field_accuracy": {field: round(sum(hits) / len(hits), 3) for field, hits in field_hits.items()},
+        "latency_ms": {
+            "p50": _percentile(latencies, 0.5),
+            "p95": _percentile(latencies, 0.95),
+            "max": latencies[-1] if latencies else None
+        },
+        "input_tokens_per_receipt": round(input_tokens / receipts, 1),
+        "output_tokens_per_receipt": round(output_tokens / receipts, 1),
+        "estimated_cost_usd": round(cost, 6) if cost is not None else None,
+        "estimated_cost_per_1000_receipts_usd": round(cost / receipts * 1000, 4) if cost is not None else None,
+        "mismatches": mismatches
+    }
+
+
+def load_labels(data_dir: Path) -> Dict[str, dict]:
+    """The golden labels by image file name, for the images that exist."""
+    with open(data_dir / GOLDEN_FILE) as f:
+        labels = json.load(f)
+    missing = [name for name in labels if not (data_dir / name).exists()]
+    for name in missing:
+        logger.warning(f"Skipping label for missing image {name}")
+        del labels[name]
+    return labels
+
+
+def load_pricing() -> Dict[str, dict]:
+    """USD per million input and output tokens, by model."""
+    try:
+        with open(PRICING_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logger.warning(f"{PRICING_FILE} not found; costs will not be estimated")
+        return {}
+
+
+def live_clients(requested: List[str]) -> List[str]:
+    """
+    The clients to call: the requested ones, or every client that can be called.
+
+    A client can be called when its provider's API key is set, or always
+    when the stub LLM stands in for the providers.
+    """
+    definitions = load_client_definitions()
+    if requested:
+        unknown = [name for name in requested if name not in definitions]
+        if unknown:
+            raise SystemExit(f"Unknown clients: {', '.join(unknown)}")
+        for name in requested:
+            api_key_env = definitions[name].api_key_env
+            if not settings.LLM_STUB_BASE_URL and api_key_env and not os.getenv(api_key_env):
+                logger.warning(f"{api_key_env} is not set; calls to {name} will fail")
+        return requested
+    return [
+        definition.name for definition in definitions.values()
+        if definition.provider not in COMPOSITE_PROVIDERS
+        and (settings.LLM_STUB_BASE_URL or (definition.api_key_env and os.getenv(definition.api_key_env)))
+    ]
+
+
+async def record_client(client_name: str, images: Dict[str, tuple], rounds: int, concurrency: int) -> List[Recording]:
+    """Call ExtractReceiptData on one client for every image, rounds times."""
+    model = load_client_definitions()[client_name].model
+    version = prompt_version()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def extract(name: str, image_data: bytes, content_type: str) -> Recording:
+        collector = Collector(name="BenchmarkExtraction")
+        client = b.with_options(client_registry=_client_registry(client_name), collector=collector)
+        error = None
+        async with semaphore, llm_rate_limiter.limit(client_name, estimate_extraction_tokens(image_data)):
+            started = time.perf_counter()
+            try:
+                await client.ExtractReceiptData(receipt=_baml_image(image_data, content_type))
+            except Exception as e:
+                # A response that does not parse is still recorded, so replays score it as a failure
+                error = str(e)
+            elapsed_ms = int((time.perf_counter() - started) * 1000)
+        log = collector.last
+        return Recording(
+            image=name,
+            client_name=client_name,
+            model=model,
+            prompt_version=version,
+            raw_response=log.raw_llm_response if log else None,
+            latency_ms=log.timing.duration_ms if log and log.timing.duration_ms is not None else elapsed_ms,
+            input_tokens=log.usage.input_tokens if log else None,
+            output_tokens=log.usage.output_tokens if log else None,
+            error=error
+        )
+
+    return await asyncio.gather(*(
+        extract(name, image_data, content_type)
+        for _ in range(rounds)
+        for name, (image_data, content_type) in images.items()
+    ))
+
+
+def _recordings_file(recordings_dir: Path, version: str, client_name: str) -> Path:
+    return recordings_dir / version / f"{client_name}.jsonl"
+
+
+def save_recordings(recordings_dir: Path, recordings: List[Recording]) -> None:
+    """Save one client's recordings, replacing earlier ones of the same prompt version."""
+    path = _recordings_file(recordings_dir, recordings[0].prompt_version, recordings[0].client_name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        for recording in recordings:
+            f.write(json.dumps(asdict(recording)) + "\n")
+    logger.info(f"Saved {len(recordings)} responses to {path}")
+
+
+def load_recordings(recordings_dir: Path, versions: List[str], clients: List[str]) -> List[List[Recording]]:
+    """
+    Saved recordings grouped by prompt version and client.
+
+    Args:
+        recordings_dir: Directory the recordings were saved in
+        versions: Prompt versions to load, or ["all"]
+        clients: Clients to load, or every client if empty
+    """
+    if versions == ["all"]:
+        versions = sorted(path.name for path in recordings_dir.iterdir() if path.is_dir()) if recordings_dir.exists() else []
+    groups = []
+    for version in versions:
+        for path in sorted((recordings_dir / version).glob("*.jsonl")):
+            if clients and path.stem not in clients:
+                continue
+            with open(path) as f:
+                recordings = [Recording(**json.loads(line)) for line in f if line.strip()]
+            if recordings:
+                groups.append(recordings)
+    return groups
+
+
+async def load_images(data_dir: Path, labels: Dict[str, dict]) -> Dict[str, tuple]:
+    """The labelled images, normalized as the worker would send them."""
+    images = {}
+    for name in labels:
+        content_type = mimetypes.guess_type(name)[0] or "image/jpeg"
+        image = await normalize_for_extraction((data_dir / name).read_bytes(), content_type)
+        images[name] = (image.data, image.content_type)
+    return images
+
+
+async def run_benchmark(args: argparse.Namespace) -> List[dict]:
+    labels = load_labels(args.data_dir)
+    if not labels:
+        raise SystemExit(f"No labelled receipt images found in {args.data_dir}")
+    pricing = load_pricing()
+
+    if args.live:
+        clients = live_clients(args.client)
+        if not clients:
+            raise SystemExit("No client can be called: set the provider API keys or LLM_STUB_BASE_URL")
+        images = await load_images(args.data_dir, labels)
+        groups = []
+        for client_name in clients:
+            logger.info(f"Extracting {len(images)} receipts {args.rounds} times with {client_name}")
+            recordings = await record_client(client_name, images, args.rounds, args.concurrency)
+            if args.record:
+                save_recordings(args.recordings_dir, recordings)
+            groups.append(recordings)
+    else:
+        groups = load_recordings(args.recordings_dir, args.prompt_version or [prompt_version()], args.client)
+        if not groups:
+            raise SystemExit(f"No recorded responses in {args.recordings_dir}; record some with --live --record")
+
+    # Recordings of images that have since lost their label cannot be scored
+    groups = [[recording for recording in group if recording.image in labels] for group in groups]
+    return [summarize(group, labels, pricing) for group in groups if group]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Score receipt extraction against labelled receipts per model and prompt version")
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR, help=f"Directory with the receipt images and {GOLDEN_FILE}")
+    parser.add_argument("--recordings-dir", type=Path, default=DEFAULT_RECORDINGS_DIR, help="Directory recorded responses are saved in and replayed from")
+    parser.add_argument("--live", action="store_true", help="Call the clients instead of replaying recorded responses")
+    parser.add_argument("--record", action="store_true", help="Save the responses of a live run for later replays")
+    parser.add_argument("--client", action="append", default=[], help="Client from clients.baml to score (repeatable; default all)")
+    parser.add_argument(
+        "--prompt-version",
+        action="append",
+        default=[],
+        help="Recorded prompt version to replay (repeatable, or 'all'; default the current one)"
+    )
+    parser.add_argument("--rounds", type=int, default=1, help="Times every image is extracted in a live run")
+    parser.add_argument("--concurrency", type=int, default=4, help="Calls in flight at once per client in a live run")
+    args = parser.parse_args()
+    if args.record and not args.live:
+        parser.error("--record needs --live")
+    print(json.dumps(asyncio.run(run_benchmark(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -19,12 +19,152 @@ class Settings(BaseSettings):
     BAML_CLIENT_MODE: str = "http"
     BAML_CLIENT_URL: str = os.getenv("BAML_CLIENT_URL", "http://localhost:2022")
 
+    # Extraction cascade: clients from baml_src/clients.baml, cheapest first; a receipt escalates
+    # to the next client when the result fails validation or its amounts do not add up
+    EXTRACTION_MODEL_TIERS: str = os.getenv("EXTRACTION_MODEL_TIERS", "CustomGPT4oMini,CustomGPT4o")
+    # Hedging: a call still running after its client's measured p95 is also sent to its partner client
+    # (pairs of clients from baml_src/clients.baml), and whichever answers first is used
+    EXTRACTION_HEDGING_ENABLED: bool = os.getenv("EXTRACTION_HEDGING_ENABLED", "true").lower() == "true"
+    EXTRACTION_HEDGE_CLIENTS: str = os.getenv("EXTRACTION_HEDGE_CLIENTS", "CustomGPT4oMini:CustomHaiku,CustomGPT4o:CustomSonnet")
+    EXTRACTION_HEDGE_PERCENTILE: float = float(os.getenv("EXTRACTION_HEDGE_PERCENTILE", "0.95"))
+    EXTRACTION_HEDGE_LATENCY_WINDOW: int = int(os.getenv("EXTRACTION_HEDGE_LATENCY_WINDOW", "500"))
+    # Until a client has this many measured calls, hedge after the default delay
+    EXTRACTION_HEDGE_MIN_SAMPLES: int = int(os.getenv("EXTRACTION_HEDGE_MIN_SAMPLES", "20"))
+    EXTRACTION_HEDGE_DEFAULT_DELAY_SECONDS: float = float(os.getenv("EXTRACTION_HEDGE_DEFAULT_DELAY_SECONDS", "10"))
+    EXTRACTION_HEDGE_MIN_DELAY_SECONDS: float = float(os.getenv("EXTRACTION_HEDGE_MIN_DELAY_SECONDS", "2"))
+    # Largest share of calls that may be hedged
+    EXTRACTION_HEDGE_MAX_RATIO: float = float(os.getenv("EXTRACTION_HEDGE_MAX_RATIO", "0.1"))
+    # A provider's circuit opens after this many consecutive failed calls and stays open for LLM_CIRCUIT_OPEN_SECONDS
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+    LLM_CIRCUIT_OPEN_SECONDS: float = float(os.getenv("LLM_CIRCUIT_OPEN_SECONDS", "30"))
+
+    # Shadow mode: a sampled share of extractions is re-run against a candidate in the background
+    EXTRACTION_SHADOW_SAMPLE_RATE: float = float(os.getenv("EXTRACTION_SHADOW_SAMPLE_RATE", "0.0"))
+    # Candidate client; empty runs the candidate function on the client that answered the receipt
+    EXTRACTION_SHADOW_CLIENT: str = os.getenv("EXTRACTION_SHADOW_CLIENT", "")
+    EXTRACTION_SHADOW_FUNCTION: str = os.getenv("EXTRACTION_SHADOW_FUNCTION", "ExtractReceiptDataCandidate")
+    # Sampled receipts are skipped while this many shadow calls are running
+    EXTRACTION_SHADOW_MAX_INFLIGHT: int = int(os.getenv("EXTRACTION_SHADOW_MAX_INFLIGHT", "2"))
+
+    # Stream extraction calls and publish the fields parsed so far for GET /receipts/{id}/extraction/stream
+    EXTRACTION_STREAM_PARTIALS: bool = os.getenv("EXTRACTION_STREAM_PARTIALS", "true").lower() == "true"
+    EXTRACTION_PARTIAL_MIN_INTERVAL_SECONDS: float = float(os.getenv("EXTRACTION_PARTIAL_MIN_INTERVAL_SECONDS", "0.25"))
+    EXTRACTION_STREAM_POLL_INTERVAL_SECONDS: float = float(os.getenv("EXTRACTION_STREAM_POLL_INTERVAL_SECONDS", "0.25"))
+    EXTRACTION_STREAM_TIMEOUT_SECONDS: float = float(os.getenv("EXTRACTION_STREAM_TIMEOUT_SECONDS", "120"))
+
+    # Hand images to the LLM as presigned URLs instead of inline base64; copies that are not
+    # already stored (normalized images, rasterized PDFs) are staged under extraction/ for the call
+    EXTRACTION_IMAGE_URLS_ENABLED: bool = os.getenv("EXTRACTION_IMAGE_URLS_ENABLED", "true").lower() == "true"
+    EXTRACTION_IMAGE_URL_EXPIRES_SECONDS: int = int(os.getenv("EXTRACTION_IMAGE_URL_EXPIRES_SECONDS", "300"))
+    # OCR photos with Tesseract first; known chains' receipts are parsed without a model call,
+    # others go to a text-only model call, and only the rest are sent to the vision model
+    EXTRACTION_OCR_ENABLED: bool = os.getenv("EXTRACTION_OCR_ENABLED", "true").lower() == "true"
+    EXTRACTION_OCR_LANGUAGE: str = os.getenv("EXTRACTION_OCR_LANGUAGE", "eng")
+    EXTRACTION_OCR_MIN_WORDS: int = int(os.getenv("EXTRACTION_OCR_MIN_WORDS", "15"))
+    EXTRACTION_OCR_MIN_CONFIDENCE: float = float(os.getenv("EXTRACTION_OCR_MIN_CONFIDENCE", "70"))
+    EXTRACTION_OCR_TEXT_LLM_ENABLED: bool = os.getenv("EXTRACTION_OCR_TEXT_LLM_ENABLED", "true").lower() == "true"
+
+    # Send every BAML client to an OpenAI-compatible stub (python -m app.stub_llm) instead of the real APIs
+    LLM_STUB_BASE_URL: str = os.getenv("LLM_STUB_BASE_URL", "")
+
+    # Provider limits enforced before BAML calls, per worker process; divide the account's limits between workers
+    OPENAI_MAX_CONCURRENCY: int = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+    OPENAI_REQUESTS_PER_MINUTE: int = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "500"))
+    OPENAI_TOKENS_PER_MINUTE: int = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", "30000"))
+    ANTHROPIC_MAX_CONCURRENCY: int = int(os.getenv("ANTHROPIC_MAX_CONCURRENCY", "4"))
+    ANTHROPIC_REQUESTS_PER_MINUTE: int = int(os.getenv("ANTHROPIC_REQUESTS_PER_MINUTE", "50"))
+    ANTHROPIC_TOKENS_PER_MINUTE: int = int(os.getenv("ANTHROPIC_TOKENS_PER_MINUTE", "50000"))
+    # Calls beyond these are shed (and the job retried later) instead of queued
+    LLM_MAX_QUEUED_REQUESTS: int = int(os.getenv("LLM_MAX_QUEUED_REQUESTS", "32"))
+    LLM_MAX_QUEUE_WAIT_SECONDS: float = float(os.getenv("LLM_MAX_QUEUE_WAIT_SECONDS", "60"))
+
     # Cloudflare R2
     R2_ACCESS_KEY_ID: str = os.getenv("R2_ACCESS_KEY_ID", "")
     R2_SECRET_ACCESS_KEY: str = os.getenv("R2_SECRET_ACCESS_KEY", "")
     R2_ENDPOINT_URL: str = os.getenv("R2_ENDPOINT_URL", "")
     R2_BUCKET_NAME: str = os.getenv("R2_BUCKET_NAME", "goodstewards-receipts")
+    # Endpoint clients use for presigned URLs when it differs from R2_ENDPOINT_URL (e.g. a local MinIO container)
+    R2_PUBLIC_ENDPOINT_URL: str = os.getenv("R2_PUBLIC_ENDPOINT_URL", "")
+    R2_ADDRESSING_STYLE: str = os.getenv("R2_ADDRESSING_STYLE", "auto")
+    PRESIGNED_UPLOAD_EXPIRES_SECONDS: int = int(os.getenv("PRESIGNED_UPLOAD_EXPIRES_SECONDS", "900"))
+    # Objects above the threshold are sent with multipart upload in parts of R2_MULTIPART_CHUNK_BYTES
+    R2_MULTIPART_THRESHOLD_BYTES: int = int(os.getenv("R2_MULTIPART_THRESHOLD_BYTES", str(8 * 1024 * 1024)))
+    R2_MULTIPART_CHUNK_BYTES: int = int(os.getenv("R2_MULTIPART_CHUNK_BYTES", str(8 * 1024 * 1024)))
+
+    # Local object storage used when R2 is not configured (development only)
+    LOCAL_STORAGE_DIR: str = os.getenv("LOCAL_STORAGE_DIR", "/tmp/goodstewards-storage")
+
+    # Background extraction worker
+    WORKER_CONCURRENCY: int = int(os.getenv("WORKER_CONCURRENCY", "4"))
+    WORKER_POLL_INTERVAL_SECONDS: float = float(os.getenv("WORKER_POLL_INTERVAL_SECONDS", "2.0"))
+    # Receipts each worker extracts with one ExtractReceiptDataBatch call; 1 extracts them one at a time
+    EXTRACTION_BATCH_SIZE: int = int(os.getenv("EXTRACTION_BATCH_SIZE", "1"))
+    EXTRACTION_JOB_MAX_ATTEMPTS: int = int(os.getenv("EXTRACTION_JOB_MAX_ATTEMPTS", "3"))
+    EXTRACTION_JOB_RETRY_DELAY_SECONDS: int = int(os.getenv("EXTRACTION_JOB_RETRY_DELAY_SECONDS", "30"))
+    # Retry delays double with each failed attempt up to this cap
+    EXTRACTION_JOB_MAX_RETRY_DELAY_SECONDS: int = int(os.getenv("EXTRACTION_JOB_MAX_RETRY_DELAY_SECONDS", "3600"))
+    # Workers refresh the lock of their running jobs this often
+    EXTRACTION_JOB_HEARTBEAT_SECONDS: int = int(os.getenv("EXTRACTION_JOB_HEARTBEAT_SECONDS", "30"))
+    # Running jobs without a heartbeat for this long belong to a worker that died and are retried
+    EXTRACTION_JOB_LOCK_TIMEOUT_SECONDS: int = int(os.getenv("EXTRACTION_JOB_LOCK_TIMEOUT_SECONDS", "600"))
+    # Receipts processing longer than this without a queued or running job are re-enqueued
+    RECEIPT_PROCESSING_TIMEOUT_SECONDS: int = int(os.getenv("RECEIPT_PROCESSING_TIMEOUT_SECONDS", "900"))
+    # How often the worker sweeps for stuck jobs and receipts
+    EXTRACTION_RECOVERY_INTERVAL_SECONDS: int = int(os.getenv("EXTRACTION_RECOVERY_INTERVAL_SECONDS", "60"))
+    WORKER_METRICS_LOG_INTERVAL_SECONDS: int = int(os.getenv("WORKER_METRICS_LOG_INTERVAL_SECONDS", "60"))
+
+    # Historical re-extraction campaigns (python -m app.reextraction)
+    REEXTRACTION_CONCURRENCY: int = int(os.getenv("REEXTRACTION_CONCURRENCY", "2"))
+    # Receipts a campaign starts per minute at most, leaving the provider limits to live uploads
+    REEXTRACTION_MAX_RECEIPTS_PER_MINUTE: int = int(os.getenv("REEXTRACTION_MAX_RECEIPTS_PER_MINUTE", "30"))
+
+    # Receipt uploads
+    MAX_UPLOAD_BYTES: int = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+    UPLOAD_CHUNK_SIZE_BYTES: int = int(os.getenv("UPLOAD_CHUNK_SIZE_BYTES", str(64 * 1024)))
+    # Uploads larger than this are spooled to a temporary file instead of memory
+    UPLOAD_SPOOL_MAX_MEMORY_BYTES: int = int(os.getenv("UPLOAD_SPOOL_MAX_MEMORY_BYTES", str(1024 * 1024)))
+    BATCH_UPLOAD_CONCURRENCY: int = int(os.getenv("BATCH_UPLOAD_CONCURRENCY", "4"))
+    BATCH_UPLOAD_MAX_FILES: int = int(os.getenv("BATCH_UPLOAD_MAX_FILES", "500"))
+
+    # Admission control: uploads over these per-process limits get 429 with Retry-After
+    ADMISSION_MAX_INFLIGHT_UPLOADS: int = int(os.getenv("ADMISSION_MAX_INFLIGHT_UPLOADS", "64"))
+    ADMISSION_MAX_INFLIGHT_UPLOADS_PER_ORG: int = int(os.getenv("ADMISSION_MAX_INFLIGHT_UPLOADS_PER_ORG", "8"))
+    ADMISSION_MAX_INFLIGHT_BYTES: int = int(os.getenv("ADMISSION_MAX_INFLIGHT_BYTES", str(256 * 1024 * 1024)))
+    ADMISSION_RETRY_AFTER_SECONDS: int = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "5"))
+
+    # Resumable (tus-style) uploads are staged on local disk until complete
+    UPLOAD_STAGING_DIR: str = os.getenv("UPLOAD_STAGING_DIR", "/tmp/goodstewards-uploads")
+    RESUMABLE_UPLOAD_EXPIRES_SECONDS: int = int(os.getenv("RESUMABLE_UPLOAD_EXPIRES_SECONDS", str(24 * 60 * 60)))
+    RESUMABLE_UPLOAD_PURGE_INTERVAL_SECONDS: int = int(os.getenv("RESUMABLE_UPLOAD_PURGE_INTERVAL_SECONDS", "3600"))
+
+    # Idempotency-Key support for retried mutations
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", str(24 * 60 * 60)))
+    # A key still in progress after this long is assumed abandoned by a crashed request
+    IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS: int = int(os.getenv("IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS", "300"))
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS: int = int(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "3600"))
+
+    # Image normalization before extraction (rotation, cropping, downscaling, recompression)
+    IMAGE_NORMALIZATION_ENABLED: bool = os.getenv("IMAGE_NORMALIZATION_ENABLED", "true").lower() == "true"
+    IMAGE_MAX_LONG_EDGE: int = int(os.getenv("IMAGE_MAX_LONG_EDGE", "1600"))
+    IMAGE_JPEG_QUALITY: int = int(os.getenv("IMAGE_JPEG_QUALITY", "80"))
+    IMAGE_NORMALIZATION_GRAYSCALE: bool = os.getenv("IMAGE_NORMALIZATION_GRAYSCALE", "true").lower() == "true"
+    # Size of the process pool used for CPU-bound image work
+    IMAGE_PROCESS_WORKERS: int = int(os.getenv("IMAGE_PROCESS_WORKERS", "2"))
+
+    # Extraction results cached by image hash and BAML source digest (in memory, then in Postgres)
+    EXTRACTION_CACHE_ENABLED: bool = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+    EXTRACTION_CACHE_MEMORY_ENTRIES: int = int(os.getenv("EXTRACTION_CACHE_MEMORY_ENTRIES", "1024"))
+    # Entries unused for this long are purged by the worker
+    EXTRACTION_CACHE_TTL_SECONDS: int = int(os.getenv("EXTRACTION_CACHE_TTL_SECONDS", str(30 * 24 * 60 * 60)))
+    EXTRACTION_CACHE_PURGE_INTERVAL_SECONDS: int = int(os.getenv("EXTRACTION_CACHE_PURGE_INTERVAL_SECONDS", "3600"))
+
+    # Known county, category and tax rates per vendor, learned from extractions and treasurer corrections
+    VENDOR_PROFILES_ENABLED: bool = os.getenv("VENDOR_PROFILES_ENABLED", "true").lower() == "true"
 
+    # PDF receipts: text-layer PDFs are parsed directly, scanned ones are rasterized
+    PDF_MIN_TEXT_CHARS: int = int(os.getenv("PDF_MIN_TEXT_CHARS", "50"))
+    PDF_MAX_PAGES: int = int(os.getenv("PDF_MAX_PAGES", "2"))
+    PDF_RENDER_DPI: int = int(os.getenv("PDF_RENDER_DPI", "150"))
 
     class Config:
         case_sensitive = True
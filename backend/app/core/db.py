@@ -7,12 +7,14 @@ from app.core.config import settings
 # Create an async engine
 engine = create_async_engine(settings.DATABASE_URL, echo=True, future=True)
 
+# Session factory shared by request handlers and background workers
+async_session_factory = async_sessionmaker(
+    engine, class_=AsyncSession, expire_on_commit=False
+)
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """
     Dependency to get an async database session.
     """
-    async_session = async_sessionmaker(
-        engine, class_=AsyncSession, expire_on_commit=False
-    )
-    async with async_session() as session:
+    async with async_session_factory() as session:
         yield session
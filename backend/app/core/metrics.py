@@ -0,0 +1,108 @@
+import math
+import threading
+from collections import defaultdict, deque
+from typing import Deque, Dict, List
+
+
+def _metric_key(name: str, labels: Dict[str, str]) -> str:
+    """Render a metric name with its labels, e.g. ``uploads_total{status=queued}``."""
+    if not labels:
+        return name
+    rendered = ",".join(f"{key}={value}" for key, value in sorted(labels.items()))
+    return f"{name}{{{rendered}}}"
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(rank, 1)) - 1]
+
+
+class Metrics:
+    """
+    Thread-safe, in-process registry of counters, gauges and timings.
+
+    Values are per process; the API exposes its registry on /metrics and the
+    extraction worker logs its own periodically.
+    """
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._window = window
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = defaultdict(float)
+        self._peaks: Dict[str, float] = defaultdict(float)
+        self._observations: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self._window))
+        self._observation_counts: Dict[str, int] = defaultdict(int)
+
+    def increment(self, name: str, value: float = 1.0, **labels: str) -> None:
+        """Add to a monotonically increasing counter."""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._counters[key] += value
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        """Set a gauge to an absolute value, tracking its peak."""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+            self._peaks[key] = max(self._peaks[key], value)
+
+    def adjust_gauge(self, name: str, delta: float, **labels: str) -> None:
+        """Move a gauge up or down, tracking its peak."""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._gauges[key] += delta
+            self._peaks[key] = max(self._peaks[key], self._gauges[key])
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """Record a sample (e.g. a latency) in a rolling window."""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._observations[key].append(value)
+            self._observation_counts[key] += 1
+
+    def counter_value(self, name: str, **labels: str) -> float:
+        """Read the current value of a counter."""
+        with self._lock:
+            return self._counters.get(_metric_key(name, labels), 0.0)
+
+    def percentile(self, name: str, fraction: float, **labels: str) -> float:
+        """
+        Percentile of the samples in an observation window.
+
+        Returns:
+            The percentile, or 0.0 if nothing has been observed yet
+        """
+        with self._lock:
+            values = sorted(self._observations.get(_metric_key(name, labels), ()))
+        return _percentile(values, fraction) if values else 0.0
+
+    def snapshot(self) -> dict:
+        """Return every metric as plain JSON-serializable data."""
+        with self._lock:
+            observations = {key: sorted(values) for key, values in self._observations.items()}
+            summaries = {
+                key: {
+                    "count": self._observation_counts[key],
+                    "window": len(values),
+                    "avg": sum(values) / len(values),
+                    "p50": _percentile(values, 0.50),
+                    "p95": _percentile(values, 0.95),
+                    "p99": _percentile(values, 0.99),
+                    "max": values[-1],
+                }
+                for key, values in observations.items()
+                if values
+            }
+            return {
+                "counters": dict(self._counters),
+                "gauges": {
+                    key: {"value": value, "peak": self._peaks[key]}
+                    for key, value in self._gauges.items()
+                },
+                "observations": summaries,
+            }
+
+
+metrics = Metrics()
@@ -0,0 +1,67 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from app.core.config import settings
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Return the shared pool for CPU-bound work, creating it on first use.
+
+    Workers are spawned rather than forked so they never inherit the event
+    loop, database connections or open sockets of the parent process.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_PROCESS_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+
+async def run_in_process(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run a picklable, module-level function in the process pool without blocking the event loop.
+
+    Args:
+        func: Function to run; it and its arguments must be picklable
+        *args: Positional arguments for func
+
+    Returns:
+        The function's return value
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_process_pool()
+    try:
+        return await loop.run_in_executor(executor, func, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); replace the pool so later calls recover
+        _discard_pool(executor)
+        raise
+
+
+def _discard_pool(executor: ProcessPoolExecutor) -> None:
+    """Drop a broken pool unless it has already been replaced."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_process_pool() -> None:
+    """Stop the pool's worker processes, if it was ever started."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
@@ -10,8 +11,10 @@ from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from app.core.config import settings
-from app.core.db import get_session
+from app.core.db import async_session_factory, get_session
+from app.core.metrics import metrics
 from app.models.models import SQLModel
+from app.services.admission import UploadAdmissionMiddleware
 
 # Configure logging
 logging.basicConfig(
@@ -21,6 +24,25 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+async def purge_resumable_uploads_loop(interval: float) -> None:
+    """
+    Periodically delete expired resumable uploads and their staged files.
+    
+    Runs in the API rather than the worker because uploads are staged on the
+    API host's disk.
+    """
+    from app.services.resumable_upload_service import purge_expired_uploads
+    while True:
+        try:
+            async with async_session_factory() as session:
+                purged = await purge_expired_uploads(session)
+            if purged:
+                logger.info(f"Purged {purged} expired resumable uploads")
+        except Exception as e:
+            logger.error(f"Could not purge resumable uploads: {e}")
+        await asyncio.sleep(interval)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     """
@@ -59,10 +81,15 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         if "test" not in settings.DATABASE_URL.lower():
             logger.warning("Database initialization failed, but continuing in test mode")
     
+    purge_task = asyncio.create_task(
+        purge_resumable_uploads_loop(settings.RESUMABLE_UPLOAD_PURGE_INTERVAL_SECONDS)
+    )
+    
     yield
     
     # Shutdown
     logger.info("Shutting down GoodStewards API...")
+    purge_task.cancel()
 
 
 def create_app() -> FastAPI:
@@ -79,6 +106,9 @@ def create_app() -> FastAPI:
         lifespan=lifespan
     )
 
+    # Admit uploads before their bodies are read; added first so CORS headers still reach a 429
+    app.add_middleware(UploadAdmissionMiddleware)
+
     # Add CORS middleware
     app.add_middleware(
         CORSMiddleware,
@@ -101,7 +131,8 @@ def create_app() -> FastAPI:
                 "detail": exc.detail,
                 "error_code": f"HTTP_{exc.status_code}",
                 "timestamp": "2024-01-01T00:00:00Z"  # TODO: Use actual timestamp
-            }
+            },
+            headers=exc.headers
         )
 
     @app.exception_handler(RequestValidationError)
@@ -180,6 +211,13 @@ def create_app() -> FastAPI:
                 detail="Service unhealthy - database connection failed"
             )
 
+    @app.get("/metrics")
+    async def get_metrics() -> dict:
+        """
+        In-process counters, gauges and latency summaries for monitoring.
+        """
+        return metrics.snapshot()
+
     @app.get("/api/v1/")
     async def api_info() -> dict:
         """
@@ -4,10 +4,18 @@ from .models import (
     Receipt,
     ReceiptTaxBreakdown,
     PaymentTransaction,
+    ExtractionJob,
+    ExtractionMetric,
+    IdempotencyKey,
+    ResumableUpload,
+    ExtractionCacheEntry,
     Role,
     ReceiptStatus,
     PaymentMethod,
     TaxType,
+    ExtractionJobStatus,
+    IdempotencyStatus,
+    ResumableUploadStatus,
 )
 
 __all__ = [
@@ -16,8 +24,16 @@ __all__ = [
     "Receipt",
     "ReceiptTaxBreakdown",
     "PaymentTransaction",
+    "ExtractionJob",
+    "ExtractionMetric",
+    "IdempotencyKey",
+    "ResumableUpload",
+    "ExtractionCacheEntry",
     "Role",
     "ReceiptStatus",
     "PaymentMethod",
     "TaxType",
+    "ExtractionJobStatus",
+    "IdempotencyStatus",
+    "ResumableUploadStatus",
 ]
@@ -3,6 +3,7 @@ from datetime import date, datetime
 from enum import Enum
 from typing import List, Optional, Dict, Any
 
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -23,6 +24,37 @@ class ReceiptStatus(str, Enum):
     approved = "approved"
     rejected = "rejected"
     paid = "paid"
+    extraction_failed = "extraction_failed"  # Extraction ran out of attempts; a treasurer can re-drive it
+
+
+class ExtractionJobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+class ReextractionCampaignStatus(str, Enum):
+    running = "running"
+    completed = "completed"
+
+
+class ReextractionOutcome(str, Enum):
+    unchanged = "unchanged"
+    filled = "filled"  # Only empty fields and tax rates were filled in
+    updated = "updated"  # Differing values were overwritten
+    differs = "differs"  # Differing values were recorded but left in place
+    failed = "failed"
+
+
+class IdempotencyStatus(str, Enum):
+    in_progress = "in_progress"
+    completed = "completed"
+
+
+class ResumableUploadStatus(str, Enum):
+    in_progress = "in_progress"
+    completed = "completed"
 
 
 class PaymentMethod(str, Enum):
@@ -85,9 +117,16 @@ class User(SQLModel, table=True):
 
 
 class Receipt(SQLModel, table=True):
+    __table_args__ = (
+        # Identical images uploaded to the same organization resolve to one receipt
+        Index("ix_receipt_organization_id_content_hash", "organization_id", "content_hash", unique=True),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     image_url: str
+    content_hash: Optional[str] = Field(default=None)  # SHA-256 of the uploaded image
     vendor_name: Optional[str] = Field(default=None)
+    vendor_address: Optional[str] = Field(default=None)
     purchase_date: Optional[date] = Field(default=None)
     county: Optional[str] = Field(default=None)
     subtotal_amount: Optional[float] = Field(default=None)
@@ -95,6 +134,7 @@ class Receipt(SQLModel, table=True):
     total_amount: Optional[float] = Field(default=None)
     expense_category: Optional[str] = Field(default=None)
     status: ReceiptStatus = Field(default=ReceiptStatus.processing)
+    extraction_error: Optional[str] = Field(default=None)  # Last error of a dead-lettered extraction
     is_donation: bool = Field(default=False)
     payment_method: Optional[PaymentMethod] = Field(default=None)
     payment_reference: Optional[str] = Field(default=None)
@@ -109,17 +149,52 @@ class Receipt(SQLModel, table=True):
     organization: Organization = Relationship(back_populates="receipts")
     tax_breakdowns: List["ReceiptTaxBreakdown"] = Relationship(back_populates="receipt")
     payment_transaction: Optional["PaymentTransaction"] = Relationship(back_populates="receipt")
+    extraction_jobs: List["ExtractionJob"] = Relationship(back_populates="receipt")
+    extraction_metrics: List["ExtractionMetric"] = Relationship(back_populates="receipt")
 
 
 class ReceiptTaxBreakdown(SQLModel, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     tax_type: TaxType
     amount: float
+    tax_rate: Optional[float] = Field(default=None)
 
     receipt_id: uuid.UUID = Field(foreign_key="receipt.id")
     receipt: Receipt = Relationship(back_populates="tax_breakdowns")
 
 
+class ExtractionJob(SQLModel, table=True):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    status: ExtractionJobStatus = Field(default=ExtractionJobStatus.queued, index=True)
+    attempts: int = Field(default=0)
+    last_error: Optional[str] = Field(default=None)
+    run_after: datetime = Field(default_factory=datetime.utcnow, index=True)  # Earliest time a worker may claim the job
+    locked_at: Optional[datetime] = Field(default=None)
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    finished_at: Optional[datetime] = Field(default=None)
+    partial_result: Optional[str] = Field(default=None)  # ReceiptData JSON streamed so far by the running attempt
+
+    receipt_id: uuid.UUID = Field(foreign_key="receipt.id", index=True)
+    receipt: Receipt = Relationship(back_populates="extraction_jobs")
+
+
+class ExtractionMetric(SQLModel, table=True):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    function_name: str
+    client_name: str  # Client the cascade asked for
+    provider: Optional[str] = Field(default=None)
+    tier: int = Field(default=0)  # Position of the client in the extraction cascade
+    succeeded: bool
+    latency_ms: Optional[int] = Field(default=None)
+    input_tokens: Optional[int] = Field(default=None)
+    output_tokens: Optional[int] = Field(default=None)
+    retries: int = Field(default=0)  # HTTP calls beyond the first, from retry policies and fallbacks
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False, index=True)
+
+    receipt_id: uuid.UUID = Field(foreign_key="receipt.id", index=True)
+    receipt: Receipt = Relationship(back_populates="extraction_metrics")
+
+
 class PaymentTransaction(SQLModel, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     transaction_date: date
@@ -133,6 +208,80 @@ class PaymentTransaction(SQLModel, table=True):
     receipt: Optional[Receipt] = Relationship(back_populates="payment_transaction")
 
 
+class IdempotencyKey(SQLModel, table=True):
+    __table_args__ = (
+        # A client key is scoped to the user and endpoint it was sent with
+        Index("ix_idempotencykey_user_id_endpoint_key", "user_id", "endpoint", "key", unique=True),
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    key: str
+    endpoint: str
+    request_hash: str  # SHA-256 of the request, to reject a key reused for a different request
+    status: IdempotencyStatus = Field(default=IdempotencyStatus.in_progress)
+    response_status_code: Optional[int] = Field(default=None)
+    response_body: Optional[str] = Field(default=None)  # Store JSON as string
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    expires_at: datetime = Field(index=True)
+
+    user_id: uuid.UUID = Field(foreign_key="user.id")
+
+
+class ResumableUpload(SQLModel, table=True):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    upload_length: int  # Total size in bytes announced by the client
+    content_type: str
+    filename: Optional[str] = Field(default=None)
+    is_donation: bool = Field(default=False)
+    status: ResumableUploadStatus = Field(default=ResumableUploadStatus.in_progress)
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    expires_at: datetime = Field(index=True)
+    completed_at: Optional[datetime] = Field(default=None)
+
+    user_id: uuid.UUID = Field(foreign_key="user.id")  # Who is uploading
+    receipt_user_id: uuid.UUID = Field(foreign_key="user.id")  # Who the receipt will belong to
+    organization_id: uuid.UUID = Field(foreign_key="organization.id")
+    receipt_id: Optional[uuid.UUID] = Field(default=None, foreign_key="receipt.id")
+
+
+class ExtractionCacheEntry(SQLModel, table=True):
+    __table_args__ = (
+        # One result per image and version of the BAML source that extracted it
+        Index("ix_extractioncacheentry_content_hash_prompt_digest", "content_hash", "prompt_digest", unique=True),
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    content_hash: str  # SHA-256 of the original image
+    prompt_digest: str  # SHA-256 of the BAML source
+    result: str  # Store ReceiptData JSON as string
+    hit_count: int = Field(default=0)
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    last_hit_at: Optional[datetime] = Field(default=None)
+    expires_at: datetime = Field(index=True)
+
+
+class VendorProfile(SQLModel, table=True):
+    __table_args__ = (
+        # One profile per store of a vendor within an organization
+        Index("ix_vendorprofile_organization_id_vendor_key", "organization_id", "vendor_key", unique=True),
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    vendor_key: str  # Normalized vendor name and ZIP code or address
+    vendor_name: str
+    vendor_address: Optional[str] = Field(default=None)
+    county: Optional[str] = Field(default=None)
+    expense_category: Optional[str] = Field(default=None)
+    tax_rates: Optional[str] = Field(default=None)  # Store JSON as string: [{"tax_type": "State", "tax_rate": 0.0475}]
+    confirmed: bool = Field(default=False)  # Set by a treasurer's correction rather than learned from extractions
+    hit_count: int = Field(default=0)
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    last_hit_at: Optional[datetime] = Field(default=None)
+
+    organization_id: uuid.UUID = Field(foreign_key="organization.id")
+
+
 class Feedback(SQLModel, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     category: FeedbackCategory
@@ -146,3 +295,60 @@ class Feedback(SQLModel, table=True):
 
     user: User = Relationship(back_populates="feedback")
     organization: Organization = Relationship(back_populates="feedback")
+
+
+class ReextractionCampaign(SQLModel, table=True):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    name: str = Field(unique=True)
+    prompt_digest: str  # SHA-256 of the BAML source the campaign started with
+    status: ReextractionCampaignStatus = Field(default=ReextractionCampaignStatus.running)
+    receipt_statuses: str  # Store JSON as string: statuses of the receipts the campaign covers
+    organization_id: Optional[uuid.UUID] = Field(default=None, foreign_key="organization.id")  # None covers every organization
+    apply_to_pending: bool = Field(default=False)  # Overwrite differing values of receipts not yet reviewed
+    receipts_total: int = Field(default=0)
+    receipts_done: int = Field(default=0)
+    receipts_changed: int = Field(default=0)
+    receipts_failed: int = Field(default=0)
+    running_seconds: float = Field(default=0.0)  # Time spent re-extracting, across every run
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    finished_at: Optional[datetime] = Field(default=None)
+
+
+class ReextractionResult(SQLModel, table=True):
+    __table_args__ = (
+        # A receipt is re-extracted once per campaign, which is what makes campaigns resumable
+        Index("ix_reextractionresult_campaign_id_receipt_id", "campaign_id", "receipt_id", unique=True),
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    outcome: ReextractionOutcome
+    differences: Optional[str] = Field(default=None)  # Store JSON as string: {field: {"stored": ..., "extracted": ...}}
+    error: Optional[str] = Field(default=None)
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+
+    campaign_id: uuid.UUID = Field(foreign_key="reextractioncampaign.id")
+    receipt_id: uuid.UUID = Field(foreign_key="receipt.id", index=True)
+
+
+class ShadowExtraction(SQLModel, table=True):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    primary_client: str  # Client whose result was used for the receipt
+    candidate_client: str
+    candidate_function: str  # BAML function the candidate ran, e.g. ExtractReceiptDataCandidate
+    prompt_digest: str  # SHA-256 of the BAML source both ran from
+    candidate_succeeded: bool
+    fields_compared: int = Field(default=0)
+    fields_agreed: int = Field(default=0)
+    field_agreement: Optional[str] = Field(default=None)  # Store JSON as string: {field: true/false}
+    candidate_result: Optional[str] = Field(default=None)  # Store ReceiptData JSON as string
+    primary_latency_ms: Optional[int] = Field(default=None)
+    candidate_latency_ms: Optional[int] = Field(default=None)
+    primary_input_tokens: Optional[int] = Field(default=None)
+    primary_output_tokens: Optional[int] = Field(default=None)
+    candidate_input_tokens: Optional[int] = Field(default=None)
+    candidate_output_tokens: Optional[int] = Field(default=None)
+    error: Optional[str] = Field(default=None)
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False, index=True)
+
+    receipt_id: Optional[uuid.UUID] = Field(default=None, foreign_key="receipt.id", index=True)
@@ -0,0 +1,205 @@
+"""
+Re-extract past receipts after the prompt or models improve.
+
+A campaign re-fetches every covered receipt's file from storage, extracts
+it again under the provider rate limits, and records how the result
+differs from what is stored. Reviewed receipts keep their values; see
+reextraction_service.reconcile_receipt for what is updated. Campaigns are
+named and resumable: running the same name again continues where the last
+run stopped.
+
+Run with ``python -m app.reextraction --name NAME [--status approved --status paid] [--apply-to-pending]``,
+and ``python -m app.reextraction --name NAME --report`` for its progress.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import signal
+import time
+import uuid
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.core.db import async_session_factory
+from app.core.process_pool import shutdown_process_pool
+from app.models.models import ReceiptStatus, ReextractionCampaign, ReextractionCampaignStatus
+from app.services.llm_rate_limiter import LLMRateLimited, TokenBucket
+from app.services.reextraction_service import (
+    campaign_progress,
+    get_or_create_campaign,
+    next_receipt_ids,
+    reextract_receipt,
+    refresh_progress,
+    retry_failed,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Receipts still processing belong to the extraction worker, and dead-lettered ones have no data to compare
+CAMPAIGN_STATUSES = [
+    status.value for status in ReceiptStatus
+    if status not in (ReceiptStatus.processing, ReceiptStatus.extraction_failed)
+]
+
+
+async def _run_receipt(campaign: ReextractionCampaign, receipt_id: uuid.UUID) -> bool:
+    """
+    Re-extract one receipt in its own session.
+
+    Returns:
+        False if it was deferred because the LLM provider is saturated
+    """
+    async with async_session_factory() as session:
+        try:
+            outcome = await reextract_receipt(session, campaign, receipt_id)
+            await session.commit()
+            logger.info(f"Receipt {receipt_id}: {outcome.value}")
+        except LLMRateLimited as e:
+            logger.info(f"Receipt {receipt_id} deferred: {e}")
+            await session.rollback()
+            return False
+        except IntegrityError:
+            # Another run of the same campaign got to it first
+            await session.rollback()
+        return True
+
+
+async def run_campaign(
+    campaign: ReextractionCampaign,
+    concurrency: int,
+    max_per_minute: int,
+    limit: Optional[int],
+    stop_event: asyncio.Event
+) -> None:
+    """
+    Re-extract the campaign's remaining receipts until done, stopped or limit is reached.
+
+    Receipts are started no faster than max_per_minute, so live uploads keep
+    most of the provider limits, and in pages of a few times the concurrency,
+    after each of which progress is saved and logged.
+    """
+    pacing = TokenBucket(max_per_minute)
+    # Start from an empty bucket, so a run does not begin with a minute's worth of calls at once
+    pacing.available = 0.0
+    semaphore = asyncio.Semaphore(concurrency)
+    started_run = time.monotonic()
+    done_this_run = 0
+
+    async def paced(receipt_id: uuid.UUID) -> bool:
+        async with semaphore:
+            if stop_event.is_set():
+                return True
+            wait = pacing.seconds_until(1)
+            if wait:
+                await asyncio.sleep(wait)
+            pacing.take(1)
+            return await _run_receipt(campaign, receipt_id)
+
+    while not stop_event.is_set():
+        page_size = concurrency * 4
+        if limit is not None:
+            page_size = min(page_size, limit - done_this_run)
+            if page_size <= 0:
+                break
+        async with async_session_factory() as session:
+            receipt_ids = await next_receipt_ids(session, campaign, page_size)
+        if not receipt_ids:
+            break
+
+        started_page = time.monotonic()
+        processed = await asyncio.gather(*(paced(receipt_id) for receipt_id in receipt_ids))
+        done_this_run += sum(processed)
+        async with async_session_factory() as session:
+            campaign = await session.merge(campaign)
+            await refresh_progress(session, campaign, time.monotonic() - started_page)
+        progress = campaign_progress(campaign)
+        run_rate = done_this_run / (time.monotonic() - started_run) * 60
+        logger.info(
+            f"Campaign {campaign.name}: {progress['receipts_done']}/{progress['receipts_total']} receipts "
+            f"({progress['percent_done']}%), {progress['receipts_changed']} changed, {progress['receipts_failed']} failed, "
+            f"{run_rate:.1f} receipts/min this run, ETA {progress['eta_minutes']} min"
+        )
+        if not all(processed):
+            # The provider is saturated; back off before the deferred receipts come round again
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=settings.EXTRACTION_JOB_RETRY_DELAY_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async with async_session_factory() as session:
+        campaign = await session.merge(campaign)
+        await refresh_progress(session, campaign)
+    if campaign.status == ReextractionCampaignStatus.completed:
+        logger.info(f"Campaign {campaign.name} completed")
+    print(json.dumps(campaign_progress(campaign), indent=2))
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    async with async_session_factory() as session:
+        campaign = await get_or_create_campaign(
+            session,
+            args.name,
+            [ReceiptStatus(status) for status in args.status or CAMPAIGN_STATUSES],
+            uuid.UUID(args.organization_id) if args.organization_id else None,
+            args.apply_to_pending
+        )
+        if args.report:
+            await refresh_progress(session, campaign)
+            print(json.dumps(campaign_progress(campaign), indent=2))
+            return
+        if args.retry_failed:
+            logger.info(f"Retrying {await retry_failed(session, campaign)} failed receipts")
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # Signal handlers are not available on Windows event loops
+            pass
+
+    logger.info(f"Running re-extraction campaign {campaign.name} with concurrency {args.concurrency}, at most {args.max_per_minute} receipts/min")
+    try:
+        await run_campaign(campaign, args.concurrency, args.max_per_minute, args.limit, stop_event)
+    finally:
+        shutdown_process_pool()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Resumable re-extraction of past receipts")
+    parser.add_argument("--name", required=True, help="Campaign name; running it again resumes it")
+    parser.add_argument(
+        "--status",
+        action="append",
+        choices=CAMPAIGN_STATUSES,
+        help="Receipt status the campaign covers (repeatable; default all but processing and extraction_failed). Only used when the campaign starts"
+    )
+    parser.add_argument("--organization-id", help="Only re-extract this organization's receipts. Only used when the campaign starts")
+    parser.add_argument(
+        "--apply-to-pending",
+        action="store_true",
+        help="Overwrite differing values of receipts awaiting review. Only used when the campaign starts"
+    )
+    parser.add_argument("--concurrency", type=int, default=settings.REEXTRACTION_CONCURRENCY, help="Receipts re-extracted at once")
+    parser.add_argument(
+        "--max-per-minute",
+        type=int,
+        default=settings.REEXTRACTION_MAX_RECEIPTS_PER_MINUTE,
+        help="Receipts started per minute at most"
+    )
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many receipts")
+    parser.add_argument("--retry-failed", action="store_true", help="Re-extract receipts that failed in earlier runs")
+    parser.add_argument("--report", action="store_true", help="Print the campaign's progress and exit")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+from datetime import date
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ExtractionDailyStats(BaseModel):
+    day: date
+    client_name: str
+    calls: int
+    failures: int
+    retries: int
+    latency_p50_ms: Optional[float] = None
+    latency_p95_ms: Optional[float] = None
+    latency_p99_ms: Optional[float] = None
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    avg_input_tokens: Optional[float] = None
+    avg_output_tokens: Optional[float] = None
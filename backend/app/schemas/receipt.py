@@ -0,0 +1,45 @@
+from datetime import date
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.models.models import TaxType
+
+
+class PresignedUploadRequest(BaseModel):
+    content_type: str
+    # Hex SHA-256 of the file; storage rejects an upload whose bytes do not match it
+    sha256: str = Field(pattern=r"^[0-9a-fA-F]{64}$")
+
+
+class PresignedUploadResponse(BaseModel):
+    upload_url: str
+    object_key: str
+    expires_in: int
+    headers: Dict[str, str]
+
+
+class FinalizeUploadRequest(BaseModel):
+    object_key: str
+    is_donation: bool = False
+    member_id: Optional[str] = None
+
+
+class TaxBreakdownCorrection(BaseModel):
+    tax_type: TaxType
+    amount: float
+    tax_rate: Optional[float] = None
+
+
+class ReceiptCorrection(BaseModel):
+    vendor_name: Optional[str] = None
+    vendor_address: Optional[str] = None
+    purchase_date: Optional[date] = None
+    county: Optional[str] = None
+    subtotal_amount: Optional[float] = None
+    tax_amount: Optional[float] = None
+    total_amount: Optional[float] = None
+    expense_category: Optional[str] = None
+    is_donation: Optional[bool] = None
+    # Replaces all of the receipt's tax breakdowns when given
+    tax_breakdowns: Optional[List[TaxBreakdownCorrection]] = None
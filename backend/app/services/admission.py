@@ -0,0 +1,203 @@
+import re
+import uuid
+from collections import defaultdict
+from typing import Dict, Optional
+
+from sqlmodel import select
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.auth import user_id_from_token
+from app.core.config import settings
+from app.core.db import async_session_factory
+from app.core.metrics import metrics
+from app.models.models import User
+
+
+class AdmissionRejected(Exception):
+    """Raised when an upload would exceed an in-flight limit."""
+
+    def __init__(self, message: str, reason: str, retry_after: int):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """An admitted upload; release it (or leave its with block) when the work is done."""
+
+    def __init__(self, controller: "AdmissionController", organization_id: uuid.UUID, reserved_bytes: int):
+        self._controller = controller
+        self.organization_id = organization_id
+        self.reserved_bytes = reserved_bytes
+        self._released = False
+
+    def release(self) -> None:
+        """Give the slot and bytes back; safe to call more than once."""
+        if not self._released:
+            self._released = True
+            self._controller._release(self)
+
+    def __enter__(self) -> "AdmissionTicket":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+class AdmissionController:
+    """
+    Bounds the uploads an API process works on at once.
+
+    Limits the number of in-flight uploads globally and per organization, and
+    the request bytes held by them, so one organization bulk-uploading cannot
+    take every database connection and extraction slot. Requests over a limit
+    are rejected immediately rather than queued.
+
+    All bookkeeping happens on the event loop without awaiting, so no lock is
+    needed. Limits apply per API process.
+    """
+
+    def __init__(self, max_inflight: int, max_inflight_per_organization: int, max_inflight_bytes: int, retry_after: int):
+        self.max_inflight = max_inflight
+        self.max_inflight_per_organization = max_inflight_per_organization
+        self.max_inflight_bytes = max_inflight_bytes
+        self.retry_after = retry_after
+        self._inflight = 0
+        self._inflight_bytes = 0
+        self._inflight_by_organization: Dict[uuid.UUID, int] = defaultdict(int)
+
+    def admit(self, organization_id: uuid.UUID, request_bytes: int = 0) -> AdmissionTicket:
+        """
+        Reserve a slot for an upload or reject it.
+
+        A request larger than the whole byte budget is admitted only when no
+        other bytes are in flight, so it can still run on its own.
+
+        Args:
+            organization_id: Organization the upload belongs to
+            request_bytes: Size of the request body, if known
+
+        Returns:
+            A ticket to release when the upload has been handled
+
+        Raises:
+            AdmissionRejected: If a limit would be exceeded
+        """
+        reserved_bytes = min(max(request_bytes, 0), self.max_inflight_bytes)
+        if self._inflight >= self.max_inflight:
+            self._reject("global", "Too many uploads in progress, try again shortly")
+        if self._inflight_by_organization[organization_id] >= self.max_inflight_per_organization:
+            self._reject("organization", "Too many uploads in progress for this organization, try again shortly")
+        if self._inflight_bytes + reserved_bytes > self.max_inflight_bytes:
+            self._reject("bytes", "Upload capacity is exhausted, try again shortly")
+
+        self._inflight += 1
+        self._inflight_bytes += reserved_bytes
+        self._inflight_by_organization[organization_id] += 1
+        self._report()
+        return AdmissionTicket(self, organization_id, reserved_bytes)
+
+    def _release(self, ticket: AdmissionTicket) -> None:
+        self._inflight -= 1
+        self._inflight_bytes -= ticket.reserved_bytes
+        self._inflight_by_organization[ticket.organization_id] -= 1
+        if self._inflight_by_organization[ticket.organization_id] <= 0:
+            del self._inflight_by_organization[ticket.organization_id]
+        self._report()
+
+    def inflight_for(self, organization_id: uuid.UUID) -> int:
+        """Number of the organization's uploads this process is working on."""
+        return self._inflight_by_organization.get(organization_id, 0)
+
+    def _reject(self, reason: str, message: str) -> None:
+        metrics.increment("upload_admission_rejected_total", reason=reason)
+        raise AdmissionRejected(message, reason=reason, retry_after=self.retry_after)
+
+    def _report(self) -> None:
+        # Per-organization counts stay internal; /metrics must not list tenant IDs
+        metrics.set_gauge("uploads_inflight", self._inflight)
+        metrics.set_gauge("uploads_inflight_bytes", self._inflight_bytes)
+
+upload_admission = AdmissionController(
+    max_inflight=settings.ADMISSION_MAX_INFLIGHT_UPLOADS,
+    max_inflight_per_organization=settings.ADMISSION_MAX_INFLIGHT_UPLOADS_PER_ORG,
+    max_inflight_bytes=settings.ADMISSION_MAX_INFLIGHT_BYTES,
+    retry_after=settings.ADMISSION_RETRY_AFTER_SECONDS
+)
+
+
+class UploadAdmissionMiddleware:
+    """
+    Admits upload requests before their bodies are read.
+
+    FastAPI reads and spools a multipart body before the endpoint runs, so
+    admission inside the handler would come after the bytes it is meant to
+    bound. The organization is looked up from the bearer token; requests
+    without a valid one pass through and are rejected by the endpoint. A
+    ticket is held until the response has been sent, so a batch keeps its
+    slot while its results stream.
+    """
+
+    # Method and path, below API_V1_STR, of the requests admission applies to
+    UPLOAD_ROUTES = [
+        ("POST", re.compile(r"/receipts/upload")),
+        ("POST", re.compile(r"/receipts/upload-batch")),
+        ("POST", re.compile(r"/receipts/finalize")),
+        ("PATCH", re.compile(r"/receipts/uploads/[^/]+")),
+    ]
+
+    def __init__(self, app: ASGIApp, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or upload_admission
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._is_upload(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        organization_id = await self._organization_id(headers.get("authorization"))
+        if organization_id is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            request_bytes = int(headers.get("content-length", "0"))
+        except ValueError:
+            request_bytes = 0
+        try:
+            ticket = self.controller.admit(organization_id, request_bytes)
+        except AdmissionRejected as e:
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": str(e), "error_code": "HTTP_429"},
+                headers={"Retry-After": str(e.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        with ticket:
+            await self.app(scope, receive, send)
+
+    def _is_upload(self, method: str, path: str) -> bool:
+        if not path.startswith(settings.API_V1_STR):
+            return False
+        path = path[len(settings.API_V1_STR):].rstrip("/")
+        return any(method == route_method and pattern.fullmatch(path) for route_method, pattern in self.UPLOAD_ROUTES)
+
+    @staticmethod
+    async def _organization_id(authorization: Optional[str]) -> Optional[uuid.UUID]:
+        """Organization of the user a bearer token belongs to, or None."""
+        scheme, _, token = (authorization or "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        user_id = user_id_from_token(token)
+        try:
+            user_id = uuid.UUID(str(user_id))
+        except ValueError:
+            return None
+        async with async_session_factory() as session:
+            result = await session.exec(select(User.organization_id).where(User.id == user_id))
+            return result.first()
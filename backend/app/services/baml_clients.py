@@ -0,0 +1,77 @@
+"""
+Client definitions read from the BAML source the client was generated from.
+"""
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from baml_client.inlinedbaml import get_baml_files
+
+_CLIENT_DEFINITION = re.compile(r"client<llm>\s+(\w+)\s*\{\s*provider\s+([\w-]+)(.*?)\n\}", re.DOTALL)
+_MODEL = re.compile(r"\bmodel\s+\"([^\"]+)\"")
+_API_KEY = re.compile(r"\bapi_key\s+env\.(\w+)")
+_RETRY_POLICY = re.compile(r"\bretry_policy\s+(\w+)")
+_STRATEGY = re.compile(r"strategy\s*\[([^\]]*)\]")
+# Providers that delegate to other clients instead of calling an API themselves
+COMPOSITE_PROVIDERS = {"round-robin", "fallback"}
+
+
+@dataclass
+class BamlClientDefinition:
+    """A client<llm> block of clients.baml."""
+    name: str
+    provider: str
+    model: Optional[str] = None
+    api_key_env: Optional[str] = None
+    retry_policy: Optional[str] = None
+    strategy: List[str] = field(default_factory=list)
+
+
+@lru_cache(maxsize=1)
+def load_client_definitions() -> Dict[str, BamlClientDefinition]:
+    """Parse every client<llm> block in the inlined BAML source, by client name."""
+    definitions = {}
+    for name, source in get_baml_files().items():
+        if not name.endswith(".baml"):
+            continue
+        for match in _CLIENT_DEFINITION.finditer(source.replace("\r\n", "\n")):
+            body = match.group(3)
+            model = _MODEL.search(body)
+            api_key = _API_KEY.search(body)
+            retry_policy = _RETRY_POLICY.search(body)
+            strategy = _STRATEGY.search(body)
+            definitions[match.group(1)] = BamlClientDefinition(
+                name=match.group(1),
+                provider=match.group(2),
+                model=model.group(1) if model else None,
+                api_key_env=api_key.group(1) if api_key else None,
+                retry_policy=retry_policy.group(1) if retry_policy else None,
+                strategy=[client.strip() for client in strategy.group(1).split(",") if client.strip()] if strategy else []
+            )
+    return definitions
+
+
+def resolve_client(client_name: str) -> Optional[BamlClientDefinition]:
+    """
+    The client that actually calls an API when client_name is used.
+
+    Round-robin and fallback clients resolve to the first client in their
+    strategy, since that is the one normally called.
+    """
+    definitions = load_client_definitions()
+    definition = definitions.get(client_name)
+    seen = set()
+    while definition and definition.provider in COMPOSITE_PROVIDERS and definition.strategy and definition.name not in seen:
+        seen.add(definition.name)
+        definition = definitions.get(definition.strategy[0])
+    return definition
+
+
+def load_client_providers() -> Dict[str, str]:
+    """Map each client in clients.baml to the provider it calls."""
+    providers = {}
+    for name, definition in load_client_definitions().items():
+        resolved = resolve_client(name)
+        providers[name] = resolved.provider if resolved else definition.provider
+    return providers
@@ -1,42 +1,585 @@
 import asyncio
 import logging
-from typing import Optional
-from baml_client import b
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from baml_client import b, stream_types
 from baml_client.types import ReceiptData, TaxBreakdown
-from baml_py import Image
+from baml_py import ClientRegistry, Collector, Image
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.baml_clients import COMPOSITE_PROVIDERS, load_client_definitions
+from app.services.image_service import estimate_vision_tokens, image_dimensions
+from app.services.llm_rate_limiter import llm_rate_limiter
+from app.models.models import ShadowExtraction
+from app.services.extraction_cache import baml_source_digest
+from app.services.llm_routing import CircuitOpen, circuit_breakers, hedge_policy
+from app.services.shadow_extraction_service import SHADOW_FUNCTIONS, record_shadow_extraction
 
 logger = logging.getLogger(__name__)
 
+# Rough token counts of the extraction prompt and its JSON answer, for rate limiting
+EXTRACTION_PROMPT_TOKENS = 600
+EXTRACTION_OUTPUT_TOKENS = 400
+# Rough characters per token of English receipt text
+CHARS_PER_TOKEN = 4
+# Allowed rounding difference when checking that extracted amounts add up
+AMOUNT_TOLERANCE = 0.02
+
+_client_registries: Dict[str, ClientRegistry] = {}
+# Running shadow extractions, referenced so they are not garbage collected mid-call
+_shadow_tasks: Set["asyncio.Task"] = set()
+# Streaming calls that lost a hedge race and are left to finish in the background
+_losing_hedge_tasks: Set["asyncio.Task"] = set()
+
+# Called with each partial ReceiptData while a call streams
+PartialCallback = Callable[[stream_types.ReceiptData], Awaitable[None]]
+
+@dataclass
+class ExtractionCall:
+    """Telemetry of one BAML function call, read from its Collector."""
+    function_name: str
+    client_name: str
+    tier: int
+    succeeded: bool
+    provider: Optional[str] = None
+    latency_ms: Optional[int] = None
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    retries: int = 0
+
+    @classmethod
+    def from_collector(cls, collector: Collector, function_name: str, client_name: str, tier: int, succeeded: bool) -> "ExtractionCall":
+        """Summarize the last function call a collector saw."""
+        call = cls(function_name=function_name, client_name=client_name, tier=tier, succeeded=succeeded)
+        log = collector.last
+        if log is None:
+            return call
+        call.latency_ms = log.timing.duration_ms
+        call.input_tokens = log.usage.input_tokens
+        call.output_tokens = log.usage.output_tokens
+        call.retries = max(len(log.calls) - 1, 0)
+        # The HTTP call whose response was used, or the last one tried
+        answered = log.selected_call or (log.calls[-1] if log.calls else None)
+        if answered is not None:
+            call.client_name = answered.client_name
+            call.provider = answered.provider
+        return call
+
+@dataclass
+class ExtractionImage:
+    """One image of a batched extraction."""
+    data: bytes
+    content_type: str
+    url: Optional[str] = None
+
+def estimate_extraction_tokens(image_data: bytes) -> int:
+    """Estimate the tokens an extraction call will use, counted against the provider's limit."""
+    return EXTRACTION_PROMPT_TOKENS + estimate_vision_tokens(*image_dimensions(image_data)) + EXTRACTION_OUTPUT_TOKENS
+
+def extraction_tiers() -> List[str]:
+    """Clients of the extraction cascade, cheapest first, from EXTRACTION_MODEL_TIERS."""
+    return [client.strip() for client in settings.EXTRACTION_MODEL_TIERS.split(",") if client.strip()]
+
+def _baml_image(image_data: bytes, content_type: str, image_url: Optional[str] = None) -> Image:
+    """Wrap an image for a BAML call, by URL when the provider can fetch it."""
+    if image_url:
+        # The provider downloads the image, so it is not copied into every request body
+        metrics.increment("extraction_image_handoffs_total", method="url")
+        return Image.from_url(image_url, content_type)
+    # Create BAML Image object from bytes
+    import base64
+    image_base64 = base64.b64encode(image_data).decode('utf-8')
+    metrics.increment("extraction_image_handoffs_total", method="base64")
+    return Image.from_base64(content_type, image_base64)
+
+def _report_call(call: ExtractionCall, client_name: str, calls: Optional[List[ExtractionCall]]) -> None:
+    """Count a finished call in the metrics and hand its telemetry to the caller."""
+    metrics.increment("extraction_calls_total", client=client_name, outcome="succeeded" if call.succeeded else "failed")
+    if call.input_tokens is not None:
+        metrics.increment("extraction_input_tokens_total", call.input_tokens, client=client_name)
+    if call.output_tokens is not None:
+        metrics.increment("extraction_output_tokens_total", call.output_tokens, client=client_name)
+    if calls is not None:
+        calls.append(call)
+
+def _use_stub_clients(registry: ClientRegistry, base_url: str) -> None:
+    """
+    Redefine every client in clients.baml to call an OpenAI-compatible stub.
+
+    Clients keep their names and models, so the cascade, rate limits and
+    telemetry behave as they do against the real providers.
+    """
+    for definition in load_client_definitions().values():
+        if definition.provider in COMPOSITE_PROVIDERS:
+            continue
+        registry.add_llm_client(
+            name=definition.name,
+            provider="openai",
+            options={"base_url": base_url, "model": definition.model or definition.name, "api_key": "stub"},
+            retry_policy=definition.retry_policy
+        )
+
+def _client_registry(client_name: str) -> ClientRegistry:
+    """Registry that routes a call to one of the clients in clients.baml."""
+    registry = _client_registries.get(client_name)
+    if registry is None:
+        registry = ClientRegistry()
+        if settings.LLM_STUB_BASE_URL:
+            _use_stub_clients(registry, settings.LLM_STUB_BASE_URL)
+        registry.set_primary(client_name)
+        _client_registries[client_name] = registry
+    return registry
+
 class BAMLService:
     """Service for BAML AI-powered receipt data extraction."""
     
     @staticmethod
-    async def extract_receipt_data(image_data: bytes, content_type: str = "image/jpeg") -> Optional[ReceiptData]:
+    async def extract_receipt_data(
+        image_data: bytes,
+        content_type: str = "image/jpeg",
+        calls: Optional[List[ExtractionCall]] = None,
+        on_partial: Optional[PartialCallback] = None,
+        image_url: Optional[str] = None,
+        receipt_id: Optional[uuid.UUID] = None
+    ) -> Optional[ReceiptData]:
         """
         Extract structured data from a receipt image using BAML.
         
+        The clients in EXTRACTION_MODEL_TIERS are tried cheapest first. A
+        result is accepted when it passes validate_extracted_data and its
+        amounts reconcile; otherwise the receipt escalates to the next tier.
+        The last tier's result is returned as is. A sampled share of results
+        is compared in the background with a candidate's (shadow mode).
+        
         Args:
             image_data: Raw image bytes
             content_type: MIME type of the image
+            calls: If given, telemetry of every model call made is appended to it
+            on_partial: If given, the calls are streamed and it receives the
+                fields parsed so far; an escalated call starts over
+            image_url: URL the provider can fetch image_data from; without it
+                the image is sent inline as base64
+            receipt_id: Receipt being extracted, recorded with shadow runs and
+                with calls that lose a hedge race after this returns
             
         Returns:
             ReceiptData object if extraction successful, None otherwise
+            
+        Raises:
+            LLMRateLimited: If the provider is saturated and the call was shed
+        """
+        image = _baml_image(image_data, content_type, image_url)
+        tokens = estimate_extraction_tokens(image_data)
+        started = time.perf_counter()
+        calls = calls if calls is not None else []
+        first_call = len(calls)
+        
+        tiers = extraction_tiers()
+        result = None
+        for tier, client_name in enumerate(tiers):
+            result = await BAMLService._extract_with_client(client_name, tier, image, tokens, calls, on_partial, receipt_id)
+            if tier == len(tiers) - 1:
+                break
+            
+            if result is None:
+                reason = "failed"
+            elif not BAMLService.validate_extracted_data(result):
+                reason = "invalid"
+            elif not BAMLService.amounts_reconcile(result):
+                reason = "unreconciled"
+            else:
+                reason = None
+            if reason is None:
+                break
+            logger.info(f"Escalating extraction from {client_name} to {tiers[tier + 1]}: {reason}")
+            metrics.increment("extraction_escalations_total", client=client_name, reason=reason)
+        
+        if result is not None and settings.EXTRACTION_SHADOW_SAMPLE_RATE > 0:
+            BAMLService._maybe_shadow(image_data, content_type, result, calls[first_call:], time.perf_counter() - started, receipt_id)
+        return result
+    
+    @staticmethod
+    def _maybe_shadow(
+        image_data: bytes,
+        content_type: str,
+        result: ReceiptData,
+        primary_calls: List[ExtractionCall],
+        primary_seconds: float,
+        receipt_id: Optional[uuid.UUID]
+    ) -> None:
         """
+        Sample an extraction for a shadow run against the candidate.
+        
+        The shadow run is started as a background task, so the caller gets
+        its result without waiting. It is skipped rather than queued when
+        too many shadow runs are in flight or the candidate's provider has
+        no spare capacity, so it never delays live extractions.
+        """
+        if random.random() >= settings.EXTRACTION_SHADOW_SAMPLE_RATE:
+            return
+        function_name = settings.EXTRACTION_SHADOW_FUNCTION
+        if function_name not in SHADOW_FUNCTIONS:
+            logger.warning(f"EXTRACTION_SHADOW_FUNCTION must be one of {', '.join(SHADOW_FUNCTIONS)}, not {function_name}")
+            return
+        answered = next((call for call in reversed(primary_calls) if call.succeeded), None)
+        primary_client = answered.client_name if answered else extraction_tiers()[0]
+        candidate_client = settings.EXTRACTION_SHADOW_CLIENT or primary_client
+        
+        if len(_shadow_tasks) >= settings.EXTRACTION_SHADOW_MAX_INFLIGHT:
+            metrics.increment("shadow_extractions_skipped_total", reason="inflight")
+            return
+        if not circuit_breakers.for_client(candidate_client).allow() or not llm_rate_limiter.has_headroom(candidate_client):
+            metrics.increment("shadow_extractions_skipped_total", reason="busy")
+            return
+        
+        shadow = ShadowExtraction(
+            primary_client=primary_client,
+            candidate_client=candidate_client,
+            candidate_function=function_name,
+            prompt_digest=baml_source_digest(),
+            candidate_succeeded=False,
+            primary_latency_ms=int(primary_seconds * 1000),
+            primary_input_tokens=sum(call.input_tokens or 0 for call in primary_calls),
+            primary_output_tokens=sum(call.output_tokens or 0 for call in primary_calls),
+            receipt_id=receipt_id
+        )
+        task = asyncio.create_task(BAMLService._shadow_extract(shadow, image_data, content_type, result))
+        _shadow_tasks.add(task)
+        task.add_done_callback(_shadow_tasks.discard)
+    
+    @staticmethod
+    async def _shadow_extract(shadow: ShadowExtraction, image_data: bytes, content_type: str, primary: ReceiptData) -> None:
+        """Run the candidate on a sampled receipt and store how it compares."""
+        collector = Collector(name="ShadowExtraction")
+        client = b.with_options(client_registry=_client_registry(shadow.candidate_client), collector=collector)
+        candidate = None
+        try:
+            # Inline, since a URL handed to the primary call may have expired by now
+            image = _baml_image(image_data, content_type)
+            async with llm_rate_limiter.limit(shadow.candidate_client, estimate_extraction_tokens(image_data)):
+                candidate = await getattr(client, shadow.candidate_function)(receipt=image)
+        except Exception as e:
+            logger.info(f"Shadow extraction with {shadow.candidate_client} failed: {e}")
+            shadow.error = str(e)
+        
+        call = ExtractionCall.from_collector(collector, shadow.candidate_function, shadow.candidate_client, 0, succeeded=candidate is not None)
+        shadow.candidate_succeeded = candidate is not None
+        shadow.candidate_latency_ms = call.latency_ms
+        shadow.candidate_input_tokens = call.input_tokens
+        shadow.candidate_output_tokens = call.output_tokens
+        await record_shadow_extraction(shadow, primary, candidate)
+    
+    @staticmethod
+    async def _extract_with_client(
+        client_name: str,
+        tier: int,
+        image: Image,
+        tokens: int,
+        calls: Optional[List[ExtractionCall]],
+        on_partial: Optional[PartialCallback] = None,
+        receipt_id: Optional[uuid.UUID] = None
+    ) -> Optional[ReceiptData]:
+        """
+        Call ExtractReceiptData for one tier of the cascade, hedging slow calls.
+        
+        Calls go to the tier's client unless its provider's circuit is open,
+        in which case they go to its hedge partner. A call still running
+        after the client's measured p95 latency is also sent to the partner,
+        and the first successful answer is returned right away. The losing
+        call is cancelled, or left to finish in the background if it streams.
+        
+        Raises:
+            LLMRateLimited: If the provider is saturated and the call was shed
+            CircuitOpen: If the providers of both clients are failing
+        """
+        hedge_client = hedge_policy.hedge_client(client_name) if settings.EXTRACTION_HEDGING_ENABLED else None
+        if hedge_client and not circuit_breakers.for_client(hedge_client).allow():
+            hedge_client = None
+        
+        breaker = circuit_breakers.for_client(client_name)
+        if not breaker.allow():
+            if hedge_client is None:
+                raise CircuitOpen(f"{breaker.provider} is failing", provider=breaker.provider, reason="circuit_open")
+            hedge_policy.record_call()
+            metrics.increment("extraction_rerouted_total", client=client_name, to=hedge_client)
+            return await BAMLService._call_client(hedge_client, tier, image, tokens, calls, on_partial)
+        
+        hedge_policy.record_call()
+        if hedge_client is None:
+            return await BAMLService._call_client(client_name, tier, image, tokens, calls, on_partial)
+        
+        # Only the first attempt to produce partial results streams them, until an answer is chosen
+        streaming: Dict[str, Optional[str]] = {"attempt": None}
+        def forward_partials(attempt: str) -> Optional[PartialCallback]:
+            if on_partial is None:
+                return None
+            async def forward(partial: stream_types.ReceiptData) -> None:
+                if streaming["attempt"] is None:
+                    streaming["attempt"] = attempt
+                if streaming["attempt"] == attempt:
+                    await on_partial(partial)
+            return forward
+        
+        # Each attempt reports to its own list, so a loser finishing later is not added to a recorded extraction
+        attempt_calls: Dict["asyncio.Task", List[ExtractionCall]] = {}
+        def start(attempt: str) -> "asyncio.Task":
+            reported: List[ExtractionCall] = []
+            task = asyncio.create_task(
+                BAMLService._call_client(attempt, tier, image, tokens, reported, forward_partials(attempt))
+            )
+            attempt_calls[task] = reported
+            return task
+        
+        primary = start(client_name)
+        pending = {primary}
         try:
-            # Create BAML Image object from bytes
-            import base64
-            image_base64 = base64.b64encode(image_data).decode('utf-8')
-            image = Image.from_base64(content_type, image_base64)
+            done, _ = await asyncio.wait(pending, timeout=hedge_policy.delay(client_name))
+            if done or not hedge_policy.try_spend():
+                return await primary
+            
+            logger.info(f"Hedging slow extraction on {client_name} with {hedge_client}")
+            hedge = start(hedge_client)
+            pending.add(hedge)
+            winner = None
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result() is not None:
+                        winner = task
+                        break
+            
+            metrics.increment(
+                "extraction_hedges_total",
+                client=client_name,
+                hedge_client=hedge_client,
+                winner="none" if winner is None else "hedge" if winner is hedge else "primary"
+            )
+            if winner is not None:
+                return winner.result()
+            # Neither answered; report the primary's outcome as an unhedged call would have
+            return primary.result()
+        finally:
+            streaming["attempt"] = ""
+            # A BAML stream cannot be aborted, and cancelling one blocks the event loop until its thread
+            # finishes, so a streaming loser runs on in the background and is recorded when it ends
+            losers = set() if on_partial is None else {task for task in pending if not task.done()}
+            for task in pending - losers:
+                task.cancel()
+            if pending - losers:
+                await asyncio.gather(*(pending - losers), return_exceptions=True)
+            if calls is not None:
+                for task, reported in attempt_calls.items():
+                    if task not in losers:
+                        calls.extend(reported)
+            for task in losers:
+                background = asyncio.create_task(BAMLService._record_losing_hedge(task, attempt_calls[task], receipt_id))
+                _losing_hedge_tasks.add(background)
+                background.add_done_callback(_losing_hedge_tasks.discard)
+    
+    @staticmethod
+    async def _record_losing_hedge(
+        task: "asyncio.Task",
+        reported: List[ExtractionCall],
+        receipt_id: Optional[uuid.UUID]
+    ) -> None:
+        """Wait for a streaming call that lost a hedge race and store its telemetry."""
+        # Imported here since the metrics service imports this module
+        from app.services.extraction_metrics_service import record_extraction_calls
+        
+        await asyncio.gather(task, return_exceptions=True)
+        if receipt_id is not None:
+            await record_extraction_calls(receipt_id, reported)
+    
+    @staticmethod
+    async def _call_client(
+        client_name: str,
+        tier: int,
+        image: Image,
+        tokens: int,
+        calls: Optional[List[ExtractionCall]],
+        on_partial: Optional[PartialCallback] = None
+    ) -> Optional[ReceiptData]:
+        """Call ExtractReceiptData on one client, returning None if the call fails."""
+        collector = Collector(name="ExtractReceiptData")
+        client = b.with_options(client_registry=_client_registry(client_name), collector=collector)
+        result = None
+        async with llm_rate_limiter.limit(client_name, tokens):
+            started = time.perf_counter()
+            try:
+                # Call BAML function for data extraction
+                if on_partial is None:
+                    result = await client.ExtractReceiptData(receipt=image)
+                else:
+                    stream = client.stream.ExtractReceiptData(receipt=image)
+                    async for partial in stream:
+                        await on_partial(partial)
+                    result = await stream.get_final_response()
+                hedge_policy.latencies.record(client_name, time.perf_counter() - started)
+                circuit_breakers.for_client(client_name).record_success()
+            except asyncio.CancelledError:
+                # A hedge lost the race; the request was still sent, so it is reported but not held against the client
+                _report_call(
+                    ExtractionCall.from_collector(collector, "ExtractReceiptData", client_name, tier, succeeded=False),
+                    client_name,
+                    calls
+                )
+                raise
+            except Exception as e:
+                # Log the error using structured logging
+                logger.error(f"BAML extraction with {client_name} failed: {str(e)}", exc_info=True)
+                circuit_breakers.for_client(client_name).record_failure()
+            finally:
+                metrics.observe("extraction_call_seconds", time.perf_counter() - started, client=client_name)
+        
+        _report_call(
+            ExtractionCall.from_collector(collector, "ExtractReceiptData", client_name, tier, succeeded=result is not None),
+            client_name,
+            calls
+        )
+        return result
+    
+    @staticmethod
+    async def extract_receipt_data_batch(
+        images: List[ExtractionImage],
+        calls: Optional[List[ExtractionCall]] = None
+    ) -> List[Optional[ReceiptData]]:
+        """
+        Extract several receipt images with one ExtractReceiptDataBatch call.
+        
+        The extraction instructions are sent once for the whole batch. The
+        batch goes to the first client of the cascade only; results that are
+        missing, fail validation or do not reconcile come back as None, so
+        the caller can extract those receipts one by one instead.
+        
+        Args:
+            images: Receipt images, one receipt per image
+            calls: If given, telemetry of the call is appended to it
+            
+        Returns:
+            One result per image, in order
             
-            # Call BAML function for data extraction
-            result = await b.ExtractReceiptData(receipt=image)
+        Raises:
+            LLMRateLimited: If the provider is saturated and the call was shed
+        """
+        client_name = extraction_tiers()[0]
+        results: List[Optional[ReceiptData]] = [None] * len(images)
+        if not images or not circuit_breakers.for_client(client_name).allow():
+            return results
+        
+        baml_images = [_baml_image(image.data, image.content_type, image.url) for image in images]
+        tokens = EXTRACTION_PROMPT_TOKENS + sum(
+            estimate_vision_tokens(*image_dimensions(image.data)) + EXTRACTION_OUTPUT_TOKENS for image in images
+        )
+        collector = Collector(name="ExtractReceiptDataBatch")
+        client = b.with_options(client_registry=_client_registry(client_name), collector=collector)
+        items = None
+        async with llm_rate_limiter.limit(client_name, tokens):
+            started = time.perf_counter()
+            try:
+                items = await client.ExtractReceiptDataBatch(receipts=baml_images)
+                circuit_breakers.for_client(client_name).record_success()
+            except Exception as e:
+                logger.error(f"BAML batch extraction of {len(images)} receipts with {client_name} failed: {str(e)}", exc_info=True)
+                circuit_breakers.for_client(client_name).record_failure()
+            finally:
+                metrics.observe("extraction_batch_seconds", time.perf_counter() - started, client=client_name)
+        
+        _report_call(
+            ExtractionCall.from_collector(collector, "ExtractReceiptDataBatch", client_name, 0, succeeded=items is not None),
+            client_name,
+            calls
+        )
+        
+        for item in items or []:
+            index = item.image_index
+            if 0 <= index < len(images) and results[index] is None:
+                if BAMLService.validate_extracted_data(item.receipt) and BAMLService.amounts_reconcile(item.receipt):
+                    results[index] = item.receipt
+        accepted = sum(result is not None for result in results)
+        metrics.increment("extraction_batch_receipts_total", accepted, client=client_name, outcome="accepted")
+        metrics.increment("extraction_batch_receipts_total", len(images) - accepted, client=client_name, outcome="rejected")
+        return results
+    
+    @staticmethod
+    async def extract_receipt_data_from_text(
+        receipt_text: str,
+        calls: Optional[List[ExtractionCall]] = None
+    ) -> Optional[ReceiptData]:
+        """
+        Extract a receipt from its OCR text with ExtractReceiptDataFromText.
+        
+        The call goes to the first client of the cascade without an image,
+        so it costs a fraction of a vision call. A result is only returned
+        when it passes validation, its amounts reconcile and its total
+        appears in the text, since OCR errors are otherwise easy to miss;
+        the caller should fall back to the image otherwise.
+        
+        Args:
+            receipt_text: OCR text of the receipt
+            calls: If given, telemetry of the call is appended to it
             
-            return result
+        Returns:
+            ReceiptData object if extraction was reliable, None otherwise
             
-        except Exception as e:
-            # Log the error using structured logging
-            logger.error(f"BAML extraction failed: {str(e)}", exc_info=True)
+        Raises:
+            LLMRateLimited: If the provider is saturated and the call was shed
+        """
+        client_name = extraction_tiers()[0]
+        if not circuit_breakers.for_client(client_name).allow():
             return None
+        
+        tokens = EXTRACTION_PROMPT_TOKENS + len(receipt_text) // CHARS_PER_TOKEN + EXTRACTION_OUTPUT_TOKENS
+        collector = Collector(name="ExtractReceiptDataFromText")
+        client = b.with_options(client_registry=_client_registry(client_name), collector=collector)
+        result = None
+        async with llm_rate_limiter.limit(client_name, tokens):
+            started = time.perf_counter()
+            try:
+                result = await client.ExtractReceiptDataFromText(receipt_text=receipt_text)
+                circuit_breakers.for_client(client_name).record_success()
+            except Exception as e:
+                logger.error(f"BAML text extraction with {client_name} failed: {str(e)}", exc_info=True)
+                circuit_breakers.for_client(client_name).record_failure()
+            finally:
+                metrics.observe("extraction_call_seconds", time.perf_counter() - started, client=client_name)
+        _report_call(
+            ExtractionCall.from_collector(collector, "ExtractReceiptDataFromText", client_name, 0, succeeded=result is not None),
+            client_name,
+            calls
+        )
+        
+        if result is None or not BAMLService.validate_extracted_data(result) or not BAMLService.amounts_reconcile(result):
+            return None
+        if f"{result.total_amount:.2f}" not in receipt_text:
+            logger.info(f"Text extraction total {result.total_amount:.2f} does not appear in the OCR text")
+            return None
+        return result
+    
+    @staticmethod
+    def amounts_reconcile(data: ReceiptData) -> bool:
+        """
+        Check that the extracted amounts add up.
+        
+        Args:
+            data: Extracted receipt data
+            
+        Returns:
+            True if subtotal plus tax equals the total, and any tax breakdowns
+            add up to the tax amount
+        """
+        if abs(data.subtotal_amount + data.tax_amount - data.total_amount) > AMOUNT_TOLERANCE:
+            return False
+        
+        if data.tax_breakdowns:
+            breakdown_total = sum(breakdown.amount for breakdown in data.tax_breakdowns)
+            if abs(breakdown_total - data.tax_amount) > AMOUNT_TOLERANCE:
+                return False
+        
+        return True
     
     @staticmethod
     def validate_extracted_data(data: ReceiptData) -> bool:
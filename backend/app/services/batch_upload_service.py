@@ -0,0 +1,163 @@
+import asyncio
+import mimetypes
+import zipfile
+from dataclasses import dataclass
+from typing import IO, Any, AsyncIterable, AsyncIterator, Awaitable, Callable, List, Optional, TypeVar
+
+from app.core.config import settings
+from app.services.upload_service import IngestedUpload, UploadTooLarge, ingest_fileobj
+
+T = TypeVar("T")
+
+ZIP_CONTENT_TYPES = {"application/zip", "application/x-zip-compressed"}
+
+
+@dataclass
+class BatchItem:
+    """One receipt in a batch upload, or the reason it could not be read."""
+    index: int
+    filename: Optional[str]
+    upload: Optional[IngestedUpload] = None
+    error: Optional[str] = None
+
+
+def is_zip_upload(content_type: Optional[str], filename: Optional[str]) -> bool:
+    """Check whether an uploaded file is a ZIP archive of receipts."""
+    if content_type in ZIP_CONTENT_TYPES:
+        return True
+    return bool(filename and filename.lower().endswith(".zip"))
+
+
+def list_zip_members(zf: zipfile.ZipFile) -> List[zipfile.ZipInfo]:
+    """
+    List the files in a receipt archive, skipping folders and OS metadata.
+
+    Args:
+        zf: The opened archive
+
+    Returns:
+        Entries for the files in the archive
+    """
+    members = []
+    for info in zf.infolist():
+        name = info.filename.rsplit("/", 1)[-1]
+        if info.is_dir() or info.filename.startswith("__MACOSX/") or name.startswith("."):
+            continue
+        members.append(info)
+    return members
+
+
+def read_zip_member(zf: zipfile.ZipFile, info: zipfile.ZipInfo) -> IngestedUpload:
+    """
+    Spool one receipt image out of an archive.
+
+    Args:
+        zf: The opened archive
+        info: Entry returned by list_zip_members
+
+    Returns:
+        The spooled member and its content hash
+
+    Raises:
+        UploadTooLarge: If the member is larger than MAX_UPLOAD_BYTES
+    """
+    # Check the declared size first so a ZIP bomb is never decompressed;
+    # the spooler still enforces the limit on the bytes actually read
+    if info.file_size > settings.MAX_UPLOAD_BYTES:
+        raise UploadTooLarge(f"File exceeds the maximum size of {settings.MAX_UPLOAD_BYTES} bytes")
+
+    content_type = mimetypes.guess_type(info.filename)[0] or "application/octet-stream"
+    with zf.open(info) as member:
+        return ingest_fileobj(member, content_type, info.filename.rsplit("/", 1)[-1])
+
+
+async def iter_archive_items(archive: IO[bytes], start_index: int) -> AsyncIterator[BatchItem]:
+    """
+    Read the receipts in an archive one at a time without blocking the event loop.
+
+    Args:
+        archive: Seekable file containing the ZIP archive
+        start_index: Batch index assigned to the first member
+
+    Yields:
+        One batch item per file in the archive
+    """
+    try:
+        zf = await asyncio.to_thread(zipfile.ZipFile, archive)
+    except zipfile.BadZipFile:
+        yield BatchItem(index=start_index, filename=None, error="File is not a valid ZIP archive")
+        return
+
+    with zf:
+        # Members are read one after another, so the archive is never shared between threads
+        for offset, info in enumerate(list_zip_members(zf)):
+            index = start_index + offset
+            try:
+                upload = await asyncio.to_thread(read_zip_member, zf, info)
+            except (UploadTooLarge, zipfile.BadZipFile, RuntimeError) as e:
+                yield BatchItem(index=index, filename=info.filename, error=str(e))
+                continue
+            yield BatchItem(index=index, filename=upload.filename, upload=upload)
+
+
+async def run_bounded(
+    items: AsyncIterable[T],
+    func: Callable[[T], Awaitable[Any]],
+    concurrency: int
+) -> AsyncIterator[Any]:
+    """
+    Apply func to items with at most `concurrency` calls in flight.
+
+    Items are only pulled from the source when a slot is free, so a large
+    archive is never read ahead of the work. Results are yielded in
+    completion order.
+
+    Args:
+        items: Source of work items
+        func: Coroutine function applied to each item
+        concurrency: Maximum number of concurrent calls
+
+    Yields:
+        Results of func as they complete
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    results: asyncio.Queue = asyncio.Queue()
+    tasks = set()
+    done_marker = object()
+
+    async def run(item: T) -> None:
+        try:
+            await results.put(await func(item))
+        finally:
+            semaphore.release()
+
+    async def produce() -> None:
+        iterator = items.__aiter__()
+        try:
+            while True:
+                # Take a slot before reading the next item so reads never run ahead
+                await semaphore.acquire()
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    semaphore.release()
+                    break
+                task = asyncio.create_task(run(item))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            await results.put(done_marker)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while (result := await results.get()) is not done_marker:
+            yield result
+        # Surface errors raised while reading the source
+        await producer
+    finally:
+        # The client went away or the source failed: stop outstanding work
+        producer.cancel()
+        for task in list(tasks):
+            task.cancel()
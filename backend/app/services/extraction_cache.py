@@ -0,0 +1,169 @@
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.models import ExtractionCacheEntry
+from baml_client.inlinedbaml import get_baml_files
+from baml_client.types import ReceiptData
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def baml_source_digest() -> str:
+    """
+    Digest of the BAML source the client was generated from.
+
+    Changing a prompt, schema or client in baml_src and regenerating the
+    client changes the digest, so results of the old version are never hit.
+    """
+    hasher = hashlib.sha256()
+    for name, source in sorted(get_baml_files().items()):
+        hasher.update(name.encode("utf-8"))
+        hasher.update(b"\0")
+        hasher.update(source.encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+class ExtractionCache:
+    """
+    Extraction results keyed by image content hash and BAML source digest.
+
+    Lookups check an in-memory LRU of recent results first, then the
+    extractioncacheentry table shared by all processes. Entries expire
+    EXTRACTION_CACHE_TTL_SECONDS after they were last used.
+    """
+
+    def __init__(self, max_memory_entries: int, ttl_seconds: int):
+        self.max_memory_entries = max_memory_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[datetime, ReceiptData]]" = OrderedDict()
+
+    async def get(self, session: AsyncSession, content_hash: str) -> Optional[ReceiptData]:
+        """
+        Look up the cached extraction of an image.
+
+        Args:
+            session: Database session
+            content_hash: SHA-256 of the original image
+
+        Returns:
+            A copy of the cached data, or None on a miss
+        """
+        now = datetime.utcnow()
+        key = (content_hash, baml_source_digest())
+
+        cached = self._entries.get(key)
+        if cached:
+            expires_at, data = cached
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                metrics.increment("extraction_cache_lookups_total", result="memory_hit")
+                return data.model_copy(deep=True)
+            del self._entries[key]
+            metrics.increment("extraction_cache_evictions_total", reason="expired")
+
+        result = await session.exec(
+            select(ExtractionCacheEntry).where(
+                ExtractionCacheEntry.content_hash == content_hash,
+                ExtractionCacheEntry.prompt_digest == key[1],
+                ExtractionCacheEntry.expires_at > now
+            )
+        )
+        entry = result.first()
+        if not entry:
+            metrics.increment("extraction_cache_lookups_total", result="miss")
+            return None
+
+        try:
+            data = ReceiptData.model_validate_json(entry.result)
+        except ValueError as e:
+            # Written by an incompatible client version; treat as a miss and let it be replaced
+            logger.warning(f"Discarding unreadable extraction cache entry {entry.id}: {e}")
+            metrics.increment("extraction_cache_lookups_total", result="miss")
+            return None
+
+        # Keep results that are still being used
+        entry.hit_count += 1
+        entry.last_hit_at = now
+        entry.expires_at = now + timedelta(seconds=self.ttl_seconds)
+        session.add(entry)
+        self._remember(key, entry.expires_at, data)
+        metrics.increment("extraction_cache_lookups_total", result="database_hit")
+        return data.model_copy(deep=True)
+
+    async def put(self, session: AsyncSession, content_hash: str, data: ReceiptData) -> None:
+        """
+        Cache the extraction of an image.
+
+        The entry is added to the session and committed with the caller's
+        transaction. If another process cached the same image first, its
+        entry is kept.
+
+        Args:
+            session: Database session
+            content_hash: SHA-256 of the original image
+            data: Extracted data to cache
+        """
+        key = (content_hash, baml_source_digest())
+        expires_at = datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+        entry = ExtractionCacheEntry(
+            content_hash=content_hash,
+            prompt_digest=key[1],
+            result=data.model_dump_json(),
+            expires_at=expires_at
+        )
+        try:
+            # A savepoint, so a concurrent insert does not roll back the caller's changes
+            async with session.begin_nested():
+                session.add(entry)
+        except IntegrityError:
+            logger.debug(f"Extraction of image {content_hash} was already cached")
+            return
+        self._remember(key, expires_at, data.model_copy(deep=True))
+
+    def _remember(self, key: Tuple[str, str], expires_at: datetime, data: ReceiptData) -> None:
+        """Add a result to the in-memory tier, evicting the least recently used beyond its size."""
+        self._entries[key] = (expires_at, data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_memory_entries:
+            self._entries.popitem(last=False)
+            metrics.increment("extraction_cache_evictions_total", reason="lru")
+        metrics.set_gauge("extraction_cache_memory_entries", len(self._entries))
+
+    async def purge_expired(self, session: AsyncSession) -> int:
+        """
+        Delete expired entries.
+
+        Entries of other BAML source versions are left to expire, since
+        workers of both versions run side by side during a rolling deploy.
+
+        Args:
+            session: Database session
+
+        Returns:
+            Number of entries deleted
+        """
+        result = await session.exec(
+            delete(ExtractionCacheEntry).where(ExtractionCacheEntry.expires_at <= datetime.utcnow())
+        )
+        await session.commit()
+        metrics.increment("extraction_cache_evictions_total", result.rowcount, reason="purged")
+        return result.rowcount
+
+
+extraction_cache = ExtractionCache(
+    max_memory_entries=settings.EXTRACTION_CACHE_MEMORY_ENTRIES,
+    ttl_seconds=settings.EXTRACTION_CACHE_TTL_SECONDS
+)
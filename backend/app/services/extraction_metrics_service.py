@@ -0,0 +1,101 @@
+import logging
+import uuid
+from datetime import date, datetime
+from typing import List, Optional
+
+from sqlalchemy import func
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.db import async_session_factory
+from app.models.models import ExtractionMetric, Receipt
+from app.services.baml_service import ExtractionCall
+
+logger = logging.getLogger(__name__)
+
+
+async def record_extraction_calls(receipt_id: uuid.UUID, calls: List[ExtractionCall]) -> None:
+    """
+    Store the telemetry of a receipt's model calls.
+
+    Uses its own session so calls are recorded even when the extraction
+    job fails and rolls back.
+
+    Args:
+        receipt_id: ID of the receipt the calls extracted
+        calls: Telemetry collected by BAMLService.extract_receipt_data
+    """
+    if not calls:
+        return
+    try:
+        async with async_session_factory() as session:
+            for call in calls:
+                session.add(ExtractionMetric(
+                    receipt_id=receipt_id,
+                    function_name=call.function_name,
+                    client_name=call.client_name,
+                    provider=call.provider,
+                    tier=call.tier,
+                    succeeded=call.succeeded,
+                    latency_ms=call.latency_ms,
+                    input_tokens=call.input_tokens,
+                    output_tokens=call.output_tokens,
+                    retries=call.retries
+                ))
+            await session.commit()
+    except Exception as e:
+        # Telemetry must never fail an extraction
+        logger.error(f"Could not record extraction metrics for receipt {receipt_id}: {e}", exc_info=True)
+
+
+async def daily_extraction_stats(
+    session: AsyncSession,
+    organization_id: uuid.UUID,
+    since: date,
+    client_name: Optional[str] = None
+) -> List[dict]:
+    """
+    Aggregate an organization's extraction calls per day and client.
+
+    Percentiles are computed by Postgres with percentile_cont.
+
+    Args:
+        session: Database session
+        organization_id: ID of the organization whose receipts are included
+        since: First day to include
+        client_name: Only include calls answered by this client
+
+    Returns:
+        One row per day and client, newest first
+    """
+    day = func.date(ExtractionMetric.created_at)
+    latency = ExtractionMetric.latency_ms
+    statement = (
+        select(
+            day.label("day"),
+            ExtractionMetric.client_name,
+            func.count().label("calls"),
+            func.count().filter(ExtractionMetric.succeeded.is_(False)).label("failures"),
+            func.sum(ExtractionMetric.retries).label("retries"),
+            func.percentile_cont(0.5).within_group(latency).label("latency_p50_ms"),
+            func.percentile_cont(0.95).within_group(latency).label("latency_p95_ms"),
+            func.percentile_cont(0.99).within_group(latency).label("latency_p99_ms"),
+            func.sum(ExtractionMetric.input_tokens).label("input_tokens"),
+            func.sum(ExtractionMetric.output_tokens).label("output_tokens"),
+            func.avg(ExtractionMetric.input_tokens).label("avg_input_tokens"),
+            func.avg(ExtractionMetric.output_tokens).label("avg_output_tokens"),
+        )
+        .join(Receipt, Receipt.id == ExtractionMetric.receipt_id)
+        .where(
+            Receipt.organization_id == organization_id,
+            ExtractionMetric.created_at >= datetime.combine(since, datetime.min.time())
+        )
+        .group_by(day, ExtractionMetric.client_name)
+        .order_by(day.desc(), ExtractionMetric.client_name)
+    )
+    if client_name:
+        statement = statement.where(ExtractionMetric.client_name == client_name)
+
+    result = await session.exec(statement)
+    return [row._asdict() for row in result.all()]
+
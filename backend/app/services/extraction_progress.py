@@ -0,0 +1,88 @@
+import logging
+import time
+import uuid
+from typing import Optional, Tuple
+
+from baml_client import stream_types
+from sqlalchemy import update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.db import async_session_factory
+from app.models.models import ExtractionJob, ExtractionJobStatus, Receipt
+
+logger = logging.getLogger(__name__)
+
+# Fields the review screen fills in first; they are published as soon as they appear
+KEY_FIELDS = ("vendor_name", "total_amount", "purchase_date")
+
+
+class PartialResultPublisher:
+    """
+    Publish the fields a streaming extraction has produced so far.
+
+    Snapshots are written to the receipt's running job in their own
+    session, so API processes can read them while the worker's transaction
+    is still open. Writes are throttled to one per min_interval seconds,
+    except when a key field first appears.
+    """
+
+    def __init__(self, receipt_id: uuid.UUID, min_interval: float):
+        self.receipt_id = receipt_id
+        self.min_interval = min_interval
+        self._last_json: Optional[str] = None
+        self._last_keys: Tuple[bool, ...] = ()
+        self._published_at = 0.0
+
+    async def __call__(self, partial: stream_types.ReceiptData) -> None:
+        partial_json = partial.model_dump_json(exclude_none=True)
+        if partial_json == self._last_json:
+            return
+        keys = tuple(getattr(partial, name) is not None for name in KEY_FIELDS)
+        if keys == self._last_keys and time.monotonic() - self._published_at < self.min_interval:
+            return
+
+        try:
+            async with async_session_factory() as session:
+                await session.exec(
+                    update(ExtractionJob)
+                    .where(
+                        ExtractionJob.receipt_id == self.receipt_id,
+                        ExtractionJob.status == ExtractionJobStatus.running
+                    )
+                    .values(partial_result=partial_json)
+                )
+                await session.commit()
+        except Exception as e:
+            # Partial results are a convenience and must never fail an extraction
+            logger.warning(f"Could not publish partial extraction of receipt {self.receipt_id}: {e}")
+            return
+        self._last_json = partial_json
+        self._last_keys = keys
+        self._published_at = time.monotonic()
+
+
+async def get_extraction_progress(
+    session: AsyncSession,
+    receipt_id: uuid.UUID
+) -> Tuple[Optional[Receipt], Optional[ExtractionJob]]:
+    """
+    Read a receipt with its most recent extraction job.
+
+    Args:
+        session: Database session
+        receipt_id: ID of the receipt
+
+    Returns:
+        Tuple of the receipt and its latest job, either of which may be None
+    """
+    receipt = await session.get(Receipt, receipt_id)
+    if not receipt:
+        return None, None
+    result = await session.exec(
+        select(ExtractionJob)
+        .where(ExtractionJob.receipt_id == receipt_id)
+        .order_by(ExtractionJob.created_at.desc())
+        .limit(1)
+    )
+    return receipt, result.first()
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import logging
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from fastapi import Header, HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.models import IdempotencyKey, IdempotencyStatus
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyError(Exception):
+    """Raised when a request cannot be run under its idempotency key."""
+
+
+class IdempotencyKeyInProgress(IdempotencyError):
+    """Raised when another request with the same key has not finished yet."""
+
+
+class IdempotencyKeyReused(IdempotencyError):
+    """Raised when a key is sent again with a different request."""
+
+
+@dataclass
+class IdempotentResponse:
+    """The response of an idempotent request and whether it was replayed."""
+    status_code: int
+    body: Any
+    replayed: bool = False
+
+
+def idempotency_key_header(
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+) -> Optional[str]:
+    """Dependency reading the Idempotency-Key header, rejecting keys that cannot be stored."""
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key must be 1 to 255 characters")
+    return idempotency_key
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """Hash the parts of a request that a retry must repeat exactly."""
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+def idempotent_response(response: Response, result: IdempotentResponse) -> Any:
+    """
+    Apply a result's status code to the endpoint's response and return its body.
+
+    Replayed responses are marked with an Idempotent-Replayed header.
+    """
+    response.status_code = result.status_code
+    if result.replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result.body
+
+
+class IdempotencyStore:
+    """Stored responses of mutations, keyed by the client's Idempotency-Key header."""
+
+    @staticmethod
+    async def run(
+        session: AsyncSession,
+        key: Optional[str],
+        user_id: uuid.UUID,
+        endpoint: str,
+        request_hash: str,
+        func: Callable[[], Awaitable[Tuple[int, Any]]]
+    ) -> IdempotentResponse:
+        """
+        Run a mutation once per idempotency key, replaying its stored response on retries.
+
+        Without a key the mutation simply runs. If the mutation raises, the
+        key is released so the client can retry it.
+
+        Args:
+            session: Database session (also used by func)
+            key: Value of the Idempotency-Key header, if any
+            user_id: ID of the user making the request
+            endpoint: Identifies the operation the key applies to
+            request_hash: Fingerprint of the request, from request_fingerprint
+            func: Coroutine function performing the mutation, returning the status code and body
+
+        Returns:
+            The response to send
+
+        Raises:
+            IdempotencyKeyInProgress: If a request with the same key is still running
+            IdempotencyKeyReused: If the key was used for a different request
+        """
+        if not key:
+            status_code, body = await func()
+            return IdempotentResponse(status_code=status_code, body=body)
+
+        record = await IdempotencyStore._reserve(session, key, user_id, endpoint, request_hash)
+        if record.status == IdempotencyStatus.completed:
+            metrics.increment("idempotency_requests_total", outcome="replayed")
+            return IdempotentResponse(
+                status_code=record.response_status_code,
+                body=json.loads(record.response_body),
+                replayed=True
+            )
+
+        record_id = record.id
+        try:
+            status_code, body = await func()
+        except BaseException:
+            await IdempotencyStore._release(session, record_id)
+            raise
+
+        body = jsonable_encoder(body)
+        record = await session.get(IdempotencyKey, record_id)
+        record.status = IdempotencyStatus.completed
+        record.response_status_code = status_code
+        record.response_body = json.dumps(body)
+        session.add(record)
+        await session.commit()
+        metrics.increment("idempotency_requests_total", outcome="completed")
+        return IdempotentResponse(status_code=status_code, body=body)
+
+    @staticmethod
+    async def _reserve(
+        session: AsyncSession,
+        key: str,
+        user_id: uuid.UUID,
+        endpoint: str,
+        request_hash: str
+    ) -> IdempotencyKey:
+        """Claim a key for this request, or return the completed record it already has."""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+        record = IdempotencyKey(
+            key=key,
+            endpoint=endpoint,
+            request_hash=request_hash,
+            user_id=user_id,
+            expires_at=expires_at
+        )
+        session.add(record)
+        try:
+            await session.commit()
+            return record
+        except IntegrityError:
+            await session.rollback()
+
+        result = await session.exec(
+            select(IdempotencyKey).where(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.endpoint == endpoint,
+                IdempotencyKey.key == key
+            )
+        )
+        existing = result.first()
+        if not existing:
+            # Released by a failed request in the meantime
+            metrics.increment("idempotency_requests_total", outcome="conflict")
+            raise IdempotencyKeyInProgress("A request with this idempotency key is in progress")
+
+        # A request that crashed without releasing its key must not block retries until it expires
+        abandoned = (
+            existing.status == IdempotencyStatus.in_progress
+            and existing.created_at <= now - timedelta(seconds=settings.IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS)
+        )
+        if existing.expires_at <= now or abandoned:
+            existing.request_hash = request_hash
+            existing.status = IdempotencyStatus.in_progress
+            existing.response_status_code = None
+            existing.response_body = None
+            existing.created_at = now
+            existing.expires_at = expires_at
+            session.add(existing)
+            await session.commit()
+            return existing
+
+        if existing.request_hash != request_hash:
+            metrics.increment("idempotency_requests_total", outcome="mismatch")
+            raise IdempotencyKeyReused("This idempotency key was already used for a different request")
+        if existing.status == IdempotencyStatus.in_progress:
+            metrics.increment("idempotency_requests_total", outcome="conflict")
+            raise IdempotencyKeyInProgress("A request with this idempotency key is in progress")
+        return existing
+
+    @staticmethod
+    async def _release(session: AsyncSession, record_id: uuid.UUID) -> None:
+        """Delete a key whose request failed, so a retry runs it again."""
+        try:
+            await session.rollback()
+            await session.exec(delete(IdempotencyKey).where(IdempotencyKey.id == record_id))
+            await session.commit()
+        except Exception as e:
+            # The key is treated as abandoned after IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS
+            logger.error(f"Could not release idempotency key {record_id}: {e}")
+
+    @staticmethod
+    async def purge_expired(session: AsyncSession) -> int:
+        """
+        Delete stored responses whose TTL has passed.
+
+        Args:
+            session: Database session
+
+        Returns:
+            Number of keys deleted
+        """
+        result = await session.exec(
+            delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow())
+        )
+        await session.commit()
+        return result.rowcount
@@ -0,0 +1,283 @@
+import io
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from PIL import Image, ImageFilter, ImageOps
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.process_pool import run_in_process
+
+logger = logging.getLogger(__name__)
+
+# Size of the thumbnail used to find the document in a photo
+_CROP_ANALYSIS_EDGE = 256
+# Share of light pixels a row or column needs to count as part of the document
+_MIN_LIGHT_FRACTION = 0.5
+# Only crop when the detected document covers a plausible share of the photo
+_MIN_CROP_AREA_FRACTION = 0.1
+_MAX_CROP_AREA_FRACTION = 0.95
+# Margin kept around the detected document, as a fraction of its size
+_CROP_MARGIN_FRACTION = 0.03
+# Vision models bill per tile; an edge this close past a tile boundary is shrunk onto it
+_VISION_TILE_EDGE = 512
+_MAX_TILE_SNAP_FRACTION = 0.15
+
+
+@dataclass
+class NormalizedImage:
+    """An image prepared for extraction, with what normalization saved."""
+    data: bytes
+    content_type: str
+    original_bytes: int
+    original_size: Tuple[int, int]
+    original_tokens: int
+    size: Tuple[int, int]
+    tokens: int
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - len(self.data)
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.tokens
+
+
+def estimate_vision_tokens(width: int, height: int) -> int:
+    """
+    Estimate the input tokens a high-detail vision model bills for an image.
+
+    Follows OpenAI's published formula: the image is fitted into 2048x2048,
+    its shortest side scaled to 768, then billed 170 tokens per 512px tile
+    plus a base of 85.
+    """
+    if width <= 0 or height <= 0:
+        return 0
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    tiles = math.ceil(width / 512) * math.ceil(height / 512)
+    return 85 + 170 * tiles
+
+
+def image_dimensions(image_data: bytes) -> Tuple[int, int]:
+    """Width and height of an encoded image, read from its header, or (0, 0) if it cannot be read."""
+    try:
+        with Image.open(io.BytesIO(image_data)) as image:
+            return image.size
+    except Exception:
+        return 0, 0
+
+
+def _tile_aligned_size(width: int, height: int) -> Tuple[int, int]:
+    """
+    Shrink an image slightly when an edge just spills into another billing tile.
+
+    Only applies to images the provider will not rescale itself (shortest
+    side within 768, longest within 2048), since their tiles are counted on
+    the pixels as sent.
+    """
+    if min(width, height) > 768 or max(width, height) > 2048:
+        return width, height
+    scale = 1.0
+    for edge in (width, height):
+        overflow = edge % _VISION_TILE_EDGE
+        if edge > _VISION_TILE_EDGE and overflow and overflow <= edge * _MAX_TILE_SNAP_FRACTION:
+            scale = min(scale, (edge - overflow) / edge)
+    return int(width * scale), int(height * scale)
+
+
+def _otsu_threshold(histogram: list) -> int:
+    """Pick the grey level that best separates a histogram into two classes."""
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    background_count = 0
+    background_sum = 0.0
+    best_threshold, best_variance = 0, 0.0
+    for level, count in enumerate(histogram):
+        background_count += count
+        if background_count == 0:
+            continue
+        foreground_count = total - background_count
+        if foreground_count == 0:
+            break
+        background_sum += level * count
+        background_mean = background_sum / background_count
+        foreground_mean = (weighted_total - background_sum) / foreground_count
+        variance = background_count * foreground_count * (background_mean - foreground_mean) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = level, variance
+    return best_threshold
+
+
+def _longest_run(fractions: List[float], minimum: float) -> Optional[Tuple[int, int]]:
+    """Return the [start, end) span of the longest run of values at or above minimum."""
+    best: Optional[Tuple[int, int]] = None
+    start = None
+    for index, fraction in enumerate(fractions + [0.0]):
+        if fraction >= minimum and start is None:
+            start = index
+        elif fraction < minimum and start is not None:
+            if best is None or index - start > best[1] - best[0]:
+                best = (start, index)
+            start = None
+    return best
+
+
+def _document_bbox(image: Image.Image) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Find the bounding box of a light document on a darker background.
+
+    The photo is thresholded on a small thumbnail, then the widest band of
+    mostly-light columns is taken as the document and trimmed to the rows
+    that are mostly light within that band. Light clutter at the edges of
+    the photo (hands, other papers) does not fill whole columns and is cut.
+
+    Returns:
+        The box in the image's coordinates, or None if no plausible document was found
+    """
+    thumbnail = image.convert("L")
+    thumbnail.thumbnail((_CROP_ANALYSIS_EDGE, _CROP_ANALYSIS_EDGE))
+    # Smooth out text and specks so only large light regions survive
+    thumbnail = thumbnail.filter(ImageFilter.MedianFilter(5))
+    threshold = _otsu_threshold(thumbnail.histogram())
+    width, height = thumbnail.size
+    pixels = [1 if value > threshold else 0 for value in thumbnail.getdata()]
+    rows = [pixels[y * width:(y + 1) * width] for y in range(height)]
+
+    columns = _longest_run([sum(row[x] for row in rows) / height for x in range(width)], _MIN_LIGHT_FRACTION)
+    if not columns:
+        return None
+    left, right = columns
+    rows_span = _longest_run([sum(row[left:right]) / (right - left) for row in rows], _MIN_LIGHT_FRACTION)
+    if not rows_span:
+        return None
+    top, bottom = rows_span
+
+    area_fraction = (right - left) * (bottom - top) / (width * height)
+    if not _MIN_CROP_AREA_FRACTION <= area_fraction <= _MAX_CROP_AREA_FRACTION:
+        return None
+
+    scale_x = image.width / width
+    scale_y = image.height / height
+    margin_x = (right - left) * scale_x * _CROP_MARGIN_FRACTION
+    margin_y = (bottom - top) * scale_y * _CROP_MARGIN_FRACTION
+    return (
+        max(0, int(left * scale_x - margin_x)),
+        max(0, int(top * scale_y - margin_y)),
+        min(image.width, int(math.ceil(right * scale_x + margin_x))),
+        min(image.height, int(math.ceil(bottom * scale_y + margin_y)))
+    )
+
+
+def normalize_image(
+    image_data: bytes,
+    max_long_edge: int,
+    jpeg_quality: int,
+    grayscale: bool
+) -> Tuple[bytes, Tuple[int, int], Tuple[int, int]]:
+    """
+    Rotate, crop, downscale and recompress a receipt photo.
+
+    After cropping, the image is downscaled to max_long_edge and then nudged
+    onto vision-model tile boundaries where that saves a tile.
+
+    This is CPU-bound and runs in the process pool, so it takes and returns
+    plain picklable values.
+
+    Args:
+        image_data: Encoded image
+        max_long_edge: Longest edge of the output in pixels
+        jpeg_quality: JPEG quality of the output
+        grayscale: Whether to drop colour
+
+    Returns:
+        Tuple of the JPEG bytes, the original size and the output size
+    """
+    with Image.open(io.BytesIO(image_data)) as image:
+        original_size = image.size
+        # Phones store the orientation in EXIF instead of rotating the pixels
+        normalized = ImageOps.exif_transpose(image)
+
+        bbox = _document_bbox(normalized)
+        if bbox:
+            normalized = normalized.crop(bbox)
+
+        normalized = normalized.convert("L" if grayscale else "RGB")
+        if max(normalized.size) > max_long_edge:
+            normalized.thumbnail((max_long_edge, max_long_edge), Image.Resampling.LANCZOS)
+        tile_aligned = _tile_aligned_size(*normalized.size)
+        if tile_aligned != normalized.size:
+            normalized = normalized.resize(tile_aligned, Image.Resampling.LANCZOS)
+
+        output = io.BytesIO()
+        normalized.save(output, format="JPEG", quality=jpeg_quality, optimize=True)
+        return output.getvalue(), original_size, normalized.size
+
+
+async def normalize_for_extraction(image_data: bytes, content_type: str) -> NormalizedImage:
+    """
+    Shrink an image before it is sent to the extraction model.
+
+    The original is returned unchanged if normalization is disabled, fails,
+    or would not make the image smaller.
+
+    Args:
+        image_data: Image bytes as uploaded
+        content_type: MIME type of the image
+
+    Returns:
+        The image to send for extraction and what normalization saved
+    """
+    unchanged = NormalizedImage(
+        data=image_data,
+        content_type=content_type,
+        original_bytes=len(image_data),
+        original_size=(0, 0),
+        original_tokens=0,
+        size=(0, 0),
+        tokens=0
+    )
+    if not settings.IMAGE_NORMALIZATION_ENABLED:
+        return unchanged
+
+    started = time.perf_counter()
+    try:
+        data, original_size, size = await run_in_process(
+            normalize_image,
+            image_data,
+            settings.IMAGE_MAX_LONG_EDGE,
+            settings.IMAGE_JPEG_QUALITY,
+            settings.IMAGE_NORMALIZATION_GRAYSCALE
+        )
+    except Exception as e:
+        logger.warning(f"Image normalization failed, sending the original: {e}")
+        metrics.increment("image_normalizations_total", outcome="failed")
+        return unchanged
+    metrics.observe("image_normalization_seconds", time.perf_counter() - started)
+
+    original_tokens = estimate_vision_tokens(*original_size)
+    if len(data) >= len(image_data):
+        metrics.increment("image_normalizations_total", outcome="skipped")
+        unchanged.original_size = unchanged.size = original_size
+        unchanged.original_tokens = unchanged.tokens = original_tokens
+        return unchanged
+
+    normalized = NormalizedImage(
+        data=data,
+        content_type="image/jpeg",
+        original_bytes=len(image_data),
+        original_size=original_size,
+        original_tokens=original_tokens,
+        size=size,
+        tokens=estimate_vision_tokens(*size)
+    )
+    metrics.increment("image_normalizations_total", outcome="normalized")
+    metrics.increment("image_bytes_saved_total", normalized.bytes_saved)
+    metrics.increment("image_tokens_saved_total", max(normalized.tokens_saved, 0))
+    return normalized
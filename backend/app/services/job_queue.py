@@ -0,0 +1,312 @@
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import exists, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.models import ExtractionJob, ExtractionJobStatus, Receipt, ReceiptStatus
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionJobQueue:
+    """Postgres-backed queue of pending receipt extractions."""
+    
+    @staticmethod
+    def enqueue(session: AsyncSession, receipt_id: uuid.UUID) -> ExtractionJob:
+        """
+        Add an extraction job for a receipt.
+        
+        The job is only added to the session so that it is committed in the
+        same transaction as the receipt it belongs to.
+        
+        Args:
+            session: Database session
+            receipt_id: ID of the receipt to extract
+            
+        Returns:
+            The new job
+        """
+        job = ExtractionJob(receipt_id=receipt_id)
+        session.add(job)
+        return job
+    
+    @staticmethod
+    async def claim(session: AsyncSession) -> Optional[ExtractionJob]:
+        """
+        Claim the next runnable job and mark it as running.
+        
+        Args:
+            session: Database session
+            
+        Returns:
+            The claimed job, or None if the queue is empty
+        """
+        jobs = await ExtractionJobQueue.claim_batch(session, 1)
+        return jobs[0] if jobs else None
+    
+    @staticmethod
+    async def claim_batch(session: AsyncSession, limit: int) -> List[ExtractionJob]:
+        """
+        Claim up to limit runnable jobs, oldest first, and mark them as running.
+        
+        Uses SELECT ... FOR UPDATE SKIP LOCKED so that concurrent workers never
+        pick up the same job and never wait on each other's row locks.
+        
+        Args:
+            session: Database session
+            limit: Maximum number of jobs to claim
+            
+        Returns:
+            The claimed jobs, empty if the queue is empty
+        """
+        now = datetime.utcnow()
+        statement = (
+            select(ExtractionJob)
+            .where(
+                ExtractionJob.status == ExtractionJobStatus.queued,
+                ExtractionJob.run_after <= now
+            )
+            .order_by(ExtractionJob.run_after)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await session.exec(statement)
+        jobs = list(result.all())
+        
+        if not jobs:
+            await session.rollback()
+            return []
+        
+        for job in jobs:
+            job.status = ExtractionJobStatus.running
+            job.attempts += 1
+            job.locked_at = now
+            job.partial_result = None
+            session.add(job)
+        await session.commit()
+        return jobs
+    
+    @staticmethod
+    async def heartbeat(session: AsyncSession, job_ids: List[uuid.UUID]) -> None:
+        """
+        Refresh the lock of running jobs, so recover_stuck knows their worker is alive.
+        
+        Args:
+            session: Database session, used only for this update
+            job_ids: IDs of the jobs the worker is running
+        """
+        await session.exec(
+            update(ExtractionJob)
+            .where(
+                ExtractionJob.id.in_(job_ids),
+                ExtractionJob.status == ExtractionJobStatus.running
+            )
+            .values(locked_at=datetime.utcnow())
+        )
+        await session.commit()
+    
+    @staticmethod
+    async def complete(session: AsyncSession, job: ExtractionJob) -> None:
+        """
+        Mark a job as succeeded and commit any pending receipt changes with it.
+        
+        Args:
+            session: Database session
+            job: The running job
+        """
+        job.status = ExtractionJobStatus.succeeded
+        job.finished_at = datetime.utcnow()
+        job.last_error = None
+        session.add(job)
+        await session.commit()
+    
+    @staticmethod
+    async def defer(session: AsyncSession, job_id: uuid.UUID, delay_seconds: float, reason: str) -> Optional[ExtractionJob]:
+        """
+        Put a job back in the queue without counting the attempt.
+        
+        Used when the job could not run for reasons outside the receipt,
+        such as the LLM provider being saturated.
+        
+        Args:
+            session: Database session (rolled back after the interrupted attempt)
+            job_id: ID of the job
+            delay_seconds: How long to wait before running the job again
+            reason: Why the job was deferred
+            
+        Returns:
+            The updated job, or None if it no longer exists
+        """
+        job = await session.get(ExtractionJob, job_id)
+        if not job:
+            return None
+        
+        job.status = ExtractionJobStatus.queued
+        job.attempts = max(job.attempts - 1, 0)
+        job.last_error = reason
+        job.locked_at = None
+        job.run_after = datetime.utcnow() + timedelta(seconds=delay_seconds)
+        session.add(job)
+        await session.commit()
+        return job
+    
+    @staticmethod
+    def retry_delay(attempts: int) -> float:
+        """
+        Seconds to wait before retrying a job that failed attempts times.
+        
+        The delay doubles with each failure, from EXTRACTION_JOB_RETRY_DELAY_SECONDS
+        up to EXTRACTION_JOB_MAX_RETRY_DELAY_SECONDS.
+        """
+        delay = settings.EXTRACTION_JOB_RETRY_DELAY_SECONDS * 2 ** max(attempts - 1, 0)
+        return min(delay, settings.EXTRACTION_JOB_MAX_RETRY_DELAY_SECONDS)
+    
+    @staticmethod
+    async def fail(session: AsyncSession, job_id: uuid.UUID, error: str) -> Optional[ExtractionJob]:
+        """
+        Record a failed attempt, re-queueing the job until it runs out of attempts.
+        
+        A job that runs out of attempts moves its receipt to the
+        extraction_failed dead-letter state.
+        
+        Args:
+            session: Database session (rolled back after the failed attempt)
+            job_id: ID of the failed job
+            error: Description of the failure
+            
+        Returns:
+            The updated job, or None if it no longer exists
+        """
+        job = await session.get(ExtractionJob, job_id)
+        if not job:
+            return None
+        
+        await ExtractionJobQueue._record_failure(session, job, error)
+        await session.commit()
+        return job
+    
+    @staticmethod
+    async def _record_failure(session: AsyncSession, job: ExtractionJob, error: str) -> None:
+        """Re-queue a job after a failed attempt with backoff, or dead-letter it, without committing."""
+        now = datetime.utcnow()
+        job.last_error = error
+        job.locked_at = None
+        if job.attempts < settings.EXTRACTION_JOB_MAX_ATTEMPTS:
+            job.status = ExtractionJobStatus.queued
+            job.run_after = now + timedelta(seconds=ExtractionJobQueue.retry_delay(job.attempts))
+        else:
+            job.status = ExtractionJobStatus.failed
+            job.finished_at = now
+            logger.error(f"Extraction job {job.id} failed after {job.attempts} attempts: {error}")
+            await ExtractionJobQueue._dead_letter(session, job.receipt_id, error)
+        session.add(job)
+    
+    @staticmethod
+    async def _dead_letter(session: AsyncSession, receipt_id: uuid.UUID, error: str) -> None:
+        """Move a receipt that is still processing to extraction_failed, keeping the error."""
+        receipt = await session.get(Receipt, receipt_id)
+        if not receipt or receipt.status != ReceiptStatus.processing:
+            return
+        receipt.status = ReceiptStatus.extraction_failed
+        receipt.extraction_error = error
+        session.add(receipt)
+        metrics.increment("extraction_dead_letters_total")
+        logger.error(f"Receipt {receipt_id} moved to extraction_failed: {error}")
+    
+    @staticmethod
+    def redrive(session: AsyncSession, receipt: Receipt) -> ExtractionJob:
+        """
+        Queue a dead-lettered receipt for extraction again with a fresh set of attempts.
+        
+        The changes are added to the session but not committed.
+        
+        Args:
+            session: Database session
+            receipt: Receipt in the extraction_failed state
+            
+        Returns:
+            The new job
+        """
+        receipt.status = ReceiptStatus.processing
+        receipt.extraction_error = None
+        session.add(receipt)
+        metrics.increment("extraction_redrives_total")
+        return ExtractionJobQueue.enqueue(session, receipt.id)
+    
+    @staticmethod
+    async def recover_stuck(session: AsyncSession, limit: int = 100) -> int:
+        """
+        Retry extractions a dead worker or a lost job left stuck.
+        
+        Running jobs whose lock was not refreshed by a heartbeat for
+        EXTRACTION_JOB_LOCK_TIMEOUT_SECONDS count as a failed attempt. Receipts still processing after
+        RECEIPT_PROCESSING_TIMEOUT_SECONDS with no queued or running job get a
+        new job that carries over the attempts of their last one, so either way
+        a receipt that keeps failing ends up dead-lettered.
+        
+        Args:
+            session: Database session
+            limit: Maximum number of jobs and of receipts recovered per call
+            
+        Returns:
+            Number of jobs re-queued or dead-lettered
+        """
+        now = datetime.utcnow()
+        result = await session.exec(
+            select(ExtractionJob)
+            .where(
+                ExtractionJob.status == ExtractionJobStatus.running,
+                ExtractionJob.locked_at < now - timedelta(seconds=settings.EXTRACTION_JOB_LOCK_TIMEOUT_SECONDS)
+            )
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stale_jobs = list(result.all())
+        for job in stale_jobs:
+            logger.warning(f"Extraction job {job.id} has had no heartbeat since {job.locked_at}; its worker stopped")
+            await ExtractionJobQueue._record_failure(session, job, "Worker stopped while extracting")
+            metrics.increment("extraction_jobs_recovered_total", reason="stale_lock")
+        
+        active_job = exists().where(
+            ExtractionJob.receipt_id == Receipt.id,
+            ExtractionJob.status.in_([ExtractionJobStatus.queued, ExtractionJobStatus.running])
+        )
+        result = await session.exec(
+            select(Receipt)
+            .where(
+                Receipt.status == ReceiptStatus.processing,
+                Receipt.submitted_at < now - timedelta(seconds=settings.RECEIPT_PROCESSING_TIMEOUT_SECONDS),
+                ~active_job
+            )
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        orphaned = list(result.all())
+        for receipt in orphaned:
+            result = await session.exec(
+                select(ExtractionJob)
+                .where(ExtractionJob.receipt_id == receipt.id)
+                .order_by(ExtractionJob.created_at.desc())
+                .limit(1)
+            )
+            last_job = result.first()
+            attempts = last_job.attempts if last_job and last_job.status == ExtractionJobStatus.failed else 0
+            error = last_job.last_error if last_job and last_job.last_error else "Extraction never completed"
+            if attempts >= settings.EXTRACTION_JOB_MAX_ATTEMPTS:
+                await ExtractionJobQueue._dead_letter(session, receipt.id, error)
+            else:
+                job = ExtractionJobQueue.enqueue(session, receipt.id)
+                job.attempts = attempts
+                job.last_error = last_job.last_error if last_job else None
+                job.run_after = now + timedelta(seconds=ExtractionJobQueue.retry_delay(attempts))
+                logger.warning(f"Receipt {receipt.id} was stuck processing without a job; re-enqueued")
+            metrics.increment("extraction_jobs_recovered_total", reason="no_job")
+        
+        await session.commit()
+        return len(stale_jobs) + len(orphaned)
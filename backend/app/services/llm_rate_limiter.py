@@ -0,0 +1,208 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.baml_clients import load_client_providers
+
+
+class LLMRateLimited(Exception):
+    """Raised when a call is shed because the provider's queue is already too long."""
+
+    def __init__(self, message: str, provider: str, reason: str):
+        super().__init__(message)
+        self.provider = provider
+        self.reason = reason
+
+
+@dataclass
+class ProviderLimits:
+    """Published limits of one LLM provider account."""
+    max_concurrency: int
+    requests_per_minute: int
+    tokens_per_minute: int
+
+
+class TokenBucket:
+    """Allowance that refills continuously up to one minute's worth."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.available = float(per_minute)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def seconds_until(self, amount: float) -> float:
+        """Time until amount can be taken, assuming nothing else takes from the bucket."""
+        self._refill()
+        missing = min(amount, self.capacity) - self.available
+        return max(missing, 0.0) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.available -= min(amount, self.capacity)
+
+
+class ProviderRateLimiter:
+    """
+    Concurrency, request and token limits for one provider.
+
+    Calls wait in a FIFO queue: the call at the head waits until a
+    concurrency slot is free and both buckets can cover it, and no later
+    call overtakes it, so large requests are not starved by small ones.
+    Calls that would have to queue longer than max_wait_seconds are shed
+    immediately rather than left to run into the provider's 429s.
+    """
+
+    def __init__(self, provider: str, limits: ProviderLimits, max_queue: int, max_wait_seconds: float):
+        self.provider = provider
+        self.limits = limits
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self._requests = TokenBucket(limits.requests_per_minute)
+        self._tokens = TokenBucket(limits.tokens_per_minute)
+        self._inflight = 0
+        self._queue: Deque[object] = deque()
+        self._queued_tokens = 0
+        self._changed = asyncio.Condition()
+
+    def _estimated_wait(self, tokens: int) -> float:
+        """Time until a call joining the queue now could start, from the bucket refill rates."""
+        queued_requests = len(self._queue) + 1
+        return max(
+            self._requests.seconds_until(queued_requests),
+            self._tokens.seconds_until(self._queued_tokens + tokens)
+        )
+
+    def _shed(self, reason: str, message: str) -> None:
+        metrics.increment("llm_requests_shed_total", provider=self.provider, reason=reason)
+        raise LLMRateLimited(message, provider=self.provider, reason=reason)
+
+    def _report(self) -> None:
+        metrics.set_gauge("llm_queue_depth", len(self._queue), provider=self.provider)
+        metrics.set_gauge("llm_requests_inflight", self._inflight, provider=self.provider)
+
+    def has_headroom(self) -> bool:
+        """Whether a call could start now without queueing behind or ahead of others."""
+        return not self._queue and self._inflight < self.limits.max_concurrency and self._requests.seconds_until(1) == 0
+
+    @asynccontextmanager
+    async def limit(self, tokens: int) -> AsyncIterator[None]:
+        """
+        Hold a slot with the provider for the duration of a call.
+
+        Args:
+            tokens: Estimated input plus output tokens of the call
+
+        Raises:
+            LLMRateLimited: If the call is shed instead of queued
+        """
+        if len(self._queue) >= self.max_queue:
+            self._shed("queue_full", f"{self.provider} request queue is full")
+        if self._estimated_wait(tokens) > self.max_wait_seconds:
+            self._shed("wait_too_long", f"{self.provider} rate limit would delay the request too long")
+
+        ticket = object()
+        self._queue.append(ticket)
+        self._queued_tokens += tokens
+        self._report()
+        started = time.monotonic()
+        try:
+            async with self._changed:
+                while True:
+                    if self._queue[0] is ticket and self._inflight < self.limits.max_concurrency:
+                        delay = max(self._requests.seconds_until(1), self._tokens.seconds_until(tokens))
+                        if delay <= 0:
+                            break
+                        # Wait for the buckets to refill
+                        try:
+                            await asyncio.wait_for(self._changed.wait(), timeout=delay)
+                        except asyncio.TimeoutError:
+                            pass
+                    else:
+                        await self._changed.wait()
+                self._requests.take(1)
+                self._tokens.take(tokens)
+                self._inflight += 1
+        finally:
+            self._queue.remove(ticket)
+            self._queued_tokens -= tokens
+            self._report()
+            async with self._changed:
+                self._changed.notify_all()
+        metrics.observe("llm_queue_wait_seconds", time.monotonic() - started, provider=self.provider)
+
+        try:
+            yield
+        finally:
+            self._inflight -= 1
+            self._report()
+            async with self._changed:
+                self._changed.notify_all()
+
+
+class LLMRateLimiter:
+    """Rate limiters for the providers behind the BAML clients."""
+
+    def __init__(self, limits: Dict[str, ProviderLimits], max_queue: int, max_wait_seconds: float):
+        self._client_providers = load_client_providers()
+        self._limiters = {
+            provider: ProviderRateLimiter(provider, provider_limits, max_queue, max_wait_seconds)
+            for provider, provider_limits in limits.items()
+        }
+
+    def for_client(self, client_name: str) -> Optional[ProviderRateLimiter]:
+        """The limiter of a BAML client's provider, or None if the provider has no limits configured."""
+        provider = self._client_providers.get(client_name)
+        return self._limiters.get(provider)
+
+    def has_headroom(self, client_name: str) -> bool:
+        """Whether a call to the client could start now without delaying other calls."""
+        limiter = self.for_client(client_name)
+        return limiter is None or limiter.has_headroom()
+
+    @asynccontextmanager
+    async def limit(self, client_name: str, tokens: int) -> AsyncIterator[None]:
+        """
+        Wait for capacity before calling a BAML client.
+
+        Args:
+            client_name: Name of the client in clients.baml
+            tokens: Estimated input plus output tokens of the call
+
+        Raises:
+            LLMRateLimited: If the call is shed instead of queued
+        """
+        limiter = self.for_client(client_name)
+        if limiter is None:
+            yield
+            return
+        async with limiter.limit(tokens):
+            yield
+
+
+llm_rate_limiter = LLMRateLimiter(
+    limits={
+        "openai": ProviderLimits(
+            max_concurrency=settings.OPENAI_MAX_CONCURRENCY,
+            requests_per_minute=settings.OPENAI_REQUESTS_PER_MINUTE,
+            tokens_per_minute=settings.OPENAI_TOKENS_PER_MINUTE
+        ),
+        "anthropic": ProviderLimits(
+            max_concurrency=settings.ANTHROPIC_MAX_CONCURRENCY,
+            requests_per_minute=settings.ANTHROPIC_REQUESTS_PER_MINUTE,
+            tokens_per_minute=settings.ANTHROPIC_TOKENS_PER_MINUTE
+        ),
+    },
+    max_queue=settings.LLM_MAX_QUEUED_REQUESTS,
+    max_wait_seconds=settings.LLM_MAX_QUEUE_WAIT_SECONDS
+)
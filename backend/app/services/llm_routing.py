@@ -0,0 +1,178 @@
+import logging
+import math
+import time
+from collections import deque
+from enum import Enum
+from typing import Deque, Dict, Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.baml_clients import load_client_providers
+from app.services.llm_rate_limiter import LLMRateLimited
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpen(LLMRateLimited):
+    """Raised when every client that could serve a call belongs to a provider whose circuit is open."""
+
+
+class CircuitState(str, Enum):
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Stops routing calls to a provider that keeps failing.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    are refused for open_seconds. It then half-opens: calls are let through
+    again, and the next outcome either closes it or opens it again.
+    """
+
+    def __init__(self, provider: str, failure_threshold: int, open_seconds: float):
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = CircuitState.closed
+        self._failures = 0
+        self._opened_at = 0.0
+
+    def allow(self) -> bool:
+        """Whether a call may be sent to the provider now."""
+        if self.state == CircuitState.open and time.monotonic() - self._opened_at >= self.open_seconds:
+            self.state = CircuitState.half_open
+            logger.info(f"Circuit for {self.provider} is half-open, trying calls again")
+        return self.state != CircuitState.open
+
+    def record_success(self) -> None:
+        if self.state != CircuitState.closed:
+            logger.info(f"Circuit for {self.provider} closed")
+        self.state = CircuitState.closed
+        self._failures = 0
+        metrics.set_gauge("llm_circuit_open", 0, provider=self.provider)
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == CircuitState.half_open or self._failures >= self.failure_threshold:
+            if self.state != CircuitState.open:
+                logger.warning(f"Circuit for {self.provider} opened after {self._failures} consecutive failures")
+                metrics.increment("llm_circuit_opened_total", provider=self.provider)
+            self.state = CircuitState.open
+            self._opened_at = time.monotonic()
+            metrics.set_gauge("llm_circuit_open", 1, provider=self.provider)
+
+
+class ProviderCircuitBreakers:
+    """Circuit breakers for the providers behind the BAML clients."""
+
+    def __init__(self, failure_threshold: int, open_seconds: float):
+        self._client_providers = load_client_providers()
+        self._failure_threshold = failure_threshold
+        self._open_seconds = open_seconds
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def for_client(self, client_name: str) -> CircuitBreaker:
+        """The breaker of a BAML client's provider."""
+        provider = self._client_providers.get(client_name, client_name)
+        breaker = self._breakers.get(provider)
+        if breaker is None:
+            breaker = CircuitBreaker(provider, self._failure_threshold, self._open_seconds)
+            self._breakers[provider] = breaker
+        return breaker
+
+
+class LatencyTracker:
+    """Recent successful call latencies per client."""
+
+    def __init__(self, window: int, min_samples: int):
+        self.window = window
+        self.min_samples = min_samples
+        self._latencies: Dict[str, Deque[float]] = {}
+
+    def record(self, client_name: str, seconds: float) -> None:
+        latencies = self._latencies.get(client_name)
+        if latencies is None:
+            latencies = self._latencies[client_name] = deque(maxlen=self.window)
+        latencies.append(seconds)
+
+    def percentile(self, client_name: str, q: float) -> Optional[float]:
+        """The q-th quantile of the client's latencies, or None until min_samples were seen."""
+        latencies = self._latencies.get(client_name)
+        if not latencies or len(latencies) < self.min_samples:
+            return None
+        ordered = sorted(latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+
+class HedgePolicy:
+    """
+    When and where to send a second copy of a slow call.
+
+    A call is hedged once it has run longer than its client's measured
+    latency percentile. Hedges are paid for from a budget that every call
+    adds max_ratio to, so at most that share of calls is ever duplicated.
+    """
+
+    def __init__(
+        self,
+        partners: Dict[str, str],
+        latencies: LatencyTracker,
+        percentile: float,
+        default_delay: float,
+        min_delay: float,
+        max_ratio: float
+    ):
+        self.partners = partners
+        self.latencies = latencies
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_ratio = max_ratio
+        self._budget = 1.0
+
+    @classmethod
+    def parse_partners(cls, value: str) -> Dict[str, str]:
+        """Parse 'ClientA:ClientB,ClientC:ClientD' into a mapping."""
+        partners = {}
+        for pair in value.split(","):
+            if ":" in pair:
+                client, hedge_client = pair.split(":", 1)
+                partners[client.strip()] = hedge_client.strip()
+        return partners
+
+    def hedge_client(self, client_name: str) -> Optional[str]:
+        return self.partners.get(client_name)
+
+    def delay(self, client_name: str) -> float:
+        """Seconds to wait for a call before hedging it."""
+        measured = self.latencies.percentile(client_name, self.percentile)
+        return max(self.min_delay, measured if measured is not None else self.default_delay)
+
+    def record_call(self) -> None:
+        # Capped so a long quiet spell cannot fund a burst of hedges
+        self._budget = min(self._budget + self.max_ratio, 10.0)
+
+    def try_spend(self) -> bool:
+        """Take one hedge from the budget, if it can afford one."""
+        if self._budget < 1.0:
+            return False
+        self._budget -= 1.0
+        return True
+
+
+circuit_breakers = ProviderCircuitBreakers(
+    failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+    open_seconds=settings.LLM_CIRCUIT_OPEN_SECONDS
+)
+
+hedge_policy = HedgePolicy(
+    partners=HedgePolicy.parse_partners(settings.EXTRACTION_HEDGE_CLIENTS),
+    latencies=LatencyTracker(window=settings.EXTRACTION_HEDGE_LATENCY_WINDOW, min_samples=settings.EXTRACTION_HEDGE_MIN_SAMPLES),
+    percentile=settings.EXTRACTION_HEDGE_PERCENTILE,
+    default_delay=settings.EXTRACTION_HEDGE_DEFAULT_DELAY_SECONDS,
+    min_delay=settings.EXTRACTION_HEDGE_MIN_DELAY_SECONDS,
+    max_ratio=settings.EXTRACTION_HEDGE_MAX_RATIO
+)
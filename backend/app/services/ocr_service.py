@@ -0,0 +1,92 @@
+import io
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import pytesseract
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.process_pool import run_in_process
+
+logger = logging.getLogger(__name__)
+
+# Tesseract page segmentation mode 4: a single column of text of variable sizes, as on till receipts
+_TESSERACT_CONFIG = "--psm 4"
+
+
+@dataclass
+class OcrText:
+    """Text read from a receipt image by OCR."""
+    text: str
+    confidence: float
+    words: int
+
+
+def read_image_text(image_data: bytes, language: str) -> Tuple[str, float, int]:
+    """
+    Read the text of an image with Tesseract.
+
+    Runs in the process pool, so it takes and returns plain picklable values.
+
+    Returns:
+        Tuple of the text line by line, the mean word confidence (0-100)
+        and the number of words read
+    """
+    try:
+        with Image.open(io.BytesIO(image_data)) as image:
+            image = ImageOps.exif_transpose(image).convert("L")
+            data = pytesseract.image_to_data(image, lang=language, config=_TESSERACT_CONFIG, output_type=pytesseract.Output.DICT)
+    except (pytesseract.TesseractError, pytesseract.TesseractNotFoundError) as e:
+        # pytesseract's exceptions cannot be unpickled by the parent, which would break the whole pool
+        raise RuntimeError(str(e)) from None
+
+    lines: Dict[Tuple[int, int, int], List[str]] = {}
+    confidences = []
+    for index, word in enumerate(data["text"]):
+        word = word.strip()
+        confidence = float(data["conf"][index])
+        # Negative confidences mark layout boxes rather than words
+        if not word or confidence < 0:
+            continue
+        line = (data["block_num"][index], data["par_num"][index], data["line_num"][index])
+        lines.setdefault(line, []).append(word)
+        confidences.append(confidence)
+
+    text = "\n".join(" ".join(words) for words in lines.values())
+    confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    return text, confidence, len(confidences)
+
+
+async def ocr_for_extraction(image_data: bytes) -> Optional[OcrText]:
+    """
+    OCR a receipt image in the process pool before it is sent to the model.
+
+    Args:
+        image_data: The image prepared for extraction
+
+    Returns:
+        The text, or None if OCR is disabled, fails, or read too little text
+        too unreliably to extract the receipt from
+    """
+    if not settings.EXTRACTION_OCR_ENABLED:
+        return None
+
+    started = time.perf_counter()
+    try:
+        text, confidence, words = await run_in_process(read_image_text, image_data, settings.EXTRACTION_OCR_LANGUAGE)
+    except Exception as e:
+        logger.warning(f"OCR failed, extracting from the image: {e}")
+        metrics.increment("ocr_runs_total", outcome="failed")
+        return None
+    finally:
+        metrics.observe("ocr_seconds", time.perf_counter() - started)
+
+    if words < settings.EXTRACTION_OCR_MIN_WORDS or confidence < settings.EXTRACTION_OCR_MIN_CONFIDENCE:
+        logger.info(f"OCR read {words} words at {confidence:.0f}% confidence, too few or too unreliable to use")
+        metrics.increment("ocr_runs_total", outcome="unreliable")
+        return None
+    metrics.increment("ocr_runs_total", outcome="succeeded")
+    return OcrText(text, confidence, words)
@@ -0,0 +1,176 @@
+import asyncio
+import io
+import logging
+import re
+import time
+from typing import List
+
+import pypdfium2 as pdfium
+from PIL import Image, ImageChops, ImageOps
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.process_pool import run_in_process
+
+logger = logging.getLogger(__name__)
+
+PDF_CONTENT_TYPE = "application/pdf"
+
+# Words that mark the page(s) carrying the totals of a multi-page receipt
+_TOTALS_KEYWORDS = re.compile(r"\b(grand\s+total|order\s+total|total|amount\s+due|balance\s+due|tax)\b", re.IGNORECASE)
+# PDF user space is 72 units per inch
+_POINTS_PER_INCH = 72
+# Gap between stitched pages, in pixels
+_PAGE_GAP = 16
+
+
+def read_pdf_text(pdf_data: bytes) -> List[str]:
+    """
+    Read the text layer of every page of a PDF.
+
+    Runs in the process pool, so it takes and returns plain picklable values.
+
+    Returns:
+        The text of each page; empty strings for pages without a text layer
+    """
+    document = pdfium.PdfDocument(pdf_data)
+    try:
+        texts = []
+        for page in document:
+            textpage = page.get_textpage()
+            texts.append(textpage.get_text_range().replace("\r\n", "\n"))
+            textpage.close()
+            page.close()
+        return texts
+    finally:
+        document.close()
+
+
+def render_pdf_page(pdf_data: bytes, page_index: int, dpi: int, grayscale: bool) -> bytes:
+    """
+    Rasterize one page of a PDF, trimmed to its content.
+
+    Runs in the process pool; each page is rendered by its own task so the
+    pages of a document are rasterized in parallel.
+
+    Returns:
+        The page as PNG bytes
+    """
+    document = pdfium.PdfDocument(pdf_data)
+    try:
+        page = document[page_index]
+        bitmap = page.render(scale=dpi / _POINTS_PER_INCH, grayscale=grayscale)
+        image = bitmap.to_pil()
+        page.close()
+    finally:
+        document.close()
+
+    # Drop the white margins so the model only sees the printed area
+    background = Image.new(image.mode, image.size, 255 if image.mode == "L" else (255, 255, 255))
+    bbox = ImageChops.difference(image, background).getbbox()
+    if bbox:
+        image = image.crop(bbox)
+
+    output = io.BytesIO()
+    image.save(output, format="PNG")
+    return output.getvalue()
+
+
+def stitch_pages(pages: List[bytes], max_long_edge: int, jpeg_quality: int, grayscale: bool) -> bytes:
+    """
+    Stack rendered pages vertically into one JPEG for the extraction model.
+
+    Runs in the process pool.
+
+    Returns:
+        The stitched image as JPEG bytes
+    """
+    images = [Image.open(io.BytesIO(page)) for page in pages]
+    mode = "L" if grayscale else "RGB"
+    width = max(image.width for image in images)
+    height = sum(image.height for image in images) + _PAGE_GAP * (len(images) - 1)
+    stitched = Image.new(mode, (width, height), 255 if grayscale else (255, 255, 255))
+    top = 0
+    for image in images:
+        stitched.paste(image.convert(mode), (0, top))
+        top += image.height + _PAGE_GAP
+
+    if max(stitched.size) > max_long_edge:
+        stitched.thumbnail((max_long_edge, max_long_edge), Image.Resampling.LANCZOS)
+    stitched = ImageOps.autocontrast(stitched) if grayscale else stitched
+
+    output = io.BytesIO()
+    stitched.save(output, format="JPEG", quality=jpeg_quality, optimize=True)
+    return output.getvalue()
+
+
+def select_relevant_pages(page_texts: List[str], max_pages: int) -> List[int]:
+    """
+    Pick the pages worth sending for extraction.
+
+    The first page carries the vendor and date; the totals are usually on
+    the last page that mentions them. Without a usable text layer the first
+    and last pages are used.
+
+    Args:
+        page_texts: Text layer of each page
+        max_pages: Maximum number of pages to pick
+
+    Returns:
+        Zero-based page indexes in document order
+    """
+    page_count = len(page_texts)
+    if page_count == 0 or max_pages <= 0:
+        return []
+
+    selected = [0]
+    totals_pages = [index for index, text in enumerate(page_texts) if _TOTALS_KEYWORDS.search(text)]
+    candidates = list(reversed(totals_pages)) or [page_count - 1]
+    for index in candidates:
+        if len(selected) >= max_pages:
+            break
+        if index not in selected:
+            selected.append(index)
+    return sorted(selected)
+
+
+def has_text_layer(page_texts: List[str]) -> bool:
+    """Check whether a PDF has enough embedded text to parse without OCR."""
+    return sum(len(text.strip()) for text in page_texts) >= settings.PDF_MIN_TEXT_CHARS
+
+
+async def rasterize_for_extraction(pdf_data: bytes, page_texts: List[str]) -> bytes:
+    """
+    Render the relevant pages of a PDF in the process pool and stitch them into one image.
+
+    Args:
+        pdf_data: The PDF
+        page_texts: Text layer of each page, used to pick the pages
+
+    Returns:
+        A JPEG of the selected pages
+
+    Raises:
+        ValueError: If the PDF has no pages
+    """
+    page_indexes = select_relevant_pages(page_texts, settings.PDF_MAX_PAGES)
+    if not page_indexes:
+        raise ValueError("PDF has no pages")
+
+    started = time.perf_counter()
+    pages = await asyncio.gather(*(
+        run_in_process(render_pdf_page, pdf_data, index, settings.PDF_RENDER_DPI, settings.IMAGE_NORMALIZATION_GRAYSCALE)
+        for index in page_indexes
+    ))
+    image = await run_in_process(
+        stitch_pages,
+        list(pages),
+        settings.IMAGE_MAX_LONG_EDGE,
+        settings.IMAGE_JPEG_QUALITY,
+        settings.IMAGE_NORMALIZATION_GRAYSCALE
+    )
+    metrics.observe("pdf_rasterize_seconds", time.perf_counter() - started)
+    metrics.increment("pdf_pages_rasterized_total", len(page_indexes))
+    metrics.increment("pdf_pages_skipped_total", len(page_texts) - len(page_indexes))
+    logger.info(f"Rasterized PDF pages {page_indexes} of {len(page_texts)} into {len(image)} bytes")
+    return image
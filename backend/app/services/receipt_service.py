@@ -0,0 +1,383 @@
+import asyncio
+import dataclasses
+import hashlib
+import json
+import logging
+import mimetypes
+import uuid
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.process_pool import run_in_process
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.models import Receipt, ReceiptStatus, ReceiptTaxBreakdown, TaxType
+from app.services.baml_service import BAMLService, ExtractionCall, ExtractionImage, PartialCallback
+from app.services.extraction_cache import extraction_cache
+from app.services.extraction_metrics_service import record_extraction_calls
+from app.services.extraction_progress import PartialResultPublisher
+from app.services.image_service import normalize_for_extraction
+from app.services.ocr_service import ocr_for_extraction
+from app.services.pdf_service import PDF_CONTENT_TYPE, has_text_layer, rasterize_for_extraction, read_pdf_text
+from app.services.receipt_text_parser import parse_known_vendor_text, parse_receipt_text
+from app.services.storage_service import R2StorageService
+from app.services.vendor_profile_service import apply_vendor_profile
+from baml_client.types import ReceiptData
+
+logger = logging.getLogger(__name__)
+
+
+class ReceiptProcessingError(Exception):
+    """Raised when a receipt cannot be extracted and the job should be retried."""
+
+
+def load_nonrefundable_categories() -> List[str]:
+    """Load the expense categories that are not eligible for a refund."""
+    try:
+        with open("config/nonrefundable_categories.json", "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def apply_extracted_data(session: AsyncSession, receipt: Receipt, extracted_data: Optional[ReceiptData]) -> None:
+    """
+    Populate a receipt from extracted data and move it out of processing.
+    
+    Args:
+        session: Database session the tax breakdowns are added to
+        receipt: Receipt being processed
+        extracted_data: Result of the BAML extraction
+    """
+    if not extracted_data or not BAMLService.validate_extracted_data(extracted_data):
+        # Leave the fields empty for the treasurer to fill in during review
+        logger.warning(f"Extraction for receipt {receipt.id} did not pass validation")
+        receipt.status = ReceiptStatus.pending
+        return
+    
+    # Check if category is refundable
+    nonrefundable_categories = load_nonrefundable_categories()
+    if extracted_data.expense_category in nonrefundable_categories:
+        receipt.status = ReceiptStatus.rejected
+        return
+    
+    receipt.status = ReceiptStatus.pending
+    receipt.vendor_name = extracted_data.vendor_name
+    receipt.vendor_address = extracted_data.vendor_address or None
+    receipt.purchase_date = datetime.strptime(extracted_data.purchase_date, "%Y-%m-%d").date() if extracted_data.purchase_date else None
+    receipt.county = extracted_data.county or None
+    receipt.subtotal_amount = extracted_data.subtotal_amount
+    receipt.tax_amount = extracted_data.tax_amount
+    receipt.total_amount = extracted_data.total_amount
+    receipt.expense_category = extracted_data.expense_category or None
+    
+    # Add tax breakdowns
+    if extracted_data.tax_breakdowns:
+        for breakdown in extracted_data.tax_breakdowns:
+            tax_breakdown = ReceiptTaxBreakdown(
+                tax_type=TaxType(breakdown.tax_type.value.lower()),
+                amount=breakdown.amount,
+                tax_rate=breakdown.tax_rate if breakdown.tax_rate and breakdown.tax_rate > 0 else None,
+                receipt_id=receipt.id
+            )
+            session.add(tax_breakdown)
+
+
+@asynccontextmanager
+async def extraction_image_url(
+    image_data: bytes,
+    content_type: str,
+    object_key: Optional[str] = None
+) -> AsyncIterator[Optional[str]]:
+    """
+    Provide a short-lived URL the LLM provider can download an image from.
+    
+    An image that is not already in storage (a normalized copy or a
+    rasterized PDF) is uploaded under extraction/ and deleted again on exit.
+    Yields None when the image should be sent inline instead: URLs are
+    disabled, storage is local, or the upload or signing fails.
+    
+    Args:
+        image_data: The image that will be sent for extraction
+        content_type: MIME type of the image
+        object_key: Key of the image if it is already stored unchanged
+    """
+    storage_service = R2StorageService()
+    if not settings.EXTRACTION_IMAGE_URLS_ENABLED or storage_service.uses_local_storage:
+        yield None
+        return
+    
+    staged_key = None
+    if object_key is None:
+        staged_key = f"extraction/{uuid.uuid4()}.{content_type.split('/')[-1]}"
+        if await storage_service.upload_image(image_data, content_type, staged_key) is None:
+            yield None
+            return
+    try:
+        yield await storage_service.generate_presigned_url(object_key or staged_key, settings.EXTRACTION_IMAGE_URL_EXPIRES_SECONDS)
+    finally:
+        if staged_key:
+            await storage_service.delete_image(staged_key)
+
+
+async def extract_image_receipt(
+    receipt_id: uuid.UUID,
+    image_data: bytes,
+    content_type: str,
+    calls: Optional[List[ExtractionCall]] = None,
+    on_partial: Optional[PartialCallback] = None,
+    object_key: Optional[str] = None
+) -> Optional[ReceiptData]:
+    """
+    Extract a receipt photo, using the vision model only when its OCR text is not enough.
+    
+    The normalized copy is OCR'd first. Known chains' receipts are parsed
+    from the text by their layout, other legible receipts go to a text-only
+    model call, and the image is sent to the vision model as a fallback.
+    """
+    # Send the model a rotated, cropped and downscaled copy; the stored original is untouched
+    image = await normalize_for_extraction(image_data, content_type)
+    
+    ocr = await ocr_for_extraction(image.data)
+    if ocr is not None:
+        extracted_data = parse_known_vendor_text(ocr.text)
+        if extracted_data:
+            logger.info(f"Receipt {receipt_id}: parsed OCR text as a {extracted_data.vendor_name} receipt without an LLM call")
+            metrics.increment("extraction_routes_total", route="layout")
+            return extracted_data
+        if settings.EXTRACTION_OCR_TEXT_LLM_ENABLED:
+            extracted_data = await BAMLService.extract_receipt_data_from_text(ocr.text, calls)
+            if extracted_data:
+                logger.info(f"Receipt {receipt_id}: extracted from OCR text without sending the image")
+                metrics.increment("extraction_routes_total", route="text_llm")
+                return extracted_data
+    
+    logger.info(
+        f"Receipt {receipt_id}: sending {len(image.data)} bytes for extraction "
+        f"(saved {image.bytes_saved} bytes, ~{image.tokens_saved} tokens)"
+    )
+    # The stored original can be fetched directly when normalization left it unchanged
+    stored_key = object_key if image.data is image_data else None
+    async with extraction_image_url(image.data, image.content_type, stored_key) as image_url:
+        extracted_data = await BAMLService.extract_receipt_data(image.data, image.content_type, calls, on_partial, image_url, receipt_id)
+    if extracted_data:
+        metrics.increment("extraction_routes_total", route="vision")
+    return extracted_data
+
+
+async def extract_pdf_receipt(
+    receipt_id: uuid.UUID,
+    pdf_data: bytes,
+    calls: Optional[List[ExtractionCall]] = None,
+    on_partial: Optional[PartialCallback] = None
+) -> Optional[ReceiptData]:
+    """
+    Extract a PDF receipt, skipping the LLM when its text layer can be parsed.
+    
+    Scanned PDFs, and text PDFs the parser cannot read reliably, have their
+    relevant pages rasterized and sent to the LLM as one image.
+    """
+    try:
+        page_texts = await run_in_process(read_pdf_text, pdf_data)
+    except Exception as e:
+        raise ReceiptProcessingError(f"Could not read PDF for receipt {receipt_id}: {e}") from e
+    
+    if has_text_layer(page_texts):
+        extracted_data = parse_receipt_text("\n".join(page_texts))
+        if extracted_data:
+            logger.info(f"Receipt {receipt_id}: parsed PDF text layer without an LLM call")
+            metrics.increment("pdf_extractions_total", route="text")
+            metrics.increment("extraction_routes_total", route="pdf_text")
+            return extracted_data
+    
+    image = await rasterize_for_extraction(pdf_data, page_texts)
+    metrics.increment("pdf_extractions_total", route="raster")
+    async with extraction_image_url(image, "image/jpeg") as image_url:
+        extracted_data = await BAMLService.extract_receipt_data(image, "image/jpeg", calls, on_partial, image_url, receipt_id)
+    if extracted_data:
+        metrics.increment("extraction_routes_total", route="vision")
+    return extracted_data
+
+
+async def _download_for_batch(receipt: Receipt) -> Optional[Tuple[str, str, bytes]]:
+    """Fetch a receipt image for a batch, or None if it has to be extracted on its own."""
+    storage_service = R2StorageService()
+    object_key = storage_service.object_key_from_url(receipt.image_url)
+    content_type = mimetypes.guess_type(object_key)[0] or "image/jpeg"
+    # PDFs may not need an LLM call at all
+    if content_type == PDF_CONTENT_TYPE:
+        return None
+    image_data = await storage_service.download_image(object_key)
+    if image_data is None:
+        return None
+    return object_key, content_type, image_data
+
+
+async def extract_receipt_batch(session: AsyncSession, receipt_ids: List[uuid.UUID]) -> Dict[uuid.UUID, ReceiptData]:
+    """
+    Extract several receipt photos with a single LLM call.
+    
+    Receipts that are cached come back without a call; PDFs, receipts whose
+    image cannot be fetched and results the batch call got wrong are left
+    out, so that process_receipt extracts them one by one as usual. Nothing
+    is added to the session apart from new cache entries.
+    
+    Args:
+        session: Database session
+        receipt_ids: IDs of the receipts to extract
+        
+    Returns:
+        Extracted data by receipt ID, for the receipts the batch could handle
+    """
+    extracted: Dict[uuid.UUID, ReceiptData] = {}
+    receipts = []
+    for receipt_id in receipt_ids:
+        receipt = await session.get(Receipt, receipt_id)
+        if receipt and receipt.status == ReceiptStatus.processing:
+            receipts.append(receipt)
+    downloads = await asyncio.gather(*(_download_for_batch(receipt) for receipt in receipts))
+    
+    pending = []
+    for receipt, download in zip(receipts, downloads):
+        if download is None:
+            continue
+        object_key, content_type, image_data = download
+        content_hash = receipt.content_hash or hashlib.sha256(image_data).hexdigest()
+        if settings.EXTRACTION_CACHE_ENABLED:
+            cached = await extraction_cache.get(session, content_hash)
+            if cached:
+                logger.info(f"Receipt {receipt.id}: using cached extraction of image {content_hash}")
+                metrics.increment("extraction_routes_total", route="cache")
+                extracted[receipt.id] = cached
+                continue
+        pending.append((receipt.id, object_key, content_type, image_data, content_hash))
+    # A batch of one saves nothing over the regular path
+    if len(pending) < 2:
+        return extracted
+    
+    images = await asyncio.gather(*(
+        normalize_for_extraction(image_data, content_type) for _, _, content_type, image_data, _ in pending
+    ))
+    calls: List[ExtractionCall] = []
+    try:
+        async with AsyncExitStack() as stack:
+            batch = []
+            for (_, object_key, _, image_data, _), image in zip(pending, images):
+                stored_key = object_key if image.data is image_data else None
+                image_url = await stack.enter_async_context(extraction_image_url(image.data, image.content_type, stored_key))
+                batch.append(ExtractionImage(image.data, image.content_type, image_url))
+            results = await BAMLService.extract_receipt_data_batch(batch, calls)
+    except Exception as e:
+        # Every receipt still gets its own extraction, so a failed batch only costs time
+        logger.warning(f"Batch extraction of {len(pending)} receipts failed: {e}")
+        return extracted
+    
+    for (receipt_id, _, _, _, content_hash), result in zip(pending, results):
+        # The batch call is shared out evenly between its receipts
+        await record_extraction_calls(receipt_id, [
+            dataclasses.replace(
+                call,
+                input_tokens=call.input_tokens // len(pending) if call.input_tokens is not None else None,
+                output_tokens=call.output_tokens // len(pending) if call.output_tokens is not None else None
+            )
+            for call in calls
+        ])
+        if result is None:
+            continue
+        metrics.increment("extraction_routes_total", route="batch")
+        extracted[receipt_id] = result
+        if settings.EXTRACTION_CACHE_ENABLED:
+            await extraction_cache.put(session, content_hash, result)
+    logger.info(f"Batch extraction handled {len(extracted)} of {len(receipt_ids)} receipts")
+    return extracted
+
+
+async def extract_stored_receipt(session: AsyncSession, receipt: Receipt, publish_partials: bool = True) -> ReceiptData:
+    """
+    Download a receipt's file and extract it, from the cache when possible.
+    
+    Args:
+        session: Database session, used for the extraction cache
+        receipt: Receipt whose stored file is extracted
+        publish_partials: Stream partial results to the review screen, if enabled
+    """
+    receipt_id = receipt.id
+    storage_service = R2StorageService()
+    object_key = storage_service.object_key_from_url(receipt.image_url)
+    image_data = await storage_service.download_image(object_key)
+    if image_data is None:
+        raise ReceiptProcessingError(f"Failed to download image {object_key}")
+    
+    content_type = mimetypes.guess_type(object_key)[0] or "image/jpeg"
+    # Objects stored without a SHA-256 checksum were not hashed on the way in
+    content_hash = receipt.content_hash or hashlib.sha256(image_data).hexdigest()
+    
+    if settings.EXTRACTION_CACHE_ENABLED:
+        extracted_data = await extraction_cache.get(session, content_hash)
+        if extracted_data:
+            logger.info(f"Receipt {receipt_id}: using cached extraction of image {content_hash}")
+            metrics.increment("extraction_routes_total", route="cache")
+            return extracted_data
+    
+    calls: List[ExtractionCall] = []
+    # Stream the model's answer so the review screen can fill in before it completes
+    on_partial = PartialResultPublisher(receipt_id, settings.EXTRACTION_PARTIAL_MIN_INTERVAL_SECONDS) if publish_partials and settings.EXTRACTION_STREAM_PARTIALS else None
+    try:
+        if content_type == PDF_CONTENT_TYPE:
+            extracted_data = await extract_pdf_receipt(receipt_id, image_data, calls, on_partial)
+        else:
+            extracted_data = await extract_image_receipt(receipt_id, image_data, content_type, calls, on_partial, object_key)
+    finally:
+        await record_extraction_calls(receipt_id, calls)
+    if extracted_data is None:
+        raise ReceiptProcessingError(f"Extraction failed for receipt {receipt_id}")
+    # Results that fail validation are not cached, so a later upload gets another attempt
+    if settings.EXTRACTION_CACHE_ENABLED and BAMLService.validate_extracted_data(extracted_data):
+        await extraction_cache.put(session, content_hash, extracted_data)
+    return extracted_data
+
+
+async def process_receipt(
+    session: AsyncSession,
+    receipt_id: uuid.UUID,
+    extracted_data: Optional[ReceiptData] = None
+) -> Receipt:
+    """
+    Run AI extraction for a receipt that is still processing.
+    
+    The changes are added to the session but not committed, so the caller can
+    commit them together with the job status.
+    
+    Args:
+        session: Database session
+        receipt_id: ID of the receipt to extract
+        extracted_data: Result already extracted for the receipt, e.g. by
+            extract_receipt_batch; the receipt is not extracted again
+        
+    Returns:
+        The updated receipt
+        
+    Raises:
+        ReceiptProcessingError: If the image cannot be fetched or extraction fails
+    """
+    receipt = await session.get(Receipt, receipt_id)
+    if not receipt:
+        raise ReceiptProcessingError(f"Receipt {receipt_id} not found")
+    
+    # A retried job may find the receipt already extracted
+    if receipt.status != ReceiptStatus.processing:
+        return receipt
+    
+    if extracted_data is None:
+        extracted_data = await extract_stored_receipt(session, receipt)
+    
+    # Applied after caching, since profiles belong to the receipt's organization
+    if settings.VENDOR_PROFILES_ENABLED:
+        await apply_vendor_profile(session, receipt.organization_id, extracted_data)
+    apply_extracted_data(session, receipt, extracted_data)
+    session.add(receipt)
+    return receipt
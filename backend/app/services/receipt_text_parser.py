@@ -0,0 +1,299 @@
+"""
+Rule-based extraction of receipt fields from plain text.
+
+Used for receipts whose text is already available (e.g. PDFs with a text
+layer, or photos read by OCR) so they can be extracted without an LLM call.
+"""
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from baml_client.types import ReceiptData
+
+# Amounts such as $1,234.56 or -$2.99, but not rates such as 7.25%
+_AMOUNT = re.compile(r"(-)?\$?\s*(\d{1,3}(?:,\d{3})*\.\d{2}|\d+\.\d{2})(?![\d%]|\s+%)")
+# How far after a label its amount may appear (labels sometimes wrap onto the next lines)
+_AMOUNT_LOOKAHEAD_CHARS = 60
+
+_TOTAL_LABELS = [
+    r"grand\s+total",
+    r"order\s+total",
+    r"total\s+amount",
+    r"amount\s+due",
+    r"balance\s+due",
+    r"(?<!sub)(?<!sub\s)\btotal\b(?!\s+(?:before|tax|savings|discount|items?|qty|quantity))",
+]
+_SUBTOTAL_LABELS = [
+    r"total\s+before\s+tax",
+    r"sub\s*-?\s*total",
+]
+_TAX_LABELS = [
+    r"estimated\s+tax\s+to\s+be\s+collected",
+    r"total\s+tax",
+    r"sales\s+tax",
+    r"(?<!before\s)\btax\b(?!\s+(?:id|exempt|invoice))",
+]
+_DATE_LABELS = r"(?:order\s+placed|order\s+date|date|purchased|invoice\s+date)"
+
+_MONTH_DATE = re.compile(
+    r"\b(jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s+(\d{1,2}),?\s+(\d{4})\b",
+    re.IGNORECASE
+)
+_NUMERIC_DATE = re.compile(r"\b(\d{1,2})/(\d{1,2})/(\d{2,4})\b")
+_ISO_DATE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+# "City, ST 12345" or "CITY ST 12345-6789"
+_CITY_STATE_ZIP = re.compile(r"\b[A-Za-z .]+,?\s+[A-Z]{2}\s+\d{5}(?:-\d{4})?\b")
+_COPYRIGHT_VENDOR = re.compile(r"(?:©|\(c\)|copyright)\s*[\d\s\-–,]*([A-Za-z0-9.&' ]+?),?\s+(?:Inc|LLC|Corp|Ltd)\b", re.IGNORECASE)
+# Headings that appear at the top of order pages but are not the vendor
+_GENERIC_HEADINGS = {"order summary", "order details", "receipt", "invoice", "sales receipt", "packing slip"}
+# Allowed rounding difference between subtotal + tax and total
+_TOTAL_TOLERANCE = 0.02
+
+
+def _amount_after(text: str, labels: List[str]) -> Optional[float]:
+    """
+    Find the amount that follows the first label (in priority order) found in the text.
+
+    Args:
+        text: Receipt text
+        labels: Regular expressions for the label, most specific first
+
+    Returns:
+        The amount, or None if no label is followed by an amount
+    """
+    for label in labels:
+        for match in re.finditer(label, text, re.IGNORECASE):
+            window = text[match.end():match.end() + _AMOUNT_LOOKAHEAD_CHARS]
+            amount = _AMOUNT.search(window)
+            if amount:
+                value = float(amount.group(2).replace(",", ""))
+                return -value if amount.group(1) else value
+    return None
+
+
+def _parse_date(match: re.Match) -> Optional[str]:
+    """Convert a date match to YYYY-MM-DD, or None if it is not a real date."""
+    try:
+        if match.re is _MONTH_DATE:
+            parsed = datetime.strptime(f"{match.group(1)[:3]} {match.group(2)} {match.group(3)}", "%b %d %Y")
+        elif match.re is _NUMERIC_DATE:
+            year = match.group(3)
+            year_format = "%Y" if len(year) == 4 else "%y"
+            parsed = datetime.strptime(f"{match.group(1)}/{match.group(2)}/{year}", f"%m/%d/{year_format}")
+        else:
+            parsed = datetime.strptime(match.group(0), "%Y-%m-%d")
+    except ValueError:
+        return None
+    return parsed.strftime("%Y-%m-%d")
+
+
+def find_purchase_date(text: str) -> Optional[str]:
+    """
+    Find the purchase date, preferring one that follows a date label.
+
+    Returns:
+        The date as YYYY-MM-DD, or None if no date was found
+    """
+    candidates: List[Tuple[int, str]] = []
+    for pattern in (_MONTH_DATE, _NUMERIC_DATE, _ISO_DATE):
+        for match in pattern.finditer(text):
+            parsed = _parse_date(match)
+            if parsed:
+                candidates.append((match.start(), parsed))
+    if not candidates:
+        return None
+
+    for label in re.finditer(_DATE_LABELS, text, re.IGNORECASE):
+        following = [(start, date) for start, date in candidates if 0 <= start - label.end() <= 20]
+        if following:
+            return min(following)[1]
+    # Otherwise the earliest date in the text, since later ones tend to be return or delivery dates
+    return min(candidates)[1]
+
+
+def find_vendor_name(text: str) -> Optional[str]:
+    """
+    Guess the vendor from a copyright notice or the first meaningful line.
+
+    Returns:
+        The vendor name, or None if nothing plausible was found
+    """
+    copyright_match = _COPYRIGHT_VENDOR.search(text)
+    if copyright_match:
+        return copyright_match.group(1).strip()
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.lower() in _GENERIC_HEADINGS:
+            continue
+        # Skip lines that are only numbers, dates or amounts
+        if not re.search(r"[A-Za-z]{3,}", line) or _AMOUNT.search(line):
+            continue
+        return line
+    return None
+
+
+@dataclass(frozen=True)
+class VendorLayout:
+    """
+    How a chain's printed receipts can be recognised and read.
+
+    Label lists override the generic ones where the chain's wording would
+    otherwise be misread.
+    """
+    vendor_name: str
+    marker: re.Pattern
+    total_labels: Tuple[str, ...] = tuple(_TOTAL_LABELS)
+    subtotal_labels: Tuple[str, ...] = tuple(_SUBTOTAL_LABELS)
+    tax_labels: Tuple[str, ...] = tuple(_TAX_LABELS)
+
+
+# Chains whose till receipts members submit most; markers tolerate common OCR misreads
+KNOWN_VENDOR_LAYOUTS = [
+    VendorLayout("Walmart", re.compile(r"\bwal[\s\-*]?mart\b|save money\.?\s*live better", re.IGNORECASE)),
+    VendorLayout("Dollar Tree", re.compile(r"\bdollar\s*tree\b", re.IGNORECASE)),
+    VendorLayout("Dollar General", re.compile(r"\bdollar\s*general\b", re.IGNORECASE)),
+    VendorLayout("Big Lots", re.compile(r"\bbig\s*lots\b", re.IGNORECASE)),
+    VendorLayout("Target", re.compile(r"\btarget\b.*\bexpect more\b|\btarget\.com\b", re.IGNORECASE | re.DOTALL)),
+    VendorLayout("Food Lion", re.compile(r"\bfood\s*lion\b", re.IGNORECASE)),
+    VendorLayout("Harris Teeter", re.compile(r"\bharris\s*teeter\b", re.IGNORECASE)),
+    VendorLayout("Lowe's", re.compile(r"\blowe'?s\b.*\bhome\s+(?:centers|improvement)\b", re.IGNORECASE | re.DOTALL)),
+    VendorLayout("The Home Depot", re.compile(r"\bhome\s*depot\b", re.IGNORECASE)),
+    VendorLayout(
+        "Costco",
+        re.compile(r"\bcostco\b", re.IGNORECASE),
+        # Costco prints "TOTAL NUMBER OF ITEMS SOLD" below the total
+        total_labels=(r"\*+\s*total\b", r"(?<!sub)\btotal\b(?!\s+(?:tax|number|items?))"),
+    ),
+]
+
+
+def _reconciled_amounts(
+    text: str,
+    total_labels: List[str],
+    subtotal_labels: List[str],
+    tax_labels: List[str]
+) -> Optional[Tuple[float, float, float]]:
+    """
+    Find the subtotal, tax and total, filling in one missing amount from the other two.
+
+    Returns:
+        Tuple of subtotal, tax and total, or None unless all three were found and agree
+    """
+    total = _amount_after(text, total_labels)
+    subtotal = _amount_after(text, subtotal_labels)
+    tax = _amount_after(text, tax_labels)
+
+    if total is None or total <= 0:
+        return None
+    if subtotal is None and tax is not None:
+        subtotal = round(total - tax, 2)
+    if tax is None and subtotal is not None:
+        tax = round(total - subtotal, 2)
+    if subtotal is None or tax is None or tax < 0:
+        return None
+    if abs(subtotal + tax - total) > _TOTAL_TOLERANCE:
+        return None
+    return subtotal, tax, total
+
+
+def match_vendor_layout(text: str) -> Optional[VendorLayout]:
+    """The known layout whose marker appears in the text, if any."""
+    for layout in KNOWN_VENDOR_LAYOUTS:
+        if layout.marker.search(text):
+            return layout
+    return None
+
+
+def parse_known_vendor_text(text: str) -> Optional[ReceiptData]:
+    """
+    Extract receipt fields from the OCR text of a known chain's receipt.
+
+    Stricter than parse_receipt_text, since OCR text is noisier than a PDF
+    text layer: the vendor must match a known layout rather than being
+    guessed, and a purchase date must be found.
+
+    Args:
+        text: OCR text of the receipt
+
+    Returns:
+        The extracted data, or None if the receipt is not from a known
+        chain or could not be parsed reliably
+    """
+    text = text.replace("\r\n", "\n")
+    layout = match_vendor_layout(text)
+    if layout is None:
+        return None
+    amounts = _reconciled_amounts(text, list(layout.total_labels), list(layout.subtotal_labels), list(layout.tax_labels))
+    purchase_date = find_purchase_date(text)
+    if amounts is None or purchase_date is None:
+        return None
+
+    subtotal, tax, total = amounts
+    return ReceiptData(
+        vendor_name=layout.vendor_name,
+        vendor_address=find_vendor_address(text),
+        purchase_date=purchase_date,
+        county="",
+        subtotal_amount=subtotal,
+        tax_amount=tax,
+        total_amount=total,
+        expense_category="",
+        is_donation=False,
+        tax_breakdowns=[]
+    )
+
+
+def find_vendor_address(text: str) -> Optional[str]:
+    """
+    Find the store's address from its city, state and ZIP code line.
+
+    Returns:
+        That line, preceded by the street line above it if there is one,
+        or None if no ZIP code line was found
+    """
+    lines = [line.strip() for line in text.splitlines()]
+    for index, line in enumerate(lines):
+        if _CITY_STATE_ZIP.search(line) and not _AMOUNT.search(line):
+            street = lines[index - 1] if index > 0 else ""
+            if re.match(r"\d+\s+[A-Za-z]", street):
+                return f"{street}, {line}"
+            return line
+    return None
+
+
+def parse_receipt_text(text: str) -> Optional[ReceiptData]:
+    """
+    Extract receipt fields from text without calling an LLM.
+
+    Only returns a result when the total, tax and subtotal are found and
+    agree with each other, so callers can fall back to the LLM otherwise.
+    County, expense category and tax breakdowns are left empty for the
+    treasurer to fill in.
+
+    Args:
+        text: Full text of the receipt
+
+    Returns:
+        The extracted data, or None if the text could not be parsed reliably
+    """
+    text = text.replace("\r\n", "\n")
+    amounts = _reconciled_amounts(text, _TOTAL_LABELS, _SUBTOTAL_LABELS, _TAX_LABELS)
+    vendor_name = find_vendor_name(text)
+    if amounts is None or not vendor_name:
+        return None
+
+    subtotal, tax, total = amounts
+    return ReceiptData(
+        vendor_name=vendor_name,
+        vendor_address=find_vendor_address(text),
+        purchase_date=find_purchase_date(text) or "",
+        county="",
+        subtotal_amount=subtotal,
+        tax_amount=tax,
+        total_amount=total,
+        expense_category="",
+        is_donation=False,
+        tax_breakdowns=[]
+    )
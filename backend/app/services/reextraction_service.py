@@ -0,0 +1,329 @@
+import json
+import logging
+import uuid
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, exists, func
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.models import (
+    Receipt,
+    ReceiptStatus,
+    ReceiptTaxBreakdown,
+    ReextractionCampaign,
+    ReextractionCampaignStatus,
+    ReextractionOutcome,
+    ReextractionResult,
+    TaxType,
+)
+from app.services.baml_service import BAMLService
+from app.services.extraction_cache import baml_source_digest
+from app.services.llm_rate_limiter import LLMRateLimited
+from app.services.receipt_service import extract_stored_receipt
+from baml_client.types import ReceiptData, TaxBreakdown
+
+logger = logging.getLogger(__name__)
+
+# A treasurer has looked at these; their values are never overwritten
+REVIEWED_STATUSES = {ReceiptStatus.approved, ReceiptStatus.rejected, ReceiptStatus.paid}
+_COMPARED_FIELDS = (
+    "vendor_name",
+    "vendor_address",
+    "purchase_date",
+    "county",
+    "subtotal_amount",
+    "tax_amount",
+    "total_amount",
+    "expense_category",
+)
+# Stored amounts are to the cent
+_AMOUNT_TOLERANCE = 0.005
+_RATE_TOLERANCE = 0.00005
+
+
+def _extracted_value(data: ReceiptData, field: str):
+    value = getattr(data, field)
+    if field == "purchase_date":
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+        except ValueError:
+            return None
+    return value if value != "" else None
+
+
+def _same(stored, extracted) -> bool:
+    if isinstance(stored, float) or isinstance(extracted, float):
+        return abs(stored - extracted) <= _AMOUNT_TOLERANCE
+    if isinstance(stored, str) and isinstance(extracted, str):
+        # Case and spacing differences are not worth a treasurer's attention
+        return " ".join(stored.lower().split()) == " ".join(extracted.lower().split())
+    return stored == extracted
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def _breakdown_json(tax_type: str, amount: float, tax_rate: Optional[float]) -> dict:
+    return {"tax_type": tax_type, "amount": amount, "tax_rate": tax_rate}
+
+
+def _extracted_rate(breakdown: TaxBreakdown) -> Optional[float]:
+    return breakdown.tax_rate if breakdown.tax_rate and breakdown.tax_rate > 0 else None
+
+
+def _compare_breakdowns(
+    stored: List[ReceiptTaxBreakdown],
+    extracted: List[TaxBreakdown]
+) -> Tuple[Optional[dict], List[Tuple[ReceiptTaxBreakdown, float]]]:
+    """
+    Compare a receipt's stored tax breakdowns with extracted ones.
+
+    Returns:
+        Tuple of the difference, or None if the breakdowns agree, and the
+        stored breakdowns without a rate paired with the extracted rate of
+        the same tax and amount
+    """
+    by_type = {breakdown.tax_type.value.lower(): breakdown for breakdown in extracted}
+    rates = []
+    agree = len(stored) == len(extracted)
+    for breakdown in stored:
+        match = by_type.get(breakdown.tax_type.value)
+        if match is None or abs(match.amount - breakdown.amount) > _AMOUNT_TOLERANCE:
+            agree = False
+            continue
+        rate = _extracted_rate(match)
+        if breakdown.tax_rate is None:
+            if rate is not None:
+                rates.append((breakdown, rate))
+        elif rate is not None and abs(rate - breakdown.tax_rate) > _RATE_TOLERANCE:
+            agree = False
+
+    if agree:
+        return None, rates
+    return {
+        "stored": [_breakdown_json(b.tax_type.value, b.amount, b.tax_rate) for b in stored],
+        "extracted": [_breakdown_json(b.tax_type.value.lower(), b.amount, _extracted_rate(b)) for b in extracted]
+    }, rates
+
+
+async def _replace_breakdowns(session: AsyncSession, receipt: Receipt, stored: List[ReceiptTaxBreakdown], extracted: List[TaxBreakdown]) -> None:
+    for breakdown in stored:
+        await session.delete(breakdown)
+    for breakdown in extracted:
+        session.add(ReceiptTaxBreakdown(
+            tax_type=TaxType(breakdown.tax_type.value.lower()),
+            amount=breakdown.amount,
+            tax_rate=_extracted_rate(breakdown),
+            receipt_id=receipt.id
+        ))
+
+
+async def reconcile_receipt(
+    session: AsyncSession,
+    campaign: ReextractionCampaign,
+    receipt: Receipt,
+    stored_breakdowns: List[ReceiptTaxBreakdown],
+    data: ReceiptData
+) -> Tuple[ReextractionOutcome, Dict[str, dict]]:
+    """
+    Compare a receipt with its re-extraction and update what may be updated.
+
+    Tax rates missing from stored breakdowns are filled in on every receipt,
+    as long as the re-extraction agrees on the tax and its amount. Receipts
+    a treasurer has reviewed keep all their other values; differences are
+    only reported. Receipts awaiting review also get their empty fields
+    filled in, and their differing values overwritten if the campaign
+    applies to pending receipts.
+
+    Returns:
+        Tuple of the outcome and the differences, by field
+    """
+    reviewed = receipt.status in REVIEWED_STATUSES
+    overwrite = campaign.apply_to_pending and receipt.status == ReceiptStatus.pending
+    differences: Dict[str, dict] = {}
+    filled = False
+
+    for field in _COMPARED_FIELDS:
+        stored = getattr(receipt, field)
+        extracted = _extracted_value(data, field)
+        if extracted is None or (stored is not None and _same(stored, extracted)):
+            continue
+        if stored is None and not reviewed:
+            setattr(receipt, field, extracted)
+            filled = True
+            continue
+        differences[field] = {"stored": _json_value(stored), "extracted": _json_value(extracted)}
+        if overwrite:
+            setattr(receipt, field, extracted)
+
+    breakdown_difference, rates = _compare_breakdowns(stored_breakdowns, data.tax_breakdowns)
+    for breakdown, rate in rates:
+        breakdown.tax_rate = rate
+        session.add(breakdown)
+        filled = True
+    if breakdown_difference:
+        if not stored_breakdowns and not reviewed:
+            await _replace_breakdowns(session, receipt, stored_breakdowns, data.tax_breakdowns)
+            filled = True
+        else:
+            differences["tax_breakdowns"] = breakdown_difference
+            if overwrite:
+                await _replace_breakdowns(session, receipt, stored_breakdowns, data.tax_breakdowns)
+
+    session.add(receipt)
+    if differences:
+        return (ReextractionOutcome.updated if overwrite else ReextractionOutcome.differs), differences
+    return (ReextractionOutcome.filled if filled else ReextractionOutcome.unchanged), differences
+
+
+async def reextract_receipt(session: AsyncSession, campaign: ReextractionCampaign, receipt_id: uuid.UUID) -> ReextractionOutcome:
+    """
+    Re-extract one receipt of a campaign and record the outcome.
+
+    The result is added to the session; the caller commits it with the
+    receipt's changes. Provider saturation (LLMRateLimited) is raised
+    rather than recorded, so the receipt is tried again later.
+    """
+    receipt = await session.get(Receipt, receipt_id)
+    result = await session.exec(select(ReceiptTaxBreakdown).where(ReceiptTaxBreakdown.receipt_id == receipt_id))
+    stored_breakdowns = list(result.all())
+
+    outcome, differences, error = ReextractionOutcome.failed, {}, None
+    try:
+        data = await extract_stored_receipt(session, receipt, publish_partials=False)
+        if BAMLService.validate_extracted_data(data):
+            outcome, differences = await reconcile_receipt(session, campaign, receipt, stored_breakdowns, data)
+        else:
+            error = "Extraction did not pass validation"
+    except LLMRateLimited:
+        raise
+    except Exception as e:
+        logger.warning(f"Re-extraction of receipt {receipt_id} failed: {e}")
+        error = str(e)
+
+    session.add(ReextractionResult(
+        outcome=outcome,
+        differences=json.dumps(differences) if differences else None,
+        error=error,
+        campaign_id=campaign.id,
+        receipt_id=receipt_id
+    ))
+    return outcome
+
+
+async def get_or_create_campaign(
+    session: AsyncSession,
+    name: str,
+    receipt_statuses: List[ReceiptStatus],
+    organization_id: Optional[uuid.UUID] = None,
+    apply_to_pending: bool = False
+) -> ReextractionCampaign:
+    """
+    Load a campaign by name, or start one.
+
+    An existing campaign keeps the receipts and options it was started
+    with, so resuming it finishes the same work.
+    """
+    result = await session.exec(select(ReextractionCampaign).where(ReextractionCampaign.name == name))
+    campaign = result.first()
+    if campaign is not None:
+        if campaign.prompt_digest != baml_source_digest():
+            logger.warning(f"The BAML source changed since campaign {name} started; later receipts use the new version")
+        return campaign
+
+    campaign = ReextractionCampaign(
+        name=name,
+        prompt_digest=baml_source_digest(),
+        receipt_statuses=json.dumps([status.value for status in receipt_statuses]),
+        organization_id=organization_id,
+        apply_to_pending=apply_to_pending
+    )
+    session.add(campaign)
+    await session.commit()
+    return campaign
+
+
+def _campaign_receipts(campaign: ReextractionCampaign):
+    """Condition selecting the receipts a campaign covers."""
+    conditions = [Receipt.status.in_([ReceiptStatus(status) for status in json.loads(campaign.receipt_statuses)])]
+    if campaign.organization_id:
+        conditions.append(Receipt.organization_id == campaign.organization_id)
+    return conditions
+
+
+def _not_done(campaign: ReextractionCampaign):
+    return ~exists().where(
+        ReextractionResult.campaign_id == campaign.id,
+        ReextractionResult.receipt_id == Receipt.id
+    )
+
+
+async def next_receipt_ids(session: AsyncSession, campaign: ReextractionCampaign, limit: int) -> List[uuid.UUID]:
+    """The oldest receipts the campaign has not re-extracted yet."""
+    result = await session.exec(
+        select(Receipt.id)
+        .where(*_campaign_receipts(campaign), _not_done(campaign))
+        .order_by(Receipt.submitted_at, Receipt.id)
+        .limit(limit)
+    )
+    return list(result.all())
+
+
+async def refresh_progress(session: AsyncSession, campaign: ReextractionCampaign, running_seconds: float = 0.0) -> None:
+    """Recount a campaign's progress from its results, add running time, and commit."""
+    result = await session.exec(
+        select(ReextractionResult.outcome, func.count())
+        .where(ReextractionResult.campaign_id == campaign.id)
+        .group_by(ReextractionResult.outcome)
+    )
+    counts = dict(result.all())
+    result = await session.exec(select(func.count()).select_from(Receipt).where(*_campaign_receipts(campaign), _not_done(campaign)))
+    remaining = result.one()
+
+    campaign.receipts_done = sum(counts.values())
+    campaign.receipts_changed = counts.get(ReextractionOutcome.updated, 0) + counts.get(ReextractionOutcome.differs, 0) + counts.get(ReextractionOutcome.filled, 0)
+    campaign.receipts_failed = counts.get(ReextractionOutcome.failed, 0)
+    campaign.receipts_total = campaign.receipts_done + remaining
+    campaign.running_seconds += running_seconds
+    campaign.updated_at = datetime.utcnow()
+    if remaining == 0 and campaign.status != ReextractionCampaignStatus.completed:
+        campaign.status = ReextractionCampaignStatus.completed
+        campaign.finished_at = datetime.utcnow()
+    elif remaining:
+        campaign.status = ReextractionCampaignStatus.running
+        campaign.finished_at = None
+    session.add(campaign)
+    await session.commit()
+
+
+async def retry_failed(session: AsyncSession, campaign: ReextractionCampaign) -> int:
+    """Forget a campaign's failed receipts so the next run tries them again."""
+    result = await session.exec(
+        delete(ReextractionResult).where(
+            ReextractionResult.campaign_id == campaign.id,
+            ReextractionResult.outcome == ReextractionOutcome.failed
+        )
+    )
+    await session.commit()
+    return result.rowcount
+
+
+def campaign_progress(campaign: ReextractionCampaign) -> dict:
+    """A campaign's progress and throughput, for reports."""
+    per_minute = campaign.receipts_done / campaign.running_seconds * 60 if campaign.running_seconds else None
+    remaining = campaign.receipts_total - campaign.receipts_done
+    return {
+        "name": campaign.name,
+        "status": campaign.status.value,
+        "prompt_digest": campaign.prompt_digest[:12],
+        "receipts_total": campaign.receipts_total,
+        "receipts_done": campaign.receipts_done,
+        "receipts_changed": campaign.receipts_changed,
+        "receipts_failed": campaign.receipts_failed,
+        "percent_done": round(campaign.receipts_done / campaign.receipts_total * 100, 1) if campaign.receipts_total else 100.0,
+        "receipts_per_minute": round(per_minute, 2) if per_minute else None,
+        "eta_minutes": round(remaining / per_minute, 1) if per_minute and remaining else None
+    }
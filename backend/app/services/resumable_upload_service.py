@@ -0,0 +1,274 @@
+import asyncio
+import fcntl
+import logging
+import os
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import IO, AsyncIterator, Iterator, Optional, Tuple
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.models import Receipt, ResumableUpload, ResumableUploadStatus
+from app.services.upload_service import create_receipt_from_upload, ingest_fileobj
+
+logger = logging.getLogger(__name__)
+
+
+class ResumableUploadError(Exception):
+    """Raised when a chunk cannot be applied to a resumable upload."""
+
+
+class UploadOffsetMismatch(ResumableUploadError):
+    """Raised when a chunk does not start where the staged data ends."""
+
+
+class UploadLocked(ResumableUploadError):
+    """Raised when another request is already writing to the upload."""
+
+
+class UploadGone(ResumableUploadError):
+    """Raised when the staged bytes are gone because the upload finished or was abandoned."""
+
+
+class UploadLengthExceeded(ResumableUploadError):
+    """Raised when a chunk would grow the upload past its announced length."""
+
+
+def staging_path(upload_id: uuid.UUID) -> Path:
+    """Local file the bytes of a resumable upload are staged in."""
+    return Path(settings.UPLOAD_STAGING_DIR) / f"{upload_id}.part"
+
+
+def current_offset(upload: ResumableUpload) -> int:
+    """
+    Number of bytes received so far.
+
+    The staged file is the source of truth, so bytes written before a
+    dropped connection count and never have to be sent again.
+    """
+    if upload.status == ResumableUploadStatus.completed:
+        return upload.upload_length
+    try:
+        return staging_path(upload.id).stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+async def create_upload(
+    session: AsyncSession,
+    upload_length: int,
+    content_type: str,
+    filename: Optional[str],
+    is_donation: bool,
+    user_id: uuid.UUID,
+    receipt_user_id: uuid.UUID,
+    organization_id: uuid.UUID
+) -> ResumableUpload:
+    """
+    Start a resumable upload with an empty staging file.
+
+    Args:
+        session: Database session
+        upload_length: Total size the client will send
+        content_type: MIME type of the receipt
+        filename: Original file name
+        is_donation: Whether the receipt is a donation
+        user_id: ID of the user uploading
+        receipt_user_id: ID of the user the receipt will belong to
+        organization_id: ID of the organization
+
+    Returns:
+        The new upload
+    """
+    upload = ResumableUpload(
+        upload_length=upload_length,
+        content_type=content_type,
+        filename=filename,
+        is_donation=is_donation,
+        user_id=user_id,
+        receipt_user_id=receipt_user_id,
+        organization_id=organization_id,
+        expires_at=datetime.utcnow() + timedelta(seconds=settings.RESUMABLE_UPLOAD_EXPIRES_SECONDS)
+    )
+    path = staging_path(upload.id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+
+    session.add(upload)
+    await session.commit()
+    metrics.increment("resumable_uploads_total", outcome="created")
+    return upload
+
+
+async def get_upload(session: AsyncSession, upload_id: uuid.UUID, organization_id: uuid.UUID) -> Optional[ResumableUpload]:
+    """Load an upload of the organization that has not expired."""
+    result = await session.exec(
+        select(ResumableUpload).where(
+            ResumableUpload.id == upload_id,
+            ResumableUpload.organization_id == organization_id,
+            ResumableUpload.expires_at > datetime.utcnow()
+        )
+    )
+    return result.first()
+
+
+@contextmanager
+def open_staged_upload(upload: ResumableUpload) -> Iterator[IO[bytes]]:
+    """
+    Open an upload's staging file for appending, holding an exclusive lock.
+
+    The lock is an flock, so it also serializes requests handled by other
+    API processes on this host.
+
+    Raises:
+        UploadGone: If the staging file no longer exists
+        UploadLocked: If another request holds the upload
+    """
+    # Never recreate the file of an upload another request just completed
+    try:
+        fd = os.open(staging_path(upload.id), os.O_WRONLY | os.O_APPEND)
+    except FileNotFoundError:
+        raise UploadGone("The upload is no longer accepting data")
+    with os.fdopen(fd, "ab") as staged:
+        try:
+            fcntl.flock(staged.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadLocked("Another request is writing to this upload")
+        # The holder before us may have completed or deleted the upload
+        if os.fstat(staged.fileno()).st_nlink == 0:
+            raise UploadGone("The upload is no longer accepting data")
+        yield staged
+
+
+async def append_chunk(staged: IO[bytes], upload: ResumableUpload, offset: int, chunks: AsyncIterator[bytes]) -> int:
+    """
+    Append the body of a PATCH request to the staged upload.
+
+    Bytes are written as they arrive, so if the connection drops the client
+    resumes from whatever reached the disk.
+
+    Args:
+        staged: Staging file from open_staged_upload
+        upload: The upload being written
+        offset: Upload-Offset sent by the client
+        chunks: The request body
+
+    Returns:
+        The new offset
+
+    Raises:
+        UploadOffsetMismatch: If offset is not the current end of the staged data
+        UploadLengthExceeded: If the body would go past the announced length
+    """
+    size = os.fstat(staged.fileno()).st_size
+    if offset != size:
+        raise UploadOffsetMismatch(f"Upload-Offset {offset} does not match the current offset {size}")
+    if offset > 0:
+        metrics.increment("resumable_uploads_total", outcome="resumed")
+
+    try:
+        async for chunk in chunks:
+            if size + len(chunk) > upload.upload_length:
+                raise UploadLengthExceeded(f"Chunk exceeds the upload length of {upload.upload_length} bytes")
+            await asyncio.to_thread(staged.write, chunk)
+            size += len(chunk)
+            metrics.increment("resumable_upload_bytes_total", len(chunk))
+    finally:
+        # Keep what was received even if the client went away mid-chunk
+        staged.flush()
+        os.fsync(staged.fileno())
+    return size
+
+
+async def complete_upload(session: AsyncSession, upload: ResumableUpload) -> Tuple[Receipt, bool]:
+    """
+    Hand a fully received upload to the normal receipt pipeline.
+
+    Call this while holding the upload with open_staged_upload.
+
+    Args:
+        session: Database session
+        upload: An upload whose offset has reached its length
+
+    Returns:
+        Tuple of the receipt and whether it is an existing duplicate
+
+    Raises:
+        UploadGone: If the staged bytes were discarded
+        UploadTooLarge: If the upload exceeds MAX_UPLOAD_BYTES
+        UploadError: If the receipt cannot be stored
+    """
+    path = staging_path(upload.id)
+    try:
+        staged = open(path, "rb")
+    except FileNotFoundError:
+        raise UploadGone("The upload is no longer accepting data")
+    with staged:
+        ingested = await asyncio.to_thread(ingest_fileobj, staged, upload.content_type, upload.filename)
+    try:
+        receipt, duplicate = await create_receipt_from_upload(
+            session,
+            ingested,
+            user_id=upload.receipt_user_id,
+            organization_id=upload.organization_id,
+            is_donation=upload.is_donation
+        )
+    finally:
+        ingested.close()
+
+    upload.status = ResumableUploadStatus.completed
+    upload.completed_at = datetime.utcnow()
+    upload.receipt_id = receipt.id
+    session.add(upload)
+    await session.commit()
+    path.unlink(missing_ok=True)
+    metrics.increment("resumable_uploads_total", outcome="completed")
+    return receipt, duplicate
+
+
+async def delete_upload(session: AsyncSession, upload: ResumableUpload) -> None:
+    """
+    Abandon an upload and discard its staged bytes.
+
+    Takes the same lock as open_staged_upload, so the bytes are never
+    discarded while a chunk is written or the receipt is created.
+
+    Raises:
+        UploadLocked: If another request holds the upload
+    """
+    try:
+        with open_staged_upload(upload):
+            staging_path(upload.id).unlink()
+    except UploadGone:
+        # Completed, or already abandoned by another request
+        pass
+    await session.delete(upload)
+    await session.commit()
+
+
+async def purge_expired_uploads(session: AsyncSession) -> int:
+    """
+    Delete expired uploads and their staged bytes.
+
+    Args:
+        session: Database session
+
+    Returns:
+        Number of uploads deleted
+    """
+    result = await session.exec(
+        select(ResumableUpload).where(ResumableUpload.expires_at <= datetime.utcnow())
+    )
+    uploads = result.all()
+    for upload in uploads:
+        staging_path(upload.id).unlink(missing_ok=True)
+        await session.delete(upload)
+        if upload.status == ResumableUploadStatus.in_progress:
+            metrics.increment("resumable_uploads_total", outcome="expired")
+    await session.commit()
+    return len(uploads)
@@ -0,0 +1,94 @@
+import json
+import logging
+import re
+from typing import Dict, Optional
+
+from app.core.db import async_session_factory
+from app.core.metrics import metrics
+from app.models.models import ShadowExtraction
+from baml_client.types import ReceiptData
+
+logger = logging.getLogger(__name__)
+
+# BAML functions a shadow run may call; both take one receipt image and return ReceiptData
+SHADOW_FUNCTIONS = ("ExtractReceiptData", "ExtractReceiptDataCandidate")
+_COMPARED_FIELDS = (
+    "vendor_name",
+    "vendor_address",
+    "purchase_date",
+    "county",
+    "subtotal_amount",
+    "tax_amount",
+    "total_amount",
+    "expense_category",
+    "is_donation",
+    "tax_breakdowns",
+)
+_AMOUNT_TOLERANCE = 0.005
+_RATE_TOLERANCE = 0.00005
+
+
+def _normalize(value: Optional[str]) -> str:
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", (value or "").lower()).split())
+
+
+def _same_field(field: str, primary, candidate) -> bool:
+    if field.endswith("_amount"):
+        return abs(primary - candidate) <= _AMOUNT_TOLERANCE
+    if field == "tax_breakdowns":
+        primary = sorted(primary, key=lambda breakdown: breakdown.tax_type.value)
+        candidate = sorted(candidate, key=lambda breakdown: breakdown.tax_type.value)
+        return len(primary) == len(candidate) and all(
+            a.tax_type == b.tax_type
+            and abs(a.amount - b.amount) <= _AMOUNT_TOLERANCE
+            and abs(a.tax_rate - b.tax_rate) <= _RATE_TOLERANCE
+            for a, b in zip(primary, candidate)
+        )
+    if isinstance(primary, str) or isinstance(candidate, str):
+        return _normalize(primary) == _normalize(candidate)
+    return primary == candidate
+
+
+def compare_extractions(primary: ReceiptData, candidate: ReceiptData) -> Dict[str, bool]:
+    """
+    Whether the candidate agrees with the primary result, field by field.
+
+    Amounts agree to the cent and text ignoring case and punctuation.
+    """
+    return {
+        field: _same_field(field, getattr(primary, field), getattr(candidate, field))
+        for field in _COMPARED_FIELDS
+    }
+
+
+async def record_shadow_extraction(
+    shadow: ShadowExtraction,
+    primary: ReceiptData,
+    candidate: Optional[ReceiptData]
+) -> None:
+    """
+    Compare a shadow run with the primary result and store it.
+
+    Runs in the background after the receipt was extracted, so failures
+    are logged rather than raised.
+    """
+    if candidate is not None:
+        agreement = compare_extractions(primary, candidate)
+        shadow.field_agreement = json.dumps(agreement)
+        shadow.fields_compared = len(agreement)
+        shadow.fields_agreed = sum(agreement.values())
+        shadow.candidate_result = candidate.model_dump_json()
+        outcome = "agreed" if shadow.fields_agreed == shadow.fields_compared else "disagreed"
+        for field, agreed in agreement.items():
+            if not agreed:
+                metrics.increment("shadow_field_disagreements_total", field=field)
+    else:
+        outcome = "failed"
+    metrics.increment("shadow_extractions_total", outcome=outcome)
+
+    try:
+        async with async_session_factory() as session:
+            session.add(shadow)
+            await session.commit()
+    except Exception as e:
+        logger.error(f"Could not store shadow extraction of receipt {shadow.receipt_id}: {e}", exc_info=True)
@@ -1,11 +1,31 @@
+import asyncio
+import base64
+import hashlib
+import logging
+import mimetypes
+import shutil
 import boto3
-from botocore.exceptions import ClientError
-from typing import Optional
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+from pathlib import Path
+from typing import IO, Any, Dict, Optional
 import uuid
 from datetime import datetime, timedelta
 
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+def sha256_checksum(hex_digest: str) -> str:
+    """Encode a hex SHA-256 digest as S3's x-amz-checksum-sha256 header expects."""
+    return base64.b64encode(bytes.fromhex(hex_digest)).decode("ascii")
+
+def _file_sha256(path: Path) -> str:
+    """Hex SHA-256 digest of a file in mock storage."""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
 class R2StorageService:
     """Service for Cloudflare R2 storage operations."""
     
@@ -14,24 +34,81 @@ class R2StorageService:
         if not settings.R2_ENDPOINT_URL or not settings.R2_ACCESS_KEY_ID or not settings.R2_SECRET_ACCESS_KEY:
             self.s3_client = None
             self.bucket_name = "mock-bucket"
-            print("Using mock storage service for development")
+            # Mock objects are kept on local disk so the extraction worker process can read them
+            self.local_root = Path(settings.LOCAL_STORAGE_DIR) / self.bucket_name
+            logger.info("Using mock storage service for development")
         else:
-            self.s3_client = boto3.client(
-                's3',
-                endpoint_url=settings.R2_ENDPOINT_URL,
-                aws_access_key_id=settings.R2_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
-                region_name='auto'  # R2 doesn't use regions like S3
-            )
+            self.s3_client = self._create_client(settings.R2_ENDPOINT_URL)
+            # Presigned URLs must be signed for the host the client will actually contact
+            if settings.R2_PUBLIC_ENDPOINT_URL:
+                self.presign_client = self._create_client(settings.R2_PUBLIC_ENDPOINT_URL)
+            else:
+                self.presign_client = self.s3_client
             self.bucket_name = settings.R2_BUCKET_NAME
     
-    async def upload_image(self, image_data: bytes, content_type: str = "image/jpeg") -> Optional[str]:
+    @staticmethod
+    def _create_client(endpoint_url: str):
+        """Create an S3 client for R2 or any S3-compatible endpoint."""
+        return boto3.client(
+            's3',
+            endpoint_url=endpoint_url,
+            aws_access_key_id=settings.R2_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
+            region_name='auto',  # R2 doesn't use regions like S3
+            config=Config(
+                signature_version='s3v4',
+                s3={'addressing_style': settings.R2_ADDRESSING_STYLE}
+            )
+        )
+    
+    @property
+    def uses_local_storage(self) -> bool:
+        """Whether objects are kept on local disk, where presigned URLs cannot reach them."""
+        return self.s3_client is None
+    
+    def _local_path(self, object_key: str) -> Path:
+        """Resolve an object key to its path in mock storage."""
+        return self.local_root / object_key
+    
+    def object_url(self, object_key: str) -> str:
+        """
+        Build the URL stored on a receipt for an object in the bucket.
+        
+        Args:
+            object_key: The key of the object in R2
+            
+        Returns:
+            URL of the object
+        """
+        if not self.s3_client:
+            return f"https://mock-storage.example.com/{self.bucket_name}/{object_key}"
+        return f"{settings.R2_ENDPOINT_URL}/{self.bucket_name}/{object_key}"
+    
+    def object_key_from_url(self, image_url: str) -> str:
+        """
+        Recover the object key from a URL returned by upload_image.
+        
+        Args:
+            image_url: URL stored on the receipt
+            
+        Returns:
+            The key of the object in the bucket
+        """
+        return image_url.split(f"/{self.bucket_name}/", 1)[-1]
+    
+    async def upload_image(
+        self,
+        image_data: bytes,
+        content_type: str = "image/jpeg",
+        object_key: Optional[str] = None
+    ) -> Optional[str]:
         """
         Upload an image to R2 storage.
         
         Args:
             image_data: Raw image bytes
             content_type: MIME type of the image
+            object_key: Key to store the image under (default: a random key)
             
         Returns:
             URL of the uploaded image if successful, None otherwise
@@ -39,14 +116,18 @@ class R2StorageService:
         try:
             # Generate unique filename
             file_extension = content_type.split('/')[-1]
-            filename = f"receipts/{uuid.uuid4()}.{file_extension}"
+            filename = object_key or f"receipts/{uuid.uuid4()}.{file_extension}"
             
-            # For development, return mock URL if R2 is not configured
+            # For development, write to local disk and return a mock URL if R2 is not configured
             if not self.s3_client:
-                return f"https://mock-storage.example.com/{self.bucket_name}/{filename}"
+                path = self._local_path(filename)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                await asyncio.to_thread(path.write_bytes, image_data)
+                return self.object_url(filename)
             
-            # Upload to R2
-            self.s3_client.put_object(
+            # Upload to R2 without blocking the event loop
+            await asyncio.to_thread(
+                self.s3_client.put_object,
                 Bucket=self.bucket_name,
                 Key=filename,
                 Body=image_data,
@@ -55,10 +136,85 @@ class R2StorageService:
             )
             
             # Return the object URL
-            return f"{settings.R2_ENDPOINT_URL}/{self.bucket_name}/{filename}"
+            return self.object_url(filename)
             
-        except ClientError as e:
-            print(f"R2 upload failed: {str(e)}")
+        except (ClientError, OSError) as e:
+            logger.error(f"R2 upload failed: {str(e)}")
+            return None
+    
+    async def upload_fileobj(
+        self,
+        fileobj: IO[bytes],
+        content_type: str,
+        object_key: str
+    ) -> Optional[str]:
+        """
+        Upload an image from a file object without loading it into memory.
+        
+        Large files are sent with multipart upload, streamed from the file in
+        parts of R2_MULTIPART_CHUNK_BYTES.
+        
+        Args:
+            fileobj: File to upload, positioned at the start
+            content_type: MIME type of the image
+            object_key: Key to store the image under
+            
+        Returns:
+            URL of the uploaded image if successful, None otherwise
+        """
+        try:
+            # For development, copy to local disk and return a mock URL if R2 is not configured
+            if not self.s3_client:
+                path = self._local_path(object_key)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                
+                def copy_to_disk() -> None:
+                    with open(path, "wb") as destination:
+                        shutil.copyfileobj(fileobj, destination)
+                
+                await asyncio.to_thread(copy_to_disk)
+                return self.object_url(object_key)
+            
+            await asyncio.to_thread(
+                self.s3_client.upload_fileobj,
+                fileobj,
+                self.bucket_name,
+                object_key,
+                ExtraArgs={'ContentType': content_type, 'ACL': 'private'},
+                Config=TransferConfig(
+                    multipart_threshold=settings.R2_MULTIPART_THRESHOLD_BYTES,
+                    multipart_chunksize=settings.R2_MULTIPART_CHUNK_BYTES
+                )
+            )
+            return self.object_url(object_key)
+            
+        except (ClientError, BotoCoreError, OSError) as e:
+            logger.error(f"R2 upload failed: {str(e)}")
+            return None
+    
+    async def download_image(self, object_key: str) -> Optional[bytes]:
+        """
+        Download an image from R2 storage.
+        
+        Args:
+            object_key: The key of the object in R2
+            
+        Returns:
+            Raw image bytes if successful, None otherwise
+        """
+        try:
+            if not self.s3_client:
+                return await asyncio.to_thread(self._local_path(object_key).read_bytes)
+            
+            response = await asyncio.to_thread(
+                self.s3_client.get_object,
+                Bucket=self.bucket_name,
+                Key=object_key
+            )
+            return await asyncio.to_thread(response["Body"].read)
+            
+        except (ClientError, OSError) as e:
+            logger.error(f"R2 download failed: {str(e)}")
             return None
     
     async def generate_presigned_url(self, object_key: str, expires_in: int = 3600) -> Optional[str]:
@@ -85,7 +241,93 @@ class R2StorageService:
             return url
             
         except ClientError as e:
-            print(f"Failed to generate presigned URL: {str(e)}")
+            logger.error(f"Failed to generate presigned URL: {str(e)}")
+            return None
+    
+    async def generate_presigned_upload_url(
+        self,
+        object_key: str,
+        content_type: str,
+        sha256: str,
+        expires_in: int = 900
+    ) -> Optional[str]:
+        """
+        Generate a presigned URL that lets a client PUT an object directly.
+        
+        The client must send the same Content-Type and x-amz-checksum-sha256
+        headers the URL was signed with, so storage verifies the upload's
+        checksum and get_object_metadata can report it without reading it.
+        
+        Args:
+            object_key: The key the object will be stored under
+            content_type: MIME type of the object
+            sha256: Hex SHA-256 of the object
+            expires_in: URL expiration time in seconds (default: 15 minutes)
+            
+        Returns:
+            Presigned URL if successful, None otherwise
+        """
+        try:
+            # For development, return mock URL if R2 is not configured
+            if not self.s3_client:
+                return f"https://mock-storage.example.com/{self.bucket_name}/{object_key}?upload=1&expires={expires_in}"
+            
+            url = self.presign_client.generate_presigned_url(
+                'put_object',
+                Params={
+                    'Bucket': self.bucket_name,
+                    'Key': object_key,
+                    'ContentType': content_type,
+                    'ChecksumSHA256': sha256_checksum(sha256)
+                },
+                ExpiresIn=expires_in
+            )
+            return url
+            
+        except ClientError as e:
+            logger.error(f"Failed to generate presigned upload URL: {str(e)}")
+            return None
+    
+    async def get_object_metadata(self, object_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up the size, content type and SHA-256 of a stored object.
+        
+        Args:
+            object_key: The key of the object in R2
+            
+        Returns:
+            Dict with content_length, content_type and sha256 (hex, or None if
+            the object was stored without a SHA-256 checksum), or None if the
+            object does not exist
+        """
+        try:
+            if not self.s3_client:
+                path = self._local_path(object_key)
+                if not path.is_file():
+                    return None
+                return {
+                    "content_length": path.stat().st_size,
+                    "content_type": mimetypes.guess_type(object_key)[0],
+                    "sha256": await asyncio.to_thread(_file_sha256, path)
+                }
+            
+            response = await asyncio.to_thread(
+                self.s3_client.head_object,
+                Bucket=self.bucket_name,
+                Key=object_key,
+                ChecksumMode="ENABLED"
+            )
+            checksum = response.get("ChecksumSHA256")
+            return {
+                "content_length": response["ContentLength"],
+                "content_type": response.get("ContentType"),
+                # Multipart uploads have a checksum of part checksums, not of the object
+                "sha256": base64.b64decode(checksum).hex() if checksum and "-" not in checksum else None
+            }
+            
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey", "NotFound"):
+                logger.error(f"R2 head_object failed: {str(e)}")
             return None
     
     async def delete_image(self, object_key: str) -> bool:
@@ -99,17 +341,19 @@ class R2StorageService:
             True if deletion successful, False otherwise
         """
         try:
-            # For development, return success if R2 is not configured
+            # For development, remove the local copy if R2 is not configured
             if not self.s3_client:
-                print(f"Mock deletion of {object_key}")
+                await asyncio.to_thread(self._local_path(object_key).unlink, missing_ok=True)
+                logger.info(f"Mock deletion of {object_key}")
                 return True
             
-            self.s3_client.delete_object(
+            await asyncio.to_thread(
+                self.s3_client.delete_object,
                 Bucket=self.bucket_name,
                 Key=object_key
             )
             return True
             
-        except ClientError as e:
-            print(f"R2 deletion failed: {str(e)}")
-            return False 
\ No newline at end of file
+        except (ClientError, OSError) as e:
+            logger.error(f"R2 deletion failed: {str(e)}")
+            return False
@@ -0,0 +1,403 @@
+import asyncio
+import hashlib
+import logging
+import tempfile
+import uuid
+from dataclasses import dataclass
+from typing import IO, Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import UploadFile
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.models import Receipt, ReceiptStatus
+from app.services.job_queue import ExtractionJobQueue
+from app.services.storage_service import R2StorageService
+
+logger = logging.getLogger(__name__)
+
+
+class UploadError(Exception):
+    """Raised when an uploaded receipt cannot be stored."""
+
+
+class UploadTooLarge(UploadError):
+    """Raised when an upload exceeds MAX_UPLOAD_BYTES."""
+
+
+class DuplicateOfOtherUser(UploadError):
+    """Raised when the organization already has the image as another user's receipt."""
+
+
+@dataclass
+class IngestedUpload:
+    """
+    An uploaded receipt image spooled to memory or disk, with its content hash.
+
+    Small uploads stay in memory; anything above UPLOAD_SPOOL_MAX_MEMORY_BYTES
+    is rolled over to a temporary file. Call close() once the upload is stored.
+    """
+    file: IO[bytes]
+    size: int
+    content_hash: str
+    content_type: str
+    filename: Optional[str] = None
+    buffered_bytes: int = 0
+
+    def read_bytes(self) -> bytes:
+        """Load the whole upload into memory, for consumers that need bytes."""
+        self.file.seek(0)
+        return self.file.read()
+
+    def close(self) -> None:
+        """Discard the spooled data and release its share of the memory gauge."""
+        if self.buffered_bytes:
+            metrics.adjust_gauge("upload_buffered_bytes", -self.buffered_bytes)
+            self.buffered_bytes = 0
+        self.file.close()
+
+
+class UploadSpooler:
+    """
+    Writes an upload into a SpooledTemporaryFile chunk by chunk.
+
+    The content is hashed as it is written and MAX_UPLOAD_BYTES is enforced
+    without ever holding more than UPLOAD_SPOOL_MAX_MEMORY_BYTES in memory.
+    The bytes currently held in memory are reported on the
+    upload_buffered_bytes gauge.
+    """
+
+    def __init__(self, content_type: str, filename: Optional[str] = None):
+        self.content_type = content_type
+        self.filename = filename
+        self._file = tempfile.SpooledTemporaryFile(max_size=settings.UPLOAD_SPOOL_MAX_MEMORY_BYTES)
+        self._hasher = hashlib.sha256()
+        self._size = 0
+        self._buffered = 0
+
+    def write(self, chunk: bytes) -> None:
+        """
+        Append a chunk to the upload.
+
+        Raises:
+            UploadTooLarge: If the upload grows past MAX_UPLOAD_BYTES
+        """
+        if self._size + len(chunk) > settings.MAX_UPLOAD_BYTES:
+            self.abort()
+            metrics.increment("uploads_rejected_total", reason="too_large")
+            raise UploadTooLarge(f"File exceeds the maximum size of {settings.MAX_UPLOAD_BYTES} bytes")
+
+        self._file.write(chunk)
+        self._hasher.update(chunk)
+        self._size += len(chunk)
+
+        # SpooledTemporaryFile moves its buffer to disk once it exceeds max_size
+        buffered = self._size if self._size <= settings.UPLOAD_SPOOL_MAX_MEMORY_BYTES else 0
+        if buffered != self._buffered:
+            metrics.adjust_gauge("upload_buffered_bytes", buffered - self._buffered)
+            self._buffered = buffered
+
+    def finish(self) -> IngestedUpload:
+        """Hand the spooled upload over, rewound to the start."""
+        self._file.seek(0)
+        metrics.increment("upload_bytes_total", self._size)
+        metrics.observe("upload_size_bytes", self._size)
+        return IngestedUpload(
+            file=self._file,
+            size=self._size,
+            content_hash=self._hasher.hexdigest(),
+            content_type=self.content_type,
+            filename=self.filename,
+            buffered_bytes=self._buffered
+        )
+
+    def abort(self) -> None:
+        """Discard a partially written upload."""
+        if self._buffered:
+            metrics.adjust_gauge("upload_buffered_bytes", -self._buffered)
+            self._buffered = 0
+        self._file.close()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into a single execution."""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run func unless a call with the same key is already running.
+
+        Args:
+            key: Identifies calls that may share a result
+            func: Coroutine function producing the result
+
+        Returns:
+            Tuple of the result and whether it was shared from another caller
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await func()
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._inflight[key]
+
+
+# Identical uploads that arrive while one is being stored wait for its result
+_upload_flights = SingleFlight()
+
+
+async def ingest_upload(upload: UploadFile) -> IngestedUpload:
+    """
+    Spool an uploaded file in chunks, hashing it as it streams in.
+
+    Args:
+        upload: The uploaded file
+
+    Returns:
+        The spooled upload and its SHA-256 hash
+
+    Raises:
+        UploadTooLarge: If the file exceeds MAX_UPLOAD_BYTES
+    """
+    spooler = UploadSpooler(upload.content_type or "application/octet-stream", upload.filename)
+    try:
+        while chunk := await upload.read(settings.UPLOAD_CHUNK_SIZE_BYTES):
+            spooler.write(chunk)
+    except BaseException:
+        spooler.abort()
+        raise
+    return spooler.finish()
+
+
+def ingest_fileobj(fileobj: IO[bytes], content_type: str, filename: Optional[str] = None) -> IngestedUpload:
+    """
+    Spool a file that was not received as an UploadFile, e.g. a ZIP member.
+
+    This reads synchronously, so call it from a worker thread.
+
+    Args:
+        fileobj: File to read from its current position
+        content_type: MIME type of the image
+        filename: Original file name
+
+    Returns:
+        The spooled upload and its SHA-256 hash
+
+    Raises:
+        UploadTooLarge: If the file exceeds MAX_UPLOAD_BYTES
+    """
+    spooler = UploadSpooler(content_type, filename)
+    try:
+        while chunk := fileobj.read(settings.UPLOAD_CHUNK_SIZE_BYTES):
+            spooler.write(chunk)
+    except BaseException:
+        spooler.abort()
+        raise
+    return spooler.finish()
+
+
+def content_addressed_key(organization_id: uuid.UUID, content_hash: str, content_type: str) -> str:
+    """Build the storage key for an image so identical uploads share one object."""
+    file_extension = content_type.split('/')[-1]
+    return f"receipts/{organization_id}/{content_hash}.{file_extension}"
+
+
+async def find_duplicate_receipt(
+    session: AsyncSession,
+    organization_id: uuid.UUID,
+    content_hash: str
+) -> Optional[Receipt]:
+    """Find a receipt in the organization that was created from the same image."""
+    statement = select(Receipt).where(
+        Receipt.organization_id == organization_id,
+        Receipt.content_hash == content_hash
+    )
+    result = await session.exec(statement)
+    return result.first()
+
+
+async def create_receipt_from_upload(
+    session: AsyncSession,
+    upload: IngestedUpload,
+    user_id: uuid.UUID,
+    organization_id: uuid.UUID,
+    is_donation: bool = False
+) -> Tuple[Receipt, bool]:
+    """
+    Store an uploaded image and queue its extraction, skipping duplicates.
+
+    If the organization already has a receipt for the same image, that receipt
+    is returned, or DuplicateOfOtherUser raised when it belongs to another
+    user, and neither storage nor extraction runs again.
+
+    Args:
+        session: Database session
+        upload: The ingested upload
+        user_id: ID of the user the receipt belongs to
+        organization_id: ID of the organization the receipt belongs to
+        is_donation: Whether the receipt is a donation
+
+    Returns:
+        Tuple of the receipt and whether it is an existing duplicate
+
+    Raises:
+        DuplicateOfOtherUser: If the existing receipt belongs to another user,
+            who the uploader must not learn about
+        UploadError: If the image cannot be stored
+    """
+    flight_key = f"{organization_id}:{upload.content_hash}"
+    (receipt_id, duplicate), shared = await _upload_flights.do(
+        flight_key,
+        lambda: _store_and_create(session, upload, user_id, organization_id, is_donation)
+    )
+    # Coalesced callers load the winner's receipt in their own session
+    receipt = await session.get(Receipt, receipt_id)
+    if receipt.user_id != user_id:
+        raise DuplicateOfOtherUser("This receipt was already submitted by another member of your organization")
+    return receipt, duplicate or shared
+
+
+async def _store_and_create(
+    session: AsyncSession,
+    upload: IngestedUpload,
+    user_id: uuid.UUID,
+    organization_id: uuid.UUID,
+    is_donation: bool
+) -> Tuple[uuid.UUID, bool]:
+    """Store the image and create the receipt unless a duplicate already exists."""
+    existing = await find_duplicate_receipt(session, organization_id, upload.content_hash)
+    if existing:
+        logger.info(f"Upload matches existing receipt {existing.id}; skipping storage and extraction")
+        return existing.id, True
+
+    # Content-addressed keys make a repeated put of the same image harmless
+    storage_service = R2StorageService()
+    object_key = content_addressed_key(organization_id, upload.content_hash, upload.content_type)
+    image_url = await storage_service.upload_fileobj(upload.file, upload.content_type, object_key=object_key)
+    if not image_url:
+        raise UploadError("Failed to upload image")
+
+    receipt = Receipt(
+        image_url=image_url,
+        content_hash=upload.content_hash,
+        user_id=user_id,
+        organization_id=organization_id,
+        is_donation=is_donation,
+        status=ReceiptStatus.processing
+    )
+    session.add(receipt)
+    ExtractionJobQueue.enqueue(session, receipt.id)
+
+    try:
+        await session.commit()
+    except IntegrityError:
+        # Another API process committed the same image first
+        await session.rollback()
+        existing = await find_duplicate_receipt(session, organization_id, upload.content_hash)
+        if not existing:
+            raise
+        return existing.id, True
+
+    return receipt.id, False
+
+
+def direct_upload_key(organization_id: uuid.UUID, content_type: str) -> str:
+    """Build the storage key a client uploads to with a presigned URL."""
+    file_extension = content_type.split('/')[-1]
+    return f"receipts/{organization_id}/direct/{uuid.uuid4()}.{file_extension}"
+
+
+def is_direct_upload_key(organization_id: uuid.UUID, object_key: str) -> bool:
+    """Check that a key was issued to the organization for a direct upload."""
+    prefix = f"receipts/{organization_id}/direct/"
+    return object_key.startswith(prefix) and "/" not in object_key[len(prefix):]
+
+
+async def create_receipt_from_stored_object(
+    session: AsyncSession,
+    object_key: str,
+    content_hash: Optional[str],
+    user_id: uuid.UUID,
+    organization_id: uuid.UUID,
+    is_donation: bool = False
+) -> Tuple[Receipt, bool]:
+    """
+    Create a receipt for an image a client uploaded straight to storage.
+
+    Finalizing the same object twice returns the receipt created the first
+    time. As with direct uploads, an image the organization already has
+    resolves to the existing receipt, and the new object is deleted.
+
+    Args:
+        session: Database session
+        object_key: Key of the uploaded object
+        content_hash: SHA-256 of the object that storage verified on upload,
+            or None if it was stored without one
+        user_id: ID of the user the receipt belongs to
+        organization_id: ID of the organization the receipt belongs to
+        is_donation: Whether the receipt is a donation
+
+    Returns:
+        Tuple of the receipt and whether it already existed
+
+    Raises:
+        DuplicateOfOtherUser: If the image is another user's receipt
+    """
+    storage_service = R2StorageService()
+    image_url = storage_service.object_url(object_key)
+
+    result = await session.exec(
+        select(Receipt).where(
+            Receipt.organization_id == organization_id,
+            Receipt.image_url == image_url
+        )
+    )
+    existing = result.first()
+    if existing:
+        return existing, True
+
+    existing = await find_duplicate_receipt(session, organization_id, content_hash) if content_hash else None
+    if not existing:
+        receipt = Receipt(
+            image_url=image_url,
+            content_hash=content_hash,
+            user_id=user_id,
+            organization_id=organization_id,
+            is_donation=is_donation,
+            status=ReceiptStatus.processing
+        )
+        session.add(receipt)
+        ExtractionJobQueue.enqueue(session, receipt.id)
+        try:
+            await session.commit()
+            await session.refresh(receipt)
+            return receipt, False
+        except IntegrityError:
+            # Another upload of the same image was committed first
+            await session.rollback()
+            existing = await find_duplicate_receipt(session, organization_id, content_hash)
+            if not existing:
+                raise
+
+    logger.info(f"Finalized object {object_key} matches existing receipt {existing.id}; skipping extraction")
+    await storage_service.delete_image(object_key)
+    if existing.user_id != user_id:
+        raise DuplicateOfOtherUser("This receipt was already submitted by another member of your organization")
+    return existing, True
@@ -0,0 +1,211 @@
+import json
+import logging
+import re
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.metrics import metrics
+from app.models.models import Receipt, VendorProfile
+from app.services.baml_service import BAMLService
+from baml_client.types import ReceiptData, TaxBreakdown, TaxType
+
+logger = logging.getLogger(__name__)
+
+_ZIP_CODE = re.compile(r"\b(\d{5})(?:-\d{4})?\b")
+# Store numbers, as in "Walmart Supercenter #1234" or "Food Lion Store 0563"
+_STORE_NUMBER = re.compile(r"(?:#|\bstore\s*#?|\bno\.?\s*)\s*\d+\b", re.IGNORECASE)
+# Words that vary between receipts of the same vendor
+_NAME_NOISE = {"the", "inc", "llc", "corp", "co", "ltd", "store", "stores", "supercenter", "superstore"}
+# Allowed difference between the tax the profile's rates give and the tax on the receipt
+_TAX_SPLIT_TOLERANCE = 0.05
+
+
+def _normalize_text(value: str) -> str:
+    """Lowercase with punctuation removed and whitespace collapsed."""
+    value = value.lower().replace("&", " and ").replace("'", "")
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", value).split())
+
+
+def vendor_profile_key(vendor_name: Optional[str], vendor_address: Optional[str]) -> Optional[str]:
+    """
+    Key a vendor's profile by its normalized name and location.
+
+    The location is the ZIP code when the address has one, since the same
+    store's address is printed in many ways, and the normalized address
+    otherwise. Receipts without an address share a vendor-wide profile.
+
+    Returns:
+        The key, or None if the vendor name is empty
+    """
+    name = " ".join(word for word in _normalize_text(_STORE_NUMBER.sub(" ", vendor_name or "")).split() if word not in _NAME_NOISE)
+    if not name:
+        return None
+    zip_code = _ZIP_CODE.search(vendor_address or "")
+    location = zip_code.group(1) if zip_code else _normalize_text(vendor_address or "")
+    return f"{name}|{location}"
+
+
+def _load_tax_rates(profile: VendorProfile) -> List[dict]:
+    return json.loads(profile.tax_rates) if profile.tax_rates else []
+
+
+def _tax_rates_of(breakdowns: List[TaxBreakdown]) -> Optional[str]:
+    """The rates of a receipt's tax breakdowns as profile JSON, or None unless every rate is known."""
+    if not breakdowns or any(not breakdown.tax_rate or breakdown.tax_rate <= 0 for breakdown in breakdowns):
+        return None
+    return json.dumps([{"tax_type": breakdown.tax_type.value, "tax_rate": breakdown.tax_rate} for breakdown in breakdowns])
+
+
+def _split_tax(data: ReceiptData, tax_rates: List[dict]) -> Optional[List[TaxBreakdown]]:
+    """
+    Split a receipt's tax between the profile's rates.
+
+    Returns:
+        The breakdowns, or None if the rates do not account for the tax on the receipt
+    """
+    if not tax_rates or not data.subtotal_amount or not data.tax_amount:
+        return None
+    if abs(data.subtotal_amount * sum(rate["tax_rate"] for rate in tax_rates) - data.tax_amount) > _TAX_SPLIT_TOLERANCE:
+        return None
+
+    breakdowns = [
+        TaxBreakdown(tax_type=TaxType(rate["tax_type"]), tax_rate=rate["tax_rate"], amount=round(data.subtotal_amount * rate["tax_rate"], 2))
+        for rate in tax_rates
+    ]
+    # Rounding differences go to the last rate, so the breakdowns add up to the tax
+    breakdowns[-1].amount = round(data.tax_amount - sum(breakdown.amount for breakdown in breakdowns[:-1]), 2)
+    return breakdowns
+
+
+async def get_vendor_profile(session: AsyncSession, organization_id: uuid.UUID, vendor_key: str) -> Optional[VendorProfile]:
+    result = await session.exec(
+        select(VendorProfile).where(
+            VendorProfile.organization_id == organization_id,
+            VendorProfile.vendor_key == vendor_key
+        )
+    )
+    return result.first()
+
+
+async def _add_profile(session: AsyncSession, profile: VendorProfile) -> None:
+    try:
+        # A savepoint, so a concurrent insert does not roll back the caller's changes
+        async with session.begin_nested():
+            session.add(profile)
+    except IntegrityError:
+        logger.debug(f"Vendor profile {profile.vendor_key} was already created")
+
+
+async def apply_vendor_profile(session: AsyncSession, organization_id: uuid.UUID, data: ReceiptData) -> None:
+    """
+    Fill in or verify county, category and tax breakdowns from the vendor's profile.
+
+    Missing fields are filled in from the profile. Fields that disagree
+    with a profile a treasurer confirmed are overwritten with the confirmed
+    values; a profile that was only learned from earlier extractions
+    follows the latest reconciled extraction instead. Vendors without a
+    profile get one learned from this extraction. Changes to profiles are
+    added to the session and committed with the receipt.
+
+    Args:
+        session: Database session
+        organization_id: Organization the receipt belongs to
+        data: Extracted data, updated in place
+    """
+    vendor_key = vendor_profile_key(data.vendor_name, data.vendor_address)
+    if vendor_key is None:
+        return
+    reliable = BAMLService.validate_extracted_data(data) and BAMLService.amounts_reconcile(data)
+
+    profile = await get_vendor_profile(session, organization_id, vendor_key)
+    metrics.increment("vendor_profile_lookups_total", result="hit" if profile else "miss")
+    if profile is None:
+        if reliable and (data.county or data.expense_category):
+            await _add_profile(session, VendorProfile(
+                vendor_key=vendor_key,
+                vendor_name=data.vendor_name,
+                vendor_address=data.vendor_address,
+                county=data.county or None,
+                expense_category=data.expense_category or None,
+                tax_rates=_tax_rates_of(data.tax_breakdowns),
+                organization_id=organization_id
+            ))
+            metrics.increment("vendor_profile_updates_total", source="extraction")
+        return
+
+    profile.hit_count += 1
+    profile.last_hit_at = datetime.utcnow()
+    learned = False
+    for field in ("county", "expense_category"):
+        known = getattr(profile, field)
+        extracted = getattr(data, field)
+        if not known:
+            if extracted and reliable:
+                setattr(profile, field, extracted)
+                learned = True
+        elif not extracted:
+            setattr(data, field, known)
+            metrics.increment("vendor_profile_fields_total", field=field, action="filled")
+        elif _normalize_text(known) == _normalize_text(extracted):
+            metrics.increment("vendor_profile_fields_total", field=field, action="agreed")
+        elif profile.confirmed:
+            logger.info(f"Vendor profile {vendor_key} corrects {field} {extracted!r} to {known!r}")
+            setattr(data, field, known)
+            metrics.increment("vendor_profile_fields_total", field=field, action="corrected")
+        else:
+            metrics.increment("vendor_profile_fields_total", field=field, action="disagreed")
+            if reliable:
+                setattr(profile, field, extracted)
+                learned = True
+
+    if not data.tax_breakdowns:
+        breakdowns = _split_tax(data, _load_tax_rates(profile))
+        if breakdowns:
+            data.tax_breakdowns = breakdowns
+            metrics.increment("vendor_profile_fields_total", field="tax_breakdowns", action="filled")
+    elif reliable and not profile.confirmed:
+        tax_rates = _tax_rates_of(data.tax_breakdowns)
+        if tax_rates and tax_rates != profile.tax_rates:
+            profile.tax_rates = tax_rates
+            learned = True
+
+    if learned:
+        profile.updated_at = datetime.utcnow()
+        metrics.increment("vendor_profile_updates_total", source="extraction")
+    session.add(profile)
+
+
+async def record_vendor_correction(session: AsyncSession, receipt: Receipt, tax_rates: Optional[List[dict]] = None) -> None:
+    """
+    Store a treasurer's corrected receipt as its vendor's confirmed profile.
+
+    Later receipts from the vendor are filled in and corrected from it.
+    The profile is added to the session and committed with the receipt.
+
+    Args:
+        session: Database session
+        receipt: The corrected receipt
+        tax_rates: Corrected tax rates as [{"tax_type": "State", "tax_rate": 0.0475}], if given
+    """
+    vendor_key = vendor_profile_key(receipt.vendor_name, receipt.vendor_address)
+    if vendor_key is None:
+        return
+
+    profile = await get_vendor_profile(session, receipt.organization_id, vendor_key)
+    if profile is None:
+        profile = VendorProfile(vendor_key=vendor_key, vendor_name=receipt.vendor_name, organization_id=receipt.organization_id)
+    profile.vendor_name = receipt.vendor_name
+    profile.vendor_address = receipt.vendor_address or profile.vendor_address
+    profile.county = receipt.county or profile.county
+    profile.expense_category = receipt.expense_category or profile.expense_category
+    if tax_rates:
+        profile.tax_rates = json.dumps(tax_rates)
+    profile.confirmed = True
+    profile.updated_at = datetime.utcnow()
+    session.add(profile)
+    metrics.increment("vendor_profile_updates_total", source="correction")
@@ -0,0 +1,320 @@
+"""
+Offline stand-in for the OpenAI chat-completions API, for load tests.
+
+Answers ExtractReceiptData calls with canned ReceiptData JSON for the
+sample receipts in data/, ExtractReceiptDataBatch calls with one such
+answer per image, and ExtractReceiptDataFromText calls with the answer
+whose total appears in the text, after a simulated latency, and fails a
+configurable share of requests. Point the app at it with
+LLM_STUB_BASE_URL=http://localhost:8100/v1.
+
+Run with ``python -m app.stub_llm [--port 8100] [--latency-median-ms 1200]``.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import math
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import requests
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.core.config import settings
+from app.services.image_service import estimate_vision_tokens, image_dimensions, normalize_image
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+RESPONSES_FILE = "stub_llm_responses.json"
+# z-score of the 95th percentile, to turn a median and p95 into a lognormal distribution
+_P95_Z = 1.645
+# Rough token count of the extraction prompt without the image
+_PROMPT_TOKENS = 600
+# Number of chunks a streamed answer is split into
+_STREAM_CHUNKS = 8
+# Share of a streamed answer's latency spent before the first chunk
+_TIME_TO_FIRST_CHUNK = 0.3
+
+
+@dataclass
+class LatencyProfile:
+    """Lognormal response latency described by its median and 95th percentile."""
+    median_ms: float
+    p95_ms: float
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw a latency in seconds."""
+        if self.median_ms <= 0:
+            return 0.0
+        sigma = math.log(max(self.p95_ms, self.median_ms) / self.median_ms) / _P95_Z
+        return rng.lognormvariate(math.log(self.median_ms), sigma) / 1000
+
+
+@dataclass
+class StubConfig:
+    """Behaviour of the stub server."""
+    latency: LatencyProfile
+    model_latency: Dict[str, LatencyProfile] = field(default_factory=dict)
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    unreconciled_rate: float = 0.0
+    retry_after_seconds: int = 1
+    seed: Optional[int] = None
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def load_responses(data_dir: Path) -> Tuple[Dict[str, dict], List[dict]]:
+    """
+    Index the canned responses by the hash of the image they belong to.
+
+    Each image is indexed both as stored and as normalized with the current
+    IMAGE_* settings, since the worker sends the normalized copy.
+
+    Args:
+        data_dir: Directory with the sample images and stub_llm_responses.json
+
+    Returns:
+        Tuple of the responses by image hash and all responses in file order
+    """
+    with open(data_dir / RESPONSES_FILE) as f:
+        canned = json.load(f)
+
+    by_hash = {}
+    for filename, response in canned.items():
+        image_data = (data_dir / filename).read_bytes()
+        by_hash[_sha256(image_data)] = response
+        try:
+            normalized, _, _ = normalize_image(
+                image_data,
+                settings.IMAGE_MAX_LONG_EDGE,
+                settings.IMAGE_JPEG_QUALITY,
+                settings.IMAGE_NORMALIZATION_GRAYSCALE
+            )
+            by_hash[_sha256(normalized)] = response
+        except Exception as e:
+            logger.warning(f"Could not normalize {filename}; only the original will match: {e}")
+    return by_hash, list(canned.values())
+
+
+def _fetch_image(url: str) -> Optional[bytes]:
+    try:
+        response = requests.get(url, timeout=10)
+        response.raise_for_status()
+        return response.content
+    except requests.RequestException as e:
+        logger.warning(f"Could not fetch image {url}: {e}")
+        return None
+
+
+async def _request_images(body: dict) -> List[Optional[bytes]]:
+    """The images in a chat-completions request, sent inline as base64 or as URLs."""
+    images = []
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if not isinstance(content, list):
+            continue
+        for part in content:
+            url = part.get("image_url", {}).get("url", "") if part.get("type") == "image_url" else ""
+            if url.startswith("data:") and "," in url:
+                images.append(base64.b64decode(url.split(",", 1)[1]))
+            elif url.startswith(("http://", "https://")):
+                images.append(await asyncio.to_thread(_fetch_image, url))
+    return images
+
+
+def _request_text(body: dict) -> str:
+    """All text parts of a chat-completions request."""
+    texts = []
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            texts.append(content)
+        elif isinstance(content, list):
+            texts.extend(part.get("text", "") for part in content if part.get("type") == "text")
+    return "\n".join(texts)
+
+
+def _unreconciled(response: dict) -> dict:
+    """A copy of a response whose total no longer matches subtotal plus tax."""
+    response = dict(response)
+    response["total_amount"] = round(response["total_amount"] + 1.0, 2)
+    return response
+
+
+def create_app(config: StubConfig, data_dir: Path = DEFAULT_DATA_DIR) -> FastAPI:
+    """Build the stub chat-completions app."""
+    responses_by_hash, responses = load_responses(data_dir)
+    rng = random.Random(config.seed)
+    app = FastAPI(title="GoodStewards stub LLM")
+
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "stub")
+        latency = config.model_latency.get(model, config.latency).sample(rng)
+        streamed = bool(body.get("stream"))
+        # Streamed answers arrive gradually; everything else arrives all at once
+        await asyncio.sleep(latency * _TIME_TO_FIRST_CHUNK if streamed else latency)
+
+        roll = rng.random()
+        if roll < config.rate_limit_rate:
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_exceeded"}},
+                headers={"Retry-After": str(config.retry_after_seconds)}
+            )
+        if roll < config.rate_limit_rate + config.error_rate:
+            return JSONResponse(
+                status_code=500,
+                content={"error": {"message": "Internal server error (stub)", "type": "server_error"}}
+            )
+
+        def answer(image_data: Optional[bytes]) -> dict:
+            image_hash = _sha256(image_data) if image_data else ""
+            response = responses_by_hash.get(image_hash)
+            if response is None:
+                # Unknown images still get a plausible answer, the same one every time
+                response = responses[int(image_hash or "0", 16) % len(responses)]
+            if rng.random() < config.unreconciled_rate:
+                response = _unreconciled(response)
+            return response
+
+        images = await _request_images(body)
+        prompt_tokens = _PROMPT_TOKENS
+        if len(images) > 1:
+            # A batch call: one answer per image, in the shape of ReceiptBatchItem
+            content = json.dumps([{"image_index": index, "receipt": answer(image)} for index, image in enumerate(images)])
+        elif images:
+            content = json.dumps(answer(images[0]))
+        else:
+            # A text call: the receipt whose total appears in the text, if any
+            text = _request_text(body)
+            matching = [response for response in responses if f"{response['total_amount']:.2f}" in text]
+            content = json.dumps(matching[0] if matching else answer(None))
+            prompt_tokens += len(text) // 4
+        for image_data in images:
+            try:
+                prompt_tokens += estimate_vision_tokens(*image_dimensions(image_data))
+            except Exception:
+                pass
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": prompt_tokens + len(content) // 4
+        }
+        completion_id = f"chatcmpl-stub-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        if not streamed:
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            }
+
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+        chunk_size = max(1, math.ceil(len(content) / _STREAM_CHUNKS))
+
+        async def stream():
+            def chunk(delta: dict, finish_reason: Optional[str] = None) -> str:
+                return "data: " + json.dumps({
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+                }) + "\n\n"
+
+            yield chunk({"role": "assistant", "content": ""})
+            for start in range(0, len(content), chunk_size):
+                yield chunk({"content": content[start:start + chunk_size]})
+                await asyncio.sleep(latency * (1 - _TIME_TO_FIRST_CHUNK) / _STREAM_CHUNKS)
+            yield chunk({}, finish_reason="stop")
+            if include_usage:
+                yield "data: " + json.dumps({
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [],
+                    "usage": usage
+                }) + "\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def _model_latency(value: str) -> Tuple[str, LatencyProfile]:
+    """Parse MODEL=MEDIAN_MS:P95_MS."""
+    try:
+        model, profile = value.split("=", 1)
+        median_ms, p95_ms = profile.split(":", 1)
+        return model, LatencyProfile(float(median_ms), float(p95_ms))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected MODEL=MEDIAN_MS:P95_MS, got {value!r}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible stub for receipt extraction load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR, help=f"Directory with the sample images and {RESPONSES_FILE}")
+    parser.add_argument("--latency-median-ms", type=float, default=1200, help="Median response latency")
+    parser.add_argument("--latency-p95-ms", type=float, default=3000, help="95th percentile response latency")
+    parser.add_argument(
+        "--model-latency",
+        type=_model_latency,
+        action="append",
+        default=[],
+        metavar="MODEL=MEDIAN_MS:P95_MS",
+        help="Latency of one model, e.g. gpt-4o-mini=800:2000 (repeatable)"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--unreconciled-rate", type=float, default=0.0, help="Share of answers whose total does not add up")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for latencies and errors, for repeatable runs")
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency=LatencyProfile(args.latency_median_ms, args.latency_p95_ms),
+        model_latency=dict(args.model_latency),
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        unreconciled_rate=args.unreconciled_rate,
+        retry_after_seconds=args.retry_after,
+        seed=args.seed
+    )
+    logger.info(f"Starting stub LLM on {args.host}:{args.port} with data from {args.data_dir}")
+    uvicorn.run(create_app(config, args.data_dir), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+Background worker that drains the receipt extraction job queue.
+
+Run with ``python -m app.worker [--concurrency N] [--batch-size N]``.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import signal
+import uuid
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator, List, Optional
+
+from app.core.config import settings
+from app.core.db import async_session_factory
+from app.core.metrics import metrics
+from app.core.process_pool import shutdown_process_pool
+from app.models.models import ExtractionJob
+from app.services.extraction_cache import extraction_cache
+from app.services.idempotency_service import IdempotencyStore
+from app.services.job_queue import ExtractionJobQueue
+from app.services.llm_rate_limiter import LLMRateLimited
+from app.services.receipt_service import extract_receipt_batch, process_receipt
+from baml_client.types import ReceiptData
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+async def _heartbeat_loop(job_ids: List[uuid.UUID], interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with async_session_factory() as session:
+                await ExtractionJobQueue.heartbeat(session, job_ids)
+        except Exception as e:
+            # A missed heartbeat only matters if they keep failing past the lock timeout
+            logger.warning(f"Could not refresh the lock of extraction jobs {job_ids}: {e}")
+
+
+@asynccontextmanager
+async def job_heartbeat(job_ids: List[uuid.UUID]) -> AsyncIterator[None]:
+    """
+    Keep refreshing the lock of running jobs while the block runs.
+    
+    Slow extractions outlive EXTRACTION_JOB_LOCK_TIMEOUT_SECONDS, and without
+    the heartbeat the recovery sweep would queue them a second time.
+    """
+    task = asyncio.create_task(_heartbeat_loop(job_ids, settings.EXTRACTION_JOB_HEARTBEAT_SECONDS))
+    try:
+        yield
+    finally:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+
+
+async def run_job(job_id: uuid.UUID, receipt_id: uuid.UUID, extracted_data: Optional[ReceiptData] = None) -> bool:
+    """
+    Run a claimed extraction job.
+    
+    Args:
+        job_id: ID of the running job
+        receipt_id: ID of the job's receipt
+        extracted_data: Result already extracted for the receipt, if any
+    
+    Returns:
+        False if the job was deferred because the LLM provider is saturated,
+        True otherwise
+    """
+    async with job_heartbeat([job_id]), async_session_factory() as session:
+        try:
+            await process_receipt(session, receipt_id, extracted_data)
+            job = await session.get(ExtractionJob, job_id)
+            await ExtractionJobQueue.complete(session, job)
+            logger.info(f"Extraction job {job_id} succeeded for receipt {receipt_id}")
+        except LLMRateLimited as e:
+            # Not the receipt's fault, so the attempt does not count; back off before claiming more work
+            logger.info(f"Extraction job {job_id} deferred: {e}")
+            await session.rollback()
+            await ExtractionJobQueue.defer(session, job_id, settings.EXTRACTION_JOB_RETRY_DELAY_SECONDS, str(e))
+            return False
+        except Exception as e:
+            logger.warning(f"Extraction job {job_id} failed: {e}", exc_info=True)
+            await session.rollback()
+            await ExtractionJobQueue.fail(session, job_id, str(e))
+        return True
+
+
+async def process_next_job() -> bool:
+    """
+    Claim and run a single extraction job.
+    
+    Returns:
+        True if a job was processed, False if the queue was empty or the
+        job was deferred because the LLM provider is saturated
+    """
+    async with async_session_factory() as session:
+        job = await ExtractionJobQueue.claim(session)
+        if not job:
+            return False
+        job_id, receipt_id = job.id, job.receipt_id
+    return await run_job(job_id, receipt_id)
+
+
+async def process_next_batch(batch_size: int) -> bool:
+    """
+    Claim up to batch_size jobs and extract their receipts with one LLM call.
+    
+    Receipts the batch call could not handle are extracted one by one, and
+    every job is completed, deferred or failed on its own.
+    
+    Returns:
+        True if jobs were processed, False if the queue was empty or a job
+        was deferred because the LLM provider is saturated
+    """
+    async with async_session_factory() as session:
+        jobs = await ExtractionJobQueue.claim_batch(session, batch_size)
+        if not jobs:
+            return False
+        claimed = [(job.id, job.receipt_id) for job in jobs]
+        try:
+            async with job_heartbeat([job_id for job_id, _ in claimed]):
+                extracted = await extract_receipt_batch(session, [receipt_id for _, receipt_id in claimed])
+            # Commits the cache entries of the batch's results
+            await session.commit()
+        except Exception as e:
+            logger.error(f"Could not batch {len(claimed)} extraction jobs: {e}", exc_info=True)
+            await session.rollback()
+            extracted = {}
+    
+    processed = await asyncio.gather(*(
+        run_job(job_id, receipt_id, extracted.get(receipt_id)) for job_id, receipt_id in claimed
+    ))
+    return all(processed)
+
+
+async def worker_loop(worker_number: int, poll_interval: float, batch_size: int, stop_event: asyncio.Event) -> None:
+    """
+    Process jobs until asked to stop, sleeping while the queue is empty.
+    """
+    logger.info(f"Worker {worker_number} started")
+    while not stop_event.is_set():
+        try:
+            processed = await (process_next_batch(batch_size) if batch_size > 1 else process_next_job())
+        except Exception as e:
+            # Database hiccups must not kill the worker; back off and try again
+            logger.error(f"Worker {worker_number} could not claim a job: {e}", exc_info=True)
+            processed = False
+        
+        if not processed:
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+    logger.info(f"Worker {worker_number} stopped")
+
+
+async def log_metrics_loop(interval: float, stop_event: asyncio.Event) -> None:
+    """
+    Periodically log this process's metrics, since the worker serves no /metrics endpoint.
+    """
+    while not stop_event.is_set():
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+        logger.info(f"Worker metrics: {json.dumps(metrics.snapshot())}")
+
+
+async def purge_idempotency_keys_loop(interval: float, stop_event: asyncio.Event) -> None:
+    """
+    Periodically delete idempotency keys whose stored responses have expired.
+    """
+    while not stop_event.is_set():
+        try:
+            async with async_session_factory() as session:
+                purged = await IdempotencyStore.purge_expired(session)
+            if purged:
+                logger.info(f"Purged {purged} expired idempotency keys")
+        except Exception as e:
+            logger.error(f"Could not purge idempotency keys: {e}", exc_info=True)
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def purge_extraction_cache_loop(interval: float, stop_event: asyncio.Event) -> None:
+    """
+    Periodically delete cached extractions that expired.
+    """
+    while not stop_event.is_set():
+        try:
+            async with async_session_factory() as session:
+                purged = await extraction_cache.purge_expired(session)
+            if purged:
+                logger.info(f"Purged {purged} extraction cache entries")
+        except Exception as e:
+            logger.error(f"Could not purge the extraction cache: {e}", exc_info=True)
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def recover_stuck_receipts_loop(interval: float, stop_event: asyncio.Event) -> None:
+    """
+    Periodically retry or dead-letter extractions left stuck by a dead worker or a lost job.
+    """
+    while not stop_event.is_set():
+        try:
+            async with async_session_factory() as session:
+                recovered = await ExtractionJobQueue.recover_stuck(session)
+            if recovered:
+                logger.info(f"Recovered {recovered} stuck extractions")
+        except Exception as e:
+            logger.error(f"Could not recover stuck extractions: {e}", exc_info=True)
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_worker(concurrency: int, poll_interval: float, batch_size: int = 1) -> None:
+    """
+    Run a pool of concurrent workers until SIGINT/SIGTERM.
+    """
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # Signal handlers are not available on Windows event loops
+            pass
+    
+    logger.info(f"Starting extraction worker with concurrency {concurrency} and batch size {batch_size}")
+    try:
+        await asyncio.gather(
+            log_metrics_loop(settings.WORKER_METRICS_LOG_INTERVAL_SECONDS, stop_event),
+            purge_idempotency_keys_loop(settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS, stop_event),
+            purge_extraction_cache_loop(settings.EXTRACTION_CACHE_PURGE_INTERVAL_SECONDS, stop_event),
+            recover_stuck_receipts_loop(settings.EXTRACTION_RECOVERY_INTERVAL_SECONDS, stop_event),
+            *(worker_loop(n, poll_interval, batch_size, stop_event) for n in range(concurrency))
+        )
+    finally:
+        shutdown_process_pool()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="GoodStewards receipt extraction worker")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.WORKER_CONCURRENCY,
+        help="Number of receipts extracted concurrently"
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=settings.WORKER_POLL_INTERVAL_SECONDS,
+        help="Seconds to wait before polling an empty queue again"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=settings.EXTRACTION_BATCH_SIZE,
+        help="Number of receipts each worker sends to the LLM in one call (1 disables batching)"
+    )
+    args = parser.parse_args()
+    asyncio.run(run_worker(args.concurrency, args.poll_interval, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -80,6 +80,27 @@ class BamlAsyncClient:
             "receipt": receipt,
         })
         return typing.cast(types.ReceiptData, result.cast_to(types, types, stream_types, False, __runtime__))
+    async def ExtractReceiptDataBatch(self, receipts: typing.List[baml_py.Image],
+        baml_options: BamlCallOptions = {},
+    ) -> typing.List["types.ReceiptBatchItem"]:
+        result = await self.__options.merge_options(baml_options).call_function_async(function_name="ExtractReceiptDataBatch", args={
+            "receipts": receipts,
+        })
+        return typing.cast(typing.List["types.ReceiptBatchItem"], result.cast_to(types, types, stream_types, False, __runtime__))
+    async def ExtractReceiptDataCandidate(self, receipt: baml_py.Image,
+        baml_options: BamlCallOptions = {},
+    ) -> types.ReceiptData:
+        result = await self.__options.merge_options(baml_options).call_function_async(function_name="ExtractReceiptDataCandidate", args={
+            "receipt": receipt,
+        })
+        return typing.cast(types.ReceiptData, result.cast_to(types, types, stream_types, False, __runtime__))
+    async def ExtractReceiptDataFromText(self, receipt_text: str,
+        baml_options: BamlCallOptions = {},
+    ) -> types.ReceiptData:
+        result = await self.__options.merge_options(baml_options).call_function_async(function_name="ExtractReceiptDataFromText", args={
+            "receipt_text": receipt_text,
+        })
+        return typing.cast(types.ReceiptData, result.cast_to(types, types, stream_types, False, __runtime__))
     
 
 
@@ -101,6 +122,42 @@ class BamlStreamClient:
           lambda x: typing.cast(types.ReceiptData, x.cast_to(types, types, stream_types, False, __runtime__)),
           ctx,
         )
+    def ExtractReceiptDataBatch(self, receipts: typing.List[baml_py.Image],
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.BamlStream[typing.List["stream_types.ReceiptBatchItem"], typing.List["types.ReceiptBatchItem"]]:
+        ctx, result = self.__options.merge_options(baml_options).create_async_stream(function_name="ExtractReceiptDataBatch", args={
+            "receipts": receipts,
+        })
+        return baml_py.BamlStream[typing.List["stream_types.ReceiptBatchItem"], typing.List["types.ReceiptBatchItem"]](
+          result,
+          lambda x: typing.cast(typing.List["stream_types.ReceiptBatchItem"], x.cast_to(types, types, stream_types, True, __runtime__)),
+          lambda x: typing.cast(typing.List["types.ReceiptBatchItem"], x.cast_to(types, types, stream_types, False, __runtime__)),
+          ctx,
+        )
+    def ExtractReceiptDataCandidate(self, receipt: baml_py.Image,
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.BamlStream[stream_types.ReceiptData, types.ReceiptData]:
+        ctx, result = self.__options.merge_options(baml_options).create_async_stream(function_name="ExtractReceiptDataCandidate", args={
+            "receipt": receipt,
+        })
+        return baml_py.BamlStream[stream_types.ReceiptData, types.ReceiptData](
+          result,
+          lambda x: typing.cast(stream_types.ReceiptData, x.cast_to(types, types, stream_types, True, __runtime__)),
+          lambda x: typing.cast(types.ReceiptData, x.cast_to(types, types, stream_types, False, __runtime__)),
+          ctx,
+        )
+    def ExtractReceiptDataFromText(self, receipt_text: str,
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.BamlStream[stream_types.ReceiptData, types.ReceiptData]:
+        ctx, result = self.__options.merge_options(baml_options).create_async_stream(function_name="ExtractReceiptDataFromText", args={
+            "receipt_text": receipt_text,
+        })
+        return baml_py.BamlStream[stream_types.ReceiptData, types.ReceiptData](
+          result,
+          lambda x: typing.cast(stream_types.ReceiptData, x.cast_to(types, types, stream_types, True, __runtime__)),
+          lambda x: typing.cast(types.ReceiptData, x.cast_to(types, types, stream_types, False, __runtime__)),
+          ctx,
+        )
     
 
 class BamlHttpRequestClient:
@@ -116,6 +173,27 @@ class BamlHttpRequestClient:
             "receipt": receipt,
         }, mode="request")
         return result
+    async def ExtractReceiptDataBatch(self, receipts: typing.List[baml_py.Image],
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.baml_py.HTTPRequest:
+        result = await self.__options.merge_options(baml_options).create_http_request_async(function_name="ExtractReceiptDataBatch", args={
+            "receipts": receipts,
+        }, mode="request")
+        return result
+    async def ExtractReceiptDataCandidate(self, receipt: baml_py.Image,
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.baml_py.HTTPRequest:
+        result = await self.__options.merge_options(baml_options).create_http_request_async(function_name="ExtractReceiptDataCandidate", args={
+            "receipt": receipt,
+        }, mode="request")
+        return result
+    async def ExtractReceiptDataFromText(self, receipt_text: str,
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.baml_py.HTTPRequest:
+        result = await self.__options.merge_options(baml_options).create_http_request_async(function_name="ExtractReceiptDataFromText", args={
+            "receipt_text": receipt_text,
+        }, mode="request")
+        return result
     
 
 class BamlHttpStreamRequestClient:
@@ -131,6 +209,27 @@ class BamlHttpStreamRequestClient:
             "receipt": receipt,
         }, mode="stream")
         return result
+    async def ExtractReceiptDataBatch(self, receipts: typing.List[baml_py.Image],
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.baml_py.HTTPRequest:
+        result = await self.__options.merge_options(baml_options).create_http_request_async(function_name="ExtractReceiptDataBatch", args={
+            "receipts": receipts,
+        }, mode="stream")
+        return result
+    async def ExtractReceiptDataCandidate(self, receipt: baml_py.Image,
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.baml_py.HTTPRequest:
+        result = await self.__options.merge_options(baml_options).create_http_request_async(function_name="ExtractReceiptDataCandidate", args={
+            "receipt": receipt,
+        }, mode="stream")
+        return result
+    async def ExtractReceiptDataFromText(self, receipt_text: str,
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.baml_py.HTTPRequest:
+        result = await self.__options.merge_options(baml_options).create_http_request_async(function_name="ExtractReceiptDataFromText", args={
+            "receipt_text": receipt_text,
+        }, mode="stream")
+        return result
     
 
 b = BamlAsyncClient(DoNotUseDirectlyCallManager({}))
\ No newline at end of file
@@ -12,8 +12,9 @@
 
 _file_map = {
 
-    "clients.baml": "// Learn more about clients at https://docs.boundaryml.com/docs/snippets/clients/overview\r\n\r\nclient<llm> CustomGPT4o {\r\n  provider openai\r\n  options {\r\n    model \"gpt-4o\"\r\n    api_key env.OPENAI_API_KEY\r\n  }\r\n}\r\n\r\nclient<llm> CustomGPT4oMini {\r\n  provider openai\r\n  retry_policy Exponential\r\n  options {\r\n    model \"gpt-4o-mini\"\r\n    api_key env.OPENAI_API_KEY\r\n  }\r\n}\r\n\r\nclient<llm> CustomSonnet {\r\n  provider anthropic\r\n  options {\r\n    model \"claude-3-5-sonnet-20241022\"\r\n    api_key env.ANTHROPIC_API_KEY\r\n  }\r\n}\r\n\r\n\r\nclient<llm> CustomHaiku {\r\n  provider anthropic\r\n  retry_policy Constant\r\n  options {\r\n    model \"claude-3-haiku-20240307\"\r\n    api_key env.ANTHROPIC_API_KEY\r\n  }\r\n}\r\n\r\n// https://docs.boundaryml.com/docs/snippets/clients/round-robin\r\nclient<llm> CustomFast {\r\n  provider round-robin\r\n  options {\r\n    // This will alternate between the two clients\r\n    strategy [CustomGPT4oMini, CustomHaiku]\r\n  }\r\n}\r\n\r\n// https://docs.boundaryml.com/docs/snippets/clients/fallback\r\nclient<llm> OpenaiFallback {\r\n  provider fallback\r\n  options {\r\n    // This will try the clients in order until one succeeds\r\n    strategy [CustomGPT4oMini, CustomGPT4oMini]\r\n  }\r\n}\r\n\r\n// https://docs.boundaryml.com/docs/snippets/clients/retry\r\nretry_policy Constant {\r\n  max_retries 3\r\n  // Strategy is optional\r\n  strategy {\r\n    type constant_delay\r\n    delay_ms 200\r\n  }\r\n}\r\n\r\nretry_policy Exponential {\r\n  max_retries 2\r\n  // Strategy is optional\r\n  strategy {\r\n    type exponential_backoff\r\n    delay_ms 300\r\n    multiplier 1.5\r\n    max_delay_ms 10000\r\n  }\r\n}\r\n\r\n",
-    "extract_receipts.baml": "// The BAML linter would be here if we had one.\r\n// Defines the AI function for extracting structured data from a receipt image.\r\n\r\n\r\n\r\n// Define the structured data model we want to extract.\r\nclass ReceiptData {\r\n  vendor_name string\r\n  purchase_date string\r\n  county string\r\n  subtotal_amount float\r\n  tax_amount float\r\n  total_amount float\r\n  expense_category string @description(\"Categorize the expense based on the items. Examples: Food, Office Supplies, Travel, Utilities, etc.\")\r\n  is_donation bool\r\n  tax_breakdowns TaxBreakdown[]\r\n}\r\n\r\nenum TaxType {\r\n  State\r\n  County\r\n  Transit\r\n  Food\r\n} \r\n\r\nclass TaxBreakdown {\r\n  tax_type TaxType\r\n  tax_rate float\r\n  amount float\r\n}\r\n\r\n// Define the AI function.\r\n// The implementation of this function will be handled by the BAML runtime,\r\n// which will call the specified LLM provider (e.g., Google's Gemini).\r\nfunction ExtractReceiptData(\r\n  // Input is the receipt image.\r\n  receipt: image\r\n) -> ReceiptData {\r\n  client CustomGPT4o\r\n    prompt #\"\r\n        {{_.role(\"user\")}}\r\n        \r\n        You are an expert in extracting structured data from images of receipts.\r\n        But you are also an expert preparer of E585 for a non-profit organization in the USA.\r\n        Your task is to extract the following details from the receipt image:\r\n        - Total amount\r\n        - Date of the transaction\r\n        - Business name\r\n        - Address of the business\r\n        - County of the business \r\n        - Total tax amount \r\n        - State Sales Tax \r\n        - Food County Transit Sales Tax\r\n        - Expense Category \r\n        - Tax Rate\r\n\r\n        Extract details from this image of a receipt: {{ receipt }}\r\n\r\n        The county name may need to be inferred from the address info extracted. \r\n        Example: 1005 Jeweled Crown Ct, Indian Trail, NC 28079, USA, so return Union County, NC, USA.\r\n\r\n        Return the extracted data in the following JSON format:\r\n        ```json\r\n        {\r\n            \"total_amount\": 123.45,\r\n            \"date\": \"2023-10-01\",\r\n            \"business\": \"Example Business\",\r\n            \"address\": \"123 Example St, City, State, ZIP\",\r\n            \"county\": \"Example County\",\r\n            \"total_sales_tax\": 5.00,\r\n            \"state_tax\": 2.50,\r\n            \"food_county_transit_tax\": 1.50,\r\n            \"expense_category\": \"Food\",\r\n            \"tax_rate\": 0.05\r\n        }\r\n        ```\r\n\r\n        Ensure that the output is in the specified JSON format and includes all relevant fields.\r\n        {{ ctx.output_format }}\r\n    \"#\r\n}\r\n\r\ntest Test_Receipt {\r\nfunctions [ExtractReceiptData]\r\n  args {\r\n    receipt {\r\n      url \"https://github.com/daniel-m7/GoodStewards/raw/main/data/1-receipt.png\"\r\n    }\r\n  }\r\n}\r\n",
+    "clients.baml": "// Learn more about clients at https://docs.boundaryml.com/docs/snippets/clients/overview\n\nclient<llm> CustomGPT4o {\n  provider openai\n  options {\n    model \"gpt-4o\"\n    api_key env.OPENAI_API_KEY\n  }\n}\n\nclient<llm> CustomGPT4oMini {\n  provider openai\n  retry_policy Exponential\n  options {\n    model \"gpt-4o-mini\"\n    api_key env.OPENAI_API_KEY\n  }\n}\n\nclient<llm> CustomSonnet {\n  provider anthropic\n  options {\n    model \"claude-3-5-sonnet-20241022\"\n    api_key env.ANTHROPIC_API_KEY\n  }\n}\n\n\nclient<llm> CustomHaiku {\n  provider anthropic\n  retry_policy Constant\n  options {\n    model \"claude-3-haiku-20240307\"\n    api_key env.ANTHROPIC_API_KEY\n  }\n}\n\n// https://docs.boundaryml.com/docs/snippets/clients/round-robin\nclient<llm> CustomFast {\n  provider round-robin\n  options {\n    // This will alternate between the two clients\n    strategy [CustomGPT4oMini, CustomHaiku]\n  }\n}\n\n// https://docs.boundaryml.com/docs/snippets/clients/fallback\nclient<llm> OpenaiFallback {\n  provider fallback\n  options {\n    // This will try the clients in order until one succeeds\n    strategy [CustomGPT4oMini, CustomGPT4oMini]\n  }\n}\n\n// https://docs.boundaryml.com/docs/snippets/clients/retry\nretry_policy Constant {\n  max_retries 3\n  // Strategy is optional\n  strategy {\n    type constant_delay\n    delay_ms 200\n  }\n}\n\nretry_policy Exponential {\n  max_retries 2\n  // Strategy is optional\n  strategy {\n    type exponential_backoff\n    delay_ms 300\n    multiplier 1.5\n    max_delay_ms 10000\n  }\n}\n\n",
+    "extract_receipts.baml": "// The BAML linter would be here if we had one.\n// Defines the AI function for extracting structured data from a receipt image.\n\n\n\n// Define the structured data model we want to extract.\nclass ReceiptData {\n  vendor_name string\n  vendor_address string? @description(\"Street address, city, state and ZIP of the business as printed on the receipt\")\n  purchase_date string\n  county string\n  subtotal_amount float\n  tax_amount float\n  total_amount float\n  expense_category string @description(\"Categorize the expense based on the items. Examples: Food, Office Supplies, Travel, Utilities, etc.\")\n  is_donation bool\n  tax_breakdowns TaxBreakdown[]\n}\n\nenum TaxType {\n  State\n  County\n  Transit\n  Food\n} \n\nclass TaxBreakdown {\n  tax_type TaxType\n  tax_rate float\n  amount float\n}\n\n// Define the AI function.\n// The implementation of this function will be handled by the BAML runtime,\n// which will call the specified LLM provider (e.g., Google's Gemini).\nfunction ExtractReceiptData(\n  // Input is the receipt image.\n  receipt: image\n) -> ReceiptData {\n  client CustomGPT4o\n    prompt #\"\n        {{_.role(\"user\")}}\n        \n        You are an expert in extracting structured data from images of receipts.\n        But you are also an expert preparer of E585 for a non-profit organization in the USA.\n        Your task is to extract the following details from the receipt image:\n        - Total amount\n        - Date of the transaction\n        - Business name\n        - Address of the business\n        - County of the business \n        - Total tax amount \n        - State Sales Tax \n        - Food County Transit Sales Tax\n        - Expense Category \n        - Tax Rate\n\n        Extract details from this image of a receipt: {{ receipt }}\n\n        The county name may need to be inferred from the address info extracted. \n        Example: 1005 Jeweled Crown Ct, Indian Trail, NC 28079, USA, so return Union County, NC, USA.\n\n        Return the extracted data in the following JSON format:\n        ```json\n        {\n            \"total_amount\": 123.45,\n            \"date\": \"2023-10-01\",\n            \"business\": \"Example Business\",\n            \"address\": \"123 Example St, City, State, ZIP\",\n            \"county\": \"Example County\",\n            \"total_sales_tax\": 5.00,\n            \"state_tax\": 2.50,\n            \"food_county_transit_tax\": 1.50,\n            \"expense_category\": \"Food\",\n            \"tax_rate\": 0.05\n        }\n        ```\n\n        Ensure that the output is in the specified JSON format and includes all relevant fields.\n        {{ ctx.output_format }}\n    \"#\n}\n\ntest Test_Receipt {\nfunctions [ExtractReceiptData]\n  args {\n    receipt {\n      url \"https://github.com/daniel-m7/GoodStewards/raw/main/data/receipt-1.png\"\n    }\n  }\n}\n\n// Candidate revision of ExtractReceiptData, run in shadow mode on sampled live\n// traffic (EXTRACTION_SHADOW_FUNCTION). Edit this prompt, not the live one, to\n// compare a change against production before promoting it.\nfunction ExtractReceiptDataCandidate(\n  receipt: image\n) -> ReceiptData {\n  client CustomGPT4oMini\n    prompt #\"\n        {{_.role(\"user\")}}\n        \n        You are an expert in extracting structured data from images of receipts.\n        But you are also an expert preparer of E585 for a non-profit organization in the USA.\n        Your task is to extract the following details from the receipt image:\n        - Total amount\n        - Date of the transaction\n        - Business name\n        - Address of the business\n        - County of the business \n        - Total tax amount \n        - State Sales Tax \n        - Food County Transit Sales Tax\n        - Expense Category \n        - Tax Rate\n\n        Extract details from this image of a receipt: {{ receipt }}\n\n        The county name may need to be inferred from the address info extracted. \n        Example: 1005 Jeweled Crown Ct, Indian Trail, NC 28079, USA, so return Union County, NC, USA.\n\n        Return the extracted data in the following JSON format:\n        ```json\n        {\n            \"total_amount\": 123.45,\n            \"date\": \"2023-10-01\",\n            \"business\": \"Example Business\",\n            \"address\": \"123 Example St, City, State, ZIP\",\n            \"county\": \"Example County\",\n            \"total_sales_tax\": 5.00,\n            \"state_tax\": 2.50,\n            \"food_county_transit_tax\": 1.50,\n            \"expense_category\": \"Food\",\n            \"tax_rate\": 0.05\n        }\n        ```\n\n        Ensure that the output is in the specified JSON format and includes all relevant fields.\n        {{ ctx.output_format }}\n    \"#\n}\n\n// One receipt of a batch, tied back to the image it was read from.\nclass ReceiptBatchItem {\n  image_index int @description(\"Position of the receipt's image in the request, starting at 0\")\n  receipt ReceiptData\n}\n\n// Batched variant of ExtractReceiptData for bulk backfills: the instructions\n// are sent once for several receipt images instead of once per image.\nfunction ExtractReceiptDataBatch(\n  // Input is a list of receipt images, one receipt per image.\n  receipts: image[]\n) -> ReceiptBatchItem[] {\n  client CustomGPT4oMini\n    prompt #\"\n        {{_.role(\"user\")}}\n\n        You are an expert in extracting structured data from images of receipts.\n        But you are also an expert preparer of E585 for a non-profit organization in the USA.\n        Each of the following images shows a different receipt. For every receipt, extract:\n        - Total amount, subtotal and total tax amount\n        - Date of the transaction\n        - Business name\n        - County of the business\n        - State, County, Transit and Food sales taxes with their rates\n        - Expense Category\n\n        The county name may need to be inferred from the address on the receipt.\n        Example: 1005 Jeweled Crown Ct, Indian Trail, NC 28079, USA, so return Union County, NC, USA.\n\n        {% for receipt in receipts %}\n        Receipt image {{ loop.index0 }}: {{ receipt }}\n        {% endfor %}\n\n        Return exactly one entry per image, with image_index set to the number of the image\n        it was read from. Never merge receipts or copy values between them.\n        {{ ctx.output_format }}\n    \"#\n}\n\ntest Test_Receipt_Batch {\nfunctions [ExtractReceiptDataBatch]\n  args {\n    receipts [\n      {\n        url \"https://github.com/daniel-m7/GoodStewards/raw/main/data/receipt-1.png\"\n      },\n      {\n        url \"https://github.com/daniel-m7/GoodStewards/raw/main/data/receipt1.jpg\"\n      }\n    ]\n  }\n}\n\n// Text-only variant of ExtractReceiptData for receipts that were OCR'd locally:\n// no image tokens are sent, so a cheap model can read clean prints.\nfunction ExtractReceiptDataFromText(\n  // Input is the OCR text of one receipt.\n  receipt_text: string\n) -> ReceiptData {\n  client CustomGPT4oMini\n    prompt #\"\n        {{_.role(\"user\")}}\n\n        You are an expert in extracting structured data from receipts.\n        But you are also an expert preparer of E585 for a non-profit organization in the USA.\n        The text below was read from a receipt by OCR, so it may contain misread characters\n        and broken lines. Extract:\n        - Total amount, subtotal and total tax amount\n        - Date of the transaction\n        - Business name\n        - County of the business\n        - State, County, Transit and Food sales taxes with their rates\n        - Expense Category\n\n        The county name may need to be inferred from the address on the receipt.\n        Example: 1005 Jeweled Crown Ct, Indian Trail, NC 28079, USA, so return Union County, NC, USA.\n        Only use amounts that appear in the text; never guess a missing one.\n\n        Receipt text:\n        ---\n        {{ receipt_text }}\n        ---\n\n        {{ ctx.output_format }}\n    \"#\n}\n\ntest Test_Receipt_Text {\nfunctions [ExtractReceiptDataFromText]\n  args {\n    receipt_text #\"\n      Walmart\n      Save money. Live better.\n      INDIAN TRAIL NC 28079\n      SUBTOTAL 48.90\n      TAX 1 6.750 % 3.30\n      TOTAL 52.20\n      01/31/25\n    \"#\n  }\n}\n",
+    "generators.baml": "// Settings for the generated Python client in ../baml_client\ngenerator target {\n  output_type \"python/pydantic\"\n  output_dir \"../\"\n  version \"0.202.0\"\n  default_client_mode async\n}\n",
 }
 
 def get_baml_files():
@@ -28,6 +28,24 @@ class LlmResponseParser:
         result = self.__options.merge_options(baml_options).parse_response(function_name="ExtractReceiptData", llm_response=llm_response, mode="request")
         return typing.cast(types.ReceiptData, result)
 
+    def ExtractReceiptDataBatch(
+        self, llm_response: str, baml_options: BamlCallOptions = {},
+    ) -> typing.List["types.ReceiptBatchItem"]:
+        result = self.__options.merge_options(baml_options).parse_response(function_name="ExtractReceiptDataBatch", llm_response=llm_response, mode="request")
+        return typing.cast(typing.List["types.ReceiptBatchItem"], result)
+
+    def ExtractReceiptDataCandidate(
+        self, llm_response: str, baml_options: BamlCallOptions = {},
+    ) -> types.ReceiptData:
+        result = self.__options.merge_options(baml_options).parse_response(function_name="ExtractReceiptDataCandidate", llm_response=llm_response, mode="request")
+        return typing.cast(types.ReceiptData, result)
+
+    def ExtractReceiptDataFromText(
+        self, llm_response: str, baml_options: BamlCallOptions = {},
+    ) -> types.ReceiptData:
+        result = self.__options.merge_options(baml_options).parse_response(function_name="ExtractReceiptDataFromText", llm_response=llm_response, mode="request")
+        return typing.cast(types.ReceiptData, result)
+
     
 
 class LlmStreamParser:
@@ -42,4 +60,22 @@ class LlmStreamParser:
         result = self.__options.merge_options(baml_options).parse_response(function_name="ExtractReceiptData", llm_response=llm_response, mode="stream")
         return typing.cast(stream_types.ReceiptData, result)
 
+    def ExtractReceiptDataBatch(
+        self, llm_response: str, baml_options: BamlCallOptions = {},
+    ) -> typing.List["stream_types.ReceiptBatchItem"]:
+        result = self.__options.merge_options(baml_options).parse_response(function_name="ExtractReceiptDataBatch", llm_response=llm_response, mode="stream")
+        return typing.cast(typing.List["stream_types.ReceiptBatchItem"], result)
+
+    def ExtractReceiptDataCandidate(
+        self, llm_response: str, baml_options: BamlCallOptions = {},
+    ) -> stream_types.ReceiptData:
+        result = self.__options.merge_options(baml_options).parse_response(function_name="ExtractReceiptDataCandidate", llm_response=llm_response, mode="stream")
+        return typing.cast(stream_types.ReceiptData, result)
+
+    def ExtractReceiptDataFromText(
+        self, llm_response: str, baml_options: BamlCallOptions = {},
+    ) -> stream_types.ReceiptData:
+        result = self.__options.merge_options(baml_options).parse_response(function_name="ExtractReceiptDataFromText", llm_response=llm_response, mode="stream")
+        return typing.cast(stream_types.ReceiptData, result)
+
     
\ No newline at end of file
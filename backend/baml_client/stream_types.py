@@ -23,11 +23,16 @@ class StreamState(BaseModel, typing.Generic[StreamStateValueT]):
     value: StreamStateValueT
     state: typing_extensions.Literal["Pending", "Incomplete", "Complete"]
 # #########################################################################
-# Generated classes (2)
+# Generated classes (3)
 # #########################################################################
 
+class ReceiptBatchItem(BaseModel):
+    image_index: typing.Optional[int] = None
+    receipt: typing.Optional["ReceiptData"] = None
+
 class ReceiptData(BaseModel):
     vendor_name: typing.Optional[str] = None
+    vendor_address: typing.Optional[str] = None
     purchase_date: typing.Optional[str] = None
     county: typing.Optional[str] = None
     subtotal_amount: typing.Optional[float] = None
@@ -92,6 +92,27 @@ class BamlSyncClient:
             "receipt": receipt,
         })
         return typing.cast(types.ReceiptData, result.cast_to(types, types, stream_types, False, __runtime__))
+    def ExtractReceiptDataBatch(self, receipts: typing.List[baml_py.Image],
+        baml_options: BamlCallOptions = {},
+    ) -> typing.List["types.ReceiptBatchItem"]:
+        result = self.__options.merge_options(baml_options).call_function_sync(function_name="ExtractReceiptDataBatch", args={
+            "receipts": receipts,
+        })
+        return typing.cast(typing.List["types.ReceiptBatchItem"], result.cast_to(types, types, stream_types, False, __runtime__))
+    def ExtractReceiptDataCandidate(self, receipt: baml_py.Image,
+        baml_options: BamlCallOptions = {},
+    ) -> types.ReceiptData:
+        result = self.__options.merge_options(baml_options).call_function_sync(function_name="ExtractReceiptDataCandidate", args={
+            "receipt": receipt,
+        })
+        return typing.cast(types.ReceiptData, result.cast_to(types, types, stream_types, False, __runtime__))
+    def ExtractReceiptDataFromText(self, receipt_text: str,
+        baml_options: BamlCallOptions = {},
+    ) -> types.ReceiptData:
+        result = self.__options.merge_options(baml_options).call_function_sync(function_name="ExtractReceiptDataFromText", args={
+            "receipt_text": receipt_text,
+        })
+        return typing.cast(types.ReceiptData, result.cast_to(types, types, stream_types, False, __runtime__))
     
 
 
@@ -113,6 +134,42 @@ class BamlStreamClient:
           lambda x: typing.cast(types.ReceiptData, x.cast_to(types, types, stream_types, False, __runtime__)),
           ctx,
         )
+    def ExtractReceiptDataBatch(self, receipts: typing.List[baml_py.Image],
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.BamlSyncStream[typing.List["stream_types.ReceiptBatchItem"], typing.List["types.ReceiptBatchItem"]]:
+        ctx, result = self.__options.merge_options(baml_options).create_sync_stream(function_name="ExtractReceiptDataBatch", args={
+            "receipts": receipts,
+        })
+        return baml_py.BamlSyncStream[typing.List["stream_types.ReceiptBatchItem"], typing.List["types.ReceiptBatchItem"]](
+          result,
+          lambda x: typing.cast(typing.List["stream_types.ReceiptBatchItem"], x.cast_to(types, types, stream_types, True, __runtime__)),
+          lambda x: typing.cast(typing.List["types.ReceiptBatchItem"], x.cast_to(types, types, stream_types, False, __runtime__)),
+          ctx,
+        )
+    def ExtractReceiptDataCandidate(self, receipt: baml_py.Image,
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.BamlSyncStream[stream_types.ReceiptData, types.ReceiptData]:
+        ctx, result = self.__options.merge_options(baml_options).create_sync_stream(function_name="ExtractReceiptDataCandidate", args={
+            "receipt": receipt,
+        })
+        return baml_py.BamlSyncStream[stream_types.ReceiptData, types.ReceiptData](
+          result,
+          lambda x: typing.cast(stream_types.ReceiptData, x.cast_to(types, types, stream_types, True, __runtime__)),
+          lambda x: typing.cast(types.ReceiptData, x.cast_to(types, types, stream_types, False, __runtime__)),
+          ctx,
+        )
+    def ExtractReceiptDataFromText(self, receipt_text: str,
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.BamlSyncStream[stream_types.ReceiptData, types.ReceiptData]:
+        ctx, result = self.__options.merge_options(baml_options).create_sync_stream(function_name="ExtractReceiptDataFromText", args={
+            "receipt_text": receipt_text,
+        })
+        return baml_py.BamlSyncStream[stream_types.ReceiptData, types.ReceiptData](
+          result,
+          lambda x: typing.cast(stream_types.ReceiptData, x.cast_to(types, types, stream_types, True, __runtime__)),
+          lambda x: typing.cast(types.ReceiptData, x.cast_to(types, types, stream_types, False, __runtime__)),
+          ctx,
+        )
     
 
 class BamlHttpRequestClient:
@@ -128,6 +185,27 @@ class BamlHttpRequestClient:
             "receipt": receipt,
         }, mode="request")
         return result
+    def ExtractReceiptDataBatch(self, receipts: typing.List[baml_py.Image],
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.baml_py.HTTPRequest:
+        result = self.__options.merge_options(baml_options).create_http_request_sync(function_name="ExtractReceiptDataBatch", args={
+            "receipts": receipts,
+        }, mode="request")
+        return result
+    def ExtractReceiptDataCandidate(self, receipt: baml_py.Image,
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.baml_py.HTTPRequest:
+        result = self.__options.merge_options(baml_options).create_http_request_sync(function_name="ExtractReceiptDataCandidate", args={
+            "receipt": receipt,
+        }, mode="request")
+        return result
+    def ExtractReceiptDataFromText(self, receipt_text: str,
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.baml_py.HTTPRequest:
+        result = self.__options.merge_options(baml_options).create_http_request_sync(function_name="ExtractReceiptDataFromText", args={
+            "receipt_text": receipt_text,
+        }, mode="request")
+        return result
     
 
 class BamlHttpStreamRequestClient:
@@ -143,6 +221,27 @@ class BamlHttpStreamRequestClient:
             "receipt": receipt,
         }, mode="stream")
         return result
+    def ExtractReceiptDataBatch(self, receipts: typing.List[baml_py.Image],
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.baml_py.HTTPRequest:
+        result = self.__options.merge_options(baml_options).create_http_request_sync(function_name="ExtractReceiptDataBatch", args={
+            "receipts": receipts,
+        }, mode="stream")
+        return result
+    def ExtractReceiptDataCandidate(self, receipt: baml_py.Image,
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.baml_py.HTTPRequest:
+        result = self.__options.merge_options(baml_options).create_http_request_sync(function_name="ExtractReceiptDataCandidate", args={
+            "receipt": receipt,
+        }, mode="stream")
+        return result
+    def ExtractReceiptDataFromText(self, receipt_text: str,
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.baml_py.HTTPRequest:
+        result = self.__options.merge_options(baml_options).create_http_request_sync(function_name="ExtractReceiptDataFromText", args={
+            "receipt_text": receipt_text,
+        }, mode="stream")
+        return result
     
 
 b = BamlSyncClient(DoNotUseDirectlyCallManager({}))
\ No newline at end of file
@@ -18,7 +18,7 @@ from .globals import DO_NOT_USE_DIRECTLY_UNLESS_YOU_KNOW_WHAT_YOURE_DOING_RUNTIM
 class TypeBuilder(type_builder.TypeBuilder):
     def __init__(self):
         super().__init__(classes=set(
-          ["ReceiptData","TaxBreakdown",]
+          ["ReceiptBatchItem","ReceiptData","TaxBreakdown",]
         ), enums=set(
           ["TaxType",]
         ), runtime=DO_NOT_USE_DIRECTLY_UNLESS_YOU_KNOW_WHAT_YOURE_DOING_RUNTIME)
@@ -33,9 +33,13 @@ class TypeBuilder(type_builder.TypeBuilder):
 
 
     # #########################################################################
-    # Generated classes 2
+    # Generated classes 3
     # #########################################################################
 
+    @property
+    def ReceiptBatchItem(self) -> "ReceiptBatchItemViewer":
+        return ReceiptBatchItemViewer(self)
+
     @property
     def ReceiptData(self) -> "ReceiptDataViewer":
         return ReceiptDataViewer(self)
@@ -102,14 +106,57 @@ class TaxTypeValues:
 
 
 # #########################################################################
-# Generated classes 2
+# Generated classes 3
 # #########################################################################
 
+class ReceiptBatchItemAst:
+    def __init__(self, tb: type_builder.TypeBuilder):
+        _tb = tb._tb # type: ignore (we know how to use this private attribute)
+        self._bldr = _tb.class_("ReceiptBatchItem")
+        self._properties: typing.Set[str] = set([  "image_index",  "receipt",  ])
+        self._props = ReceiptBatchItemProperties(self._bldr, self._properties)
+
+    def type(self) -> baml_py.FieldType:
+        return self._bldr.field()
+
+    @property
+    def props(self) -> "ReceiptBatchItemProperties":
+        return self._props
+
+
+class ReceiptBatchItemViewer(ReceiptBatchItemAst):
+    def __init__(self, tb: type_builder.TypeBuilder):
+        super().__init__(tb)
+
+    
+    def list_properties(self) -> typing.List[typing.Tuple[str, type_builder.ClassPropertyViewer]]:
+        return [(name, type_builder.ClassPropertyViewer(self._bldr.property(name))) for name in self._properties]
+    
+
+
+class ReceiptBatchItemProperties:
+    def __init__(self, bldr: baml_py.ClassBuilder, properties: typing.Set[str]):
+        self.__bldr = bldr
+        self.__properties = properties # type: ignore (we know how to use this private attribute) # noqa: F821
+
+    
+    
+    @property
+    def image_index(self) -> type_builder.ClassPropertyViewer:
+        return type_builder.ClassPropertyViewer(self.__bldr.property("image_index"))
+    
+    @property
+    def receipt(self) -> type_builder.ClassPropertyViewer:
+        return type_builder.ClassPropertyViewer(self.__bldr.property("receipt"))
+    
+    
+
+
 class ReceiptDataAst:
     def __init__(self, tb: type_builder.TypeBuilder):
         _tb = tb._tb # type: ignore (we know how to use this private attribute)
         self._bldr = _tb.class_("ReceiptData")
-        self._properties: typing.Set[str] = set([  "vendor_name",  "purchase_date",  "county",  "subtotal_amount",  "tax_amount",  "total_amount",  "expense_category",  "is_donation",  "tax_breakdowns",  ])
+        self._properties: typing.Set[str] = set([  "vendor_name",  "vendor_address",  "purchase_date",  "county",  "subtotal_amount",  "tax_amount",  "total_amount",  "expense_category",  "is_donation",  "tax_breakdowns",  ])
         self._props = ReceiptDataProperties(self._bldr, self._properties)
 
     def type(self) -> baml_py.FieldType:
@@ -140,6 +187,10 @@ class ReceiptDataProperties:
     @property
     def vendor_name(self) -> type_builder.ClassPropertyViewer:
         return type_builder.ClassPropertyViewer(self.__bldr.property("vendor_name"))
+    
+    @property
+    def vendor_address(self) -> type_builder.ClassPropertyViewer:
+        return type_builder.ClassPropertyViewer(self.__bldr.property("vendor_address"))
     
     @property
     def purchase_date(self) -> type_builder.ClassPropertyViewer:
@@ -222,4 +273,3 @@ class TaxBreakdownProperties:
     
     
 
-
\ No newline at end of file
@@ -16,6 +16,9 @@ from . import stream_types
 
 type_map = {
 
+    "types.ReceiptBatchItem": types.ReceiptBatchItem,
+    "stream_types.ReceiptBatchItem": stream_types.ReceiptBatchItem,
+
     "types.ReceiptData": types.ReceiptData,
     "stream_types.ReceiptData": stream_types.ReceiptData,
 
@@ -47,11 +47,16 @@ class TaxType(str, Enum):
     Food = "Food"
 
 # #########################################################################
-# Generated classes (2)
+# Generated classes (3)
 # #########################################################################
 
+class ReceiptBatchItem(BaseModel):
+    image_index: int
+    receipt: "ReceiptData"
+
 class ReceiptData(BaseModel):
     vendor_name: str
+    vendor_address: typing.Optional[str] = None
     purchase_date: str
     county: str
     subtotal_amount: float
@@ -0,0 +1,66 @@
+import uuid
+from typing import AsyncIterator
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.models.models import Organization, Receipt, Role, User
+
+
+@pytest.fixture
+async def engine() -> AsyncIterator[AsyncEngine]:
+    """
+    Engine for DATABASE_URL with a fresh schema for each test.
+
+    CI points DATABASE_URL at a throwaway Postgres database; locally
+    sqlite+aiosqlite:// works for everything but the Postgres-only tests.
+    """
+    engine = create_async_engine(settings.DATABASE_URL)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+    yield engine
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+    await engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine: AsyncEngine) -> async_sessionmaker:
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.fixture
+async def session(session_factory: async_sessionmaker) -> AsyncIterator[AsyncSession]:
+    async with session_factory() as session:
+        yield session
+
+
+@pytest.fixture
+async def treasurer(session: AsyncSession) -> User:
+    organization = Organization(name="Test Church")
+    session.add(organization)
+    await session.commit()
+    user = User(full_name="Test Treasurer", email="treasurer@example.org", role=Role.treasurer, organization_id=organization.id)
+    session.add(user)
+    await session.commit()
+    return user
+
+
+@pytest.fixture
+def make_receipt(session: AsyncSession, treasurer: User):
+    """Create a receipt of the treasurer's organization, processing by default."""
+    async def make(**fields) -> Receipt:
+        receipt = Receipt(
+            image_url=f"https://storage.example.com/receipts/{uuid.uuid4()}.jpg",
+            user_id=treasurer.id,
+            organization_id=treasurer.organization_id,
+            **fields
+        )
+        session.add(receipt)
+        await session.commit()
+        return receipt
+    return make
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import select
+
+from app.models.models import IdempotencyKey, IdempotencyStatus
+from app.services.idempotency_service import (
+    IdempotencyKeyInProgress,
+    IdempotencyKeyReused,
+    IdempotencyStore,
+    request_fingerprint,
+)
+
+ENDPOINT = "POST /receipts/upload"
+
+
+def counting(status_code=202, body=None):
+    """A mutation that records how often it ran."""
+    calls = []
+
+    async def func():
+        calls.append(1)
+        return status_code, body if body is not None else {"id": len(calls)}
+    func.calls = calls
+    return func
+
+
+async def run(session, user, key, request_hash, func):
+    return await IdempotencyStore.run(session, key, user_id=user.id, endpoint=ENDPOINT, request_hash=request_hash, func=func)
+
+
+async def test_without_a_key_the_mutation_always_runs(session, treasurer):
+    func = counting()
+
+    await run(session, treasurer, None, "a", func)
+    await run(session, treasurer, None, "a", func)
+
+    assert len(func.calls) == 2
+
+
+async def test_retry_with_the_same_key_replays_the_stored_response(session, treasurer):
+    func = counting(status_code=202, body={"id": "receipt-1", "status": "processing"})
+    request_hash = request_fingerprint("abc123", False, None)
+
+    first = await run(session, treasurer, "key-1", request_hash, func)
+    retry = await run(session, treasurer, "key-1", request_hash, func)
+
+    assert len(func.calls) == 1
+    assert not first.replayed
+    assert retry.replayed
+    assert (retry.status_code, retry.body) == (202, {"id": "receipt-1", "status": "processing"})
+
+
+async def test_key_reused_for_a_different_request_is_rejected(session, treasurer):
+    func = counting()
+    await run(session, treasurer, "key-1", request_fingerprint("abc123", False, None), func)
+
+    with pytest.raises(IdempotencyKeyReused):
+        await run(session, treasurer, "key-1", request_fingerprint("abc123", True, None), func)
+    assert len(func.calls) == 1
+
+
+async def test_keys_are_scoped_to_the_endpoint(session, treasurer):
+    func = counting()
+    await run(session, treasurer, "key-1", "a", func)
+
+    await IdempotencyStore.run(session, "key-1", user_id=treasurer.id, endpoint="POST /payments/upload-csv", request_hash="b", func=func)
+
+    assert len(func.calls) == 2
+
+
+async def test_key_of_a_running_request_is_in_progress(session, treasurer):
+    async def retry_while_running():
+        with pytest.raises(IdempotencyKeyInProgress):
+            await run(session, treasurer, "key-1", "a", counting())
+        return 202, {}
+
+    await run(session, treasurer, "key-1", "a", retry_while_running)
+
+
+async def test_failed_request_releases_its_key(session, treasurer):
+    async def failing():
+        raise RuntimeError("storage unavailable")
+
+    with pytest.raises(RuntimeError):
+        await run(session, treasurer, "key-1", "a", failing)
+    func = counting()
+    retry = await run(session, treasurer, "key-1", "a", func)
+
+    assert len(func.calls) == 1
+    assert not retry.replayed
+
+
+async def test_expired_key_runs_the_request_again(session, treasurer):
+    await run(session, treasurer, "key-1", "a", counting())
+    record = (await session.exec(select(IdempotencyKey).where(IdempotencyKey.key == "key-1"))).one()
+    record.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    session.add(record)
+    await session.commit()
+
+    func = counting()
+    result = await run(session, treasurer, "key-1", "b", func)
+
+    assert len(func.calls) == 1
+    assert not result.replayed
+    await session.refresh(record)
+    assert record.status == IdempotencyStatus.completed
+    assert record.request_hash == "b"
@@ -0,0 +1,184 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import select
+
+from app.core.config import settings
+from app.models.models import ExtractionJob, ExtractionJobStatus, ReceiptStatus
+from app.services.job_queue import ExtractionJobQueue
+
+
+async def enqueue(session, receipt, **fields) -> ExtractionJob:
+    job = ExtractionJobQueue.enqueue(session, receipt.id)
+    for name, value in fields.items():
+        setattr(job, name, value)
+    await session.commit()
+    return job
+
+
+async def jobs_of(session, receipt):
+    result = await session.exec(
+        select(ExtractionJob).where(ExtractionJob.receipt_id == receipt.id).order_by(ExtractionJob.created_at)
+    )
+    return list(result.all())
+
+
+async def test_claim_batch_takes_runnable_jobs_oldest_first(session, make_receipt):
+    now = datetime.utcnow()
+    newer = await enqueue(session, await make_receipt(), run_after=now - timedelta(seconds=10))
+    older = await enqueue(session, await make_receipt(), run_after=now - timedelta(seconds=20))
+    await enqueue(session, await make_receipt(), run_after=now + timedelta(minutes=5))
+
+    claimed = await ExtractionJobQueue.claim_batch(session, 10)
+
+    assert [job.id for job in claimed] == [older.id, newer.id]
+    for job in claimed:
+        assert job.status == ExtractionJobStatus.running
+        assert job.attempts == 1
+        assert job.locked_at is not None
+    assert await ExtractionJobQueue.claim(session) is None
+
+
+async def test_claim_batch_respects_limit(session, make_receipt):
+    for _ in range(3):
+        await enqueue(session, await make_receipt())
+
+    assert len(await ExtractionJobQueue.claim_batch(session, 2)) == 2
+    assert len(await ExtractionJobQueue.claim_batch(session, 2)) == 1
+
+
+async def test_claim_skips_jobs_locked_by_another_worker(engine, session_factory, make_receipt):
+    if engine.dialect.name != "postgresql":
+        pytest.skip("SKIP LOCKED needs Postgres")
+    async with session_factory() as setup:
+        locked = await enqueue(setup, await make_receipt(), run_after=datetime.utcnow() - timedelta(seconds=10))
+        free = await enqueue(setup, await make_receipt())
+
+    async with session_factory() as other_worker, session_factory() as worker:
+        # Another worker holds the older job's row lock mid-claim
+        await other_worker.exec(select(ExtractionJob).where(ExtractionJob.id == locked.id).with_for_update())
+
+        claimed = await ExtractionJobQueue.claim(worker)
+
+        assert claimed is not None and claimed.id == free.id
+        await other_worker.rollback()
+
+
+@pytest.mark.parametrize("attempts, delay", [(0, 30), (1, 30), (2, 60), (3, 120), (7, 1920), (8, 3600), (20, 3600)])
+def test_retry_delay_doubles_up_to_the_maximum(monkeypatch, attempts, delay):
+    monkeypatch.setattr(settings, "EXTRACTION_JOB_RETRY_DELAY_SECONDS", 30)
+    monkeypatch.setattr(settings, "EXTRACTION_JOB_MAX_RETRY_DELAY_SECONDS", 3600)
+
+    assert ExtractionJobQueue.retry_delay(attempts) == delay
+
+
+async def test_fail_requeues_with_exponential_backoff(session, make_receipt):
+    job = await enqueue(session, await make_receipt())
+
+    delays = []
+    for _ in range(settings.EXTRACTION_JOB_MAX_ATTEMPTS - 1):
+        claimed = await ExtractionJobQueue.claim(session)
+        assert claimed is not None and claimed.id == job.id
+        before = datetime.utcnow()
+        await ExtractionJobQueue.fail(session, job.id, "model timed out")
+        assert job.status == ExtractionJobStatus.queued
+        assert job.locked_at is None
+        assert job.last_error == "model timed out"
+        delays.append((job.run_after - before).total_seconds())
+        # Make the job runnable again without waiting out the backoff
+        job.run_after = datetime.utcnow()
+        await session.commit()
+
+    for attempts, delay in enumerate(delays, start=1):
+        assert delay == pytest.approx(ExtractionJobQueue.retry_delay(attempts), abs=1)
+
+
+async def test_fail_dead_letters_receipt_after_max_attempts(session, make_receipt):
+    receipt = await make_receipt()
+    job = await enqueue(session, receipt, attempts=settings.EXTRACTION_JOB_MAX_ATTEMPTS, status=ExtractionJobStatus.running)
+
+    await ExtractionJobQueue.fail(session, job.id, "unreadable image")
+
+    assert job.status == ExtractionJobStatus.failed
+    assert job.finished_at is not None
+    await session.refresh(receipt)
+    assert receipt.status == ReceiptStatus.extraction_failed
+    assert receipt.extraction_error == "unreadable image"
+
+
+async def test_fail_leaves_receipts_that_moved_on(session, make_receipt):
+    receipt = await make_receipt(status=ReceiptStatus.approved)
+    job = await enqueue(session, receipt, attempts=settings.EXTRACTION_JOB_MAX_ATTEMPTS, status=ExtractionJobStatus.running)
+
+    await ExtractionJobQueue.fail(session, job.id, "unreadable image")
+
+    await session.refresh(receipt)
+    assert receipt.status == ReceiptStatus.approved
+    assert receipt.extraction_error is None
+
+
+async def test_recover_stuck_requeues_jobs_without_heartbeat(session, make_receipt):
+    now = datetime.utcnow()
+    timeout = timedelta(seconds=settings.EXTRACTION_JOB_LOCK_TIMEOUT_SECONDS)
+    stale = await enqueue(session, await make_receipt(), status=ExtractionJobStatus.running, attempts=1, locked_at=now - timeout - timedelta(seconds=5))
+    alive = await enqueue(session, await make_receipt(), status=ExtractionJobStatus.running, attempts=1, locked_at=now - timeout + timedelta(seconds=30))
+
+    assert await ExtractionJobQueue.recover_stuck(session) == 1
+
+    await session.refresh(stale)
+    await session.refresh(alive)
+    assert stale.status == ExtractionJobStatus.queued
+    assert stale.last_error == "Worker stopped while extracting"
+    assert stale.run_after >= now + timedelta(seconds=ExtractionJobQueue.retry_delay(1) - 1)
+    assert alive.status == ExtractionJobStatus.running
+
+
+async def test_recover_stuck_dead_letters_stale_job_on_last_attempt(session, make_receipt):
+    receipt = await make_receipt()
+    locked_at = datetime.utcnow() - timedelta(seconds=settings.EXTRACTION_JOB_LOCK_TIMEOUT_SECONDS + 5)
+    job = await enqueue(session, receipt, status=ExtractionJobStatus.running, attempts=settings.EXTRACTION_JOB_MAX_ATTEMPTS, locked_at=locked_at)
+
+    assert await ExtractionJobQueue.recover_stuck(session) == 1
+
+    await session.refresh(job)
+    await session.refresh(receipt)
+    assert job.status == ExtractionJobStatus.failed
+    assert receipt.status == ReceiptStatus.extraction_failed
+
+
+async def test_recover_stuck_reenqueues_orphaned_receipt_keeping_attempts(session, make_receipt):
+    submitted_at = datetime.utcnow() - timedelta(seconds=settings.RECEIPT_PROCESSING_TIMEOUT_SECONDS + 5)
+    orphaned = await make_receipt(submitted_at=submitted_at)
+    await enqueue(session, orphaned, status=ExtractionJobStatus.failed, attempts=1, last_error="model timed out")
+    recent = await make_receipt()
+
+    assert await ExtractionJobQueue.recover_stuck(session) == 1
+
+    jobs = await jobs_of(session, orphaned)
+    assert len(jobs) == 2
+    assert jobs[-1].status == ExtractionJobStatus.queued
+    assert jobs[-1].attempts == 1
+    assert jobs[-1].last_error == "model timed out"
+    assert await jobs_of(session, recent) == []
+
+
+async def test_recover_stuck_dead_letters_orphan_out_of_attempts(session, make_receipt):
+    submitted_at = datetime.utcnow() - timedelta(seconds=settings.RECEIPT_PROCESSING_TIMEOUT_SECONDS + 5)
+    receipt = await make_receipt(submitted_at=submitted_at)
+    await enqueue(session, receipt, status=ExtractionJobStatus.failed, attempts=settings.EXTRACTION_JOB_MAX_ATTEMPTS, last_error="unreadable image")
+
+    assert await ExtractionJobQueue.recover_stuck(session) == 1
+
+    await session.refresh(receipt)
+    assert receipt.status == ReceiptStatus.extraction_failed
+    assert receipt.extraction_error == "unreadable image"
+    assert len(await jobs_of(session, receipt)) == 1
+
+
+async def test_recover_stuck_leaves_receipts_with_a_queued_job(session, make_receipt):
+    submitted_at = datetime.utcnow() - timedelta(seconds=settings.RECEIPT_PROCESSING_TIMEOUT_SECONDS + 5)
+    receipt = await make_receipt(submitted_at=submitted_at)
+    await enqueue(session, receipt, run_after=datetime.utcnow() + timedelta(minutes=5))
+
+    assert await ExtractionJobQueue.recover_stuck(session) == 0
+    assert len(await jobs_of(session, receipt)) == 1
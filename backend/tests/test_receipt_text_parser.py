@@ -0,0 +1,86 @@
+import pytest
+
+from app.services.receipt_text_parser import find_purchase_date, find_vendor_name, parse_receipt_text
+
+ORDER_PAGE = """Order Summary
+Acme Office Supply
+1200 Main Street
+Monroe, NC 28110
+
+Order placed: March 3, 2024
+Delivered: March 7, 2024
+
+Printer paper, 10 reams       $45.99
+Toner cartridge               $62.50
+
+Subtotal                     $108.49
+Sales tax                      $7.87
+Order total                  $116.36
+
+© 2024 Acme Office Supply, Inc.
+"""
+
+
+def test_parse_receipt_text_reads_reconciled_amounts():
+    data = parse_receipt_text(ORDER_PAGE)
+
+    assert data is not None
+    assert data.vendor_name == "Acme Office Supply"
+    assert data.vendor_address == "1200 Main Street, Monroe, NC 28110"
+    assert data.purchase_date == "2024-03-03"
+    assert data.subtotal_amount == 108.49
+    assert data.tax_amount == 7.87
+    assert data.total_amount == 116.36
+    # Left for the treasurer
+    assert data.county == ""
+    assert data.expense_category == ""
+    assert data.tax_breakdowns == []
+
+
+def test_parse_receipt_text_fills_in_a_missing_subtotal():
+    text = "Corner Hardware\nSales tax $0.70\nTotal $10.70\n"
+
+    data = parse_receipt_text(text)
+
+    assert data is not None
+    assert data.subtotal_amount == 10.00
+    assert data.tax_amount == 0.70
+
+
+def test_parse_receipt_text_rejects_amounts_that_do_not_add_up():
+    text = "Corner Hardware\nSubtotal $10.00\nTax $0.70\nTotal $12.70\n"
+
+    assert parse_receipt_text(text) is None
+
+
+def test_parse_receipt_text_needs_a_total():
+    assert parse_receipt_text("Corner Hardware\nSubtotal $10.00\nTax $0.70\n") is None
+
+
+def test_parse_receipt_text_ignores_tax_rates():
+    text = "Corner Hardware\nSubtotal $10.00\nTax 7.00% $0.70\nTotal $10.70\n"
+
+    data = parse_receipt_text(text)
+
+    assert data is not None
+    assert data.tax_amount == 0.70
+
+
+def test_parse_receipt_text_handles_windows_line_endings():
+    assert parse_receipt_text(ORDER_PAGE.replace("\n", "\r\n")) is not None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Order date: 03/04/2024", "2024-03-04"),
+    ("Date 3/4/24", "2024-03-04"),
+    ("Invoice date 2024-03-04", "2024-03-04"),
+    ("Shipped Mar 9, 2024\nOrder placed Mar. 4, 2024", "2024-03-04"),
+    ("Mar 4, 2024, delivered Mar 9, 2024", "2024-03-04"),
+    ("Ref 13/45/2024", None),
+])
+def test_find_purchase_date(text, expected):
+    assert find_purchase_date(text) == expected
+
+
+def test_find_vendor_name_skips_generic_headings_and_amounts():
+    assert find_vendor_name("Receipt\n$12.00\n03/04/2024\nCorner Hardware\n") == "Corner Hardware"